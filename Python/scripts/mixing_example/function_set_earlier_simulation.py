@@ -13,6 +13,9 @@ Created 27.04.2018 author CAB
 
 import numpy as np
 import matplotlib.pyplot as plt
+from tools.integrators import AdaptiveModel
+from tools.mixing_model import EarlierModel, JumpAhead, parameter_table
+from tools.state_columns import StateColumns
 
 
 # Script init
@@ -60,42 +63,45 @@ class 𝔈_:
 Δt = .1
 𝔛_0 = 𝔛_(t=.0)
 𝔜_0 = 𝔜_(ω_1=.0, ω_2=20.0)
+integrator = None # None for Earlier scheme with fixed Δt, or "dopri5"/"rosenbrock" (stiff) adaptive step integrator
+tolerance = 1e-6  # Relative tolerance of adaptive step integrator
+drift_free_steps = False # True to count Earlier steps by t (floor((t - t_0) / Δt) + 1) and evaluate them by jump
+                         # ahead, False to count them by accumulated t as loop does (same printed rows as loop)
 
 # Model (Earlier)
-def F(Δt, 𝔛_0, 𝔜_0):
-    def eval(X, 𝔈):
-        t = 𝔛_0.t
-        ω_1 = 𝔜_0.ω_1
-        ω_2 = 𝔜_0.ω_2
-        while t <= X.t:
-            ω_1_m1 = ω_1
-            ω_2_m1 = ω_2
-            ω_1 = ω_1_m1 + Δt * (((𝔈.q_1 * 𝔈.ω_3) + (𝔈.q_2 * ω_2_m1) - (𝔈.q_3 * ω_1_m1)) / 𝔈.v_1)
-            ω_2 = ω_2 + Δt * (((𝔈.q_3 * ω_1_m1) - (𝔈.q_2 * ω_2_m1) - (𝔈.q_4 * ω_2_m1)) / 𝔈.v_2)
-            t += Δt
-        return 𝔜_(ω_1, ω_2)
-    return eval
+jump_ahead = JumpAhead()  # Transition matrices cache shared by all F_ instances
+class F_(EarlierModel): # Earlier model, see EarlierModel (loop resumed from last state or checkpoint of 𝔈)
+    def __init__(self, Δt, 𝔛_0, 𝔜_0, drift_free=False):
+        super().__init__(Δt, 𝔛_0.t, (𝔜_0.ω_1, 𝔜_0.ω_2), drift_free, jump_ahead=jump_ahead)
+        self.𝔛_0 = 𝔛_0
+        self.𝔜_0 = 𝔜_0
+    def __call__(self, X, 𝔈):
+        return 𝔜_(*self.eval_t(X.t, 𝔈))
 
 # Simulations
-def simulation(setX, 𝔈):
-    set𝔜 = np.array([])
-    for 𝔛 in setX:
-        𝔜 = F(Δt, 𝔛_0, 𝔜_0)(𝔛, 𝔈)
-        set𝔜 = np.append(set𝔜, [𝔜])
+def simulation(set_t, 𝔈):
+    if integrator is not None: # Steps chosen by error control, states on set_t taken from dense output
+        M = AdaptiveModel(𝔛_0.t, (𝔜_0.ω_1, 𝔜_0.ω_2), method=integrator, rtol=tolerance)
+        solution = M.eval_grid(set_t, 𝔈)
+        print(f"Adaptive integration: {solution}")
+        return StateColumns(set_t, solution.ys[:, 0], solution.ys[:, 1], 𝔈=parameter_table([𝔈])[0])
+    M = F_(Δt, 𝔛_0, 𝔜_0, drift_free_steps)
+    set𝔜 = StateColumns.allocate(len(set_t), 𝔈=parameter_table([𝔈])[0])
+    for i, t in enumerate(set_t):
+        set𝔜.set(i, t, *M.eval_t(t, 𝔈))
     return set𝔜
 
 # Run simulation
-set𝔛 = np.vectorize(lambda t: 𝔛_(t))(np.arange(0.0, 10.1, 0.1))
-set𝔜 = simulation(set𝔛, 𝔈)
+set𝔜 = simulation(np.arange(0.0, 10.1, 0.1), 𝔈)
 
 # Print result
 print("Simulation result (𝔛 -> 𝔜): ")
-for [𝔛, 𝔜] in np.column_stack((set𝔛, set𝔜)):
-    print(f"    {str(𝔛):30} --> {𝔜}")
+for 𝔜 in set𝔜:
+    print(f"    {str(𝔛_(𝔜.t)):30} --> {𝔜_(𝔜.ω_1, 𝔜.ω_2)}")
 
 # Plot result
 plt.figure("Simulation of function set representation")
 plt.grid(color="gray")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_1 for 𝔜 in set𝔜], "g", label="ω_1")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_2 for 𝔜 in set𝔜], "r", label="ω_2")
+plt.plot(set𝔜.t, set𝔜.ω_1, "g", label="ω_1")
+plt.plot(set𝔜.t, set𝔜.ω_2, "r", label="ω_2")
 plt.show()
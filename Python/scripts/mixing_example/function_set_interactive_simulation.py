@@ -11,7 +11,11 @@ onenote:https://d.docs.live.net/8e55450f976ac566/Notes/AI/Статьи.one#SWRS%
 Created 27.04.2018 author CAB
 """
 
+import matplotlib.pyplot as plt
 from tools.chart_recorder_2d import ChartRecorder2D
+from tools.event_engine import EventDrivenEngine, TickClock
+from tools.mixing_model import EarlierModel, JumpAhead
+from tools.state_columns import StateColumns
 
 
 # Script init
@@ -63,28 +67,26 @@ class 𝔈_:
      q_4 = 3,  # L/m
      ω_3 = 10) # g/l
 up_down_step = 1
+speed = 2.0 # Real time factor of ticks (model time per wall time), None to run as fast as possible
+segment_ticks = 100 # Number of ticks evaluated at once, model is re-evaluated only on parameters change
+drift_free_steps = False # True to count Earlier steps by t (floor((t - t_0) / Δt) + 1) and evaluate them by jump
+                         # ahead, False to count them by accumulated t as loop does (same printed rows as loop)
 
 # Model (Earlier)
-def F(Δt, 𝔛_0, 𝔜_0):
-    def eval(X, 𝔈):
-        t = 𝔛_0.t
-        ω_1 = 𝔜_0.ω_1
-        ω_2 = 𝔜_0.ω_2
-        while t <= X.t:
-            ω_1_m1 = ω_1
-            ω_2_m1 = ω_2
-            ω_1 = ω_1_m1 + Δt * (((𝔈.q_1 * 𝔈.ω_3) + (𝔈.q_2 * ω_2_m1) - (𝔈.q_3 * ω_1_m1)) / 𝔈.v_1)
-            ω_2 = ω_2 + Δt * (((𝔈.q_3 * ω_1_m1) - (𝔈.q_2 * ω_2_m1) - (𝔈.q_4 * ω_2_m1)) / 𝔈.v_2)
-            t += Δt
-        return 𝔜_(ω_1, ω_2)
-    return eval
+jump_ahead = JumpAhead()  # Transition matrices cache shared by all F_ instances
+class F_(EarlierModel): # Earlier model, see EarlierModel (loop resumed from last state or checkpoint of 𝔈)
+    def __init__(self, Δt, 𝔛_0, 𝔜_0, drift_free=False):
+        super().__init__(Δt, 𝔛_0.t, (𝔜_0.ω_1, 𝔜_0.ω_2), drift_free, jump_ahead=jump_ahead)
+        self.𝔛_0 = 𝔛_0
+        self.𝔜_0 = 𝔜_0
+    def __call__(self, X, 𝔈):
+        return 𝔜_(*self.eval_t(X.t, 𝔈))
 
 # Simulations
-def simulation(M, setX, 𝔈):
-    set𝔜 = []
-    for 𝔛 in setX:
-        𝔜 = M(𝔛, 𝔈)
-        set𝔜.append(𝔜)
+def simulation(M, set_t, 𝔈):
+    set𝔜 = StateColumns.allocate(len(set_t))
+    for i, t in enumerate(set_t):
+        set𝔜.set(i, t, *M.eval_t(t, 𝔈))
     return set𝔜
 
 # Chart
@@ -93,14 +95,13 @@ chart = ChartRecorder2D(
     lines=[("ω_1", "g"), ("ω_2", "r"), ("ω_3", "b--")],
     y_range=(0, 20),
     x_range=(0, 30),
-    pause=.05)
+    fps=25)
 
 # Helpers functions
 class Helpers:
-    def __init__(self, 𝔈_0, 𝔛_0, Δt, chart):
+    def __init__(self, 𝔈_0, Δt, chart):
         self.__input = ""
         self.__G = 𝔈_0
-        self.__X = 𝔛_0
         self.__Δt = Δt
         self.__chart = chart
         def on_key(key):
@@ -123,31 +124,26 @@ class Helpers:
             self.__G = 𝔈_(G.v_1, G.v_2, G.q_1, G.q_2, G.q_3, G.q_4, G.ω_3 - up_down_step)
             self.__input = ""
         return self.__G
-    def get_next_real_time(self):
-        self.__X = 𝔛_(self.__X.t + self.__Δt)
-        return self.__X
     def get_model(self, X_0, Y_0):
-        M = F(self.__Δt, X_0, Y_0)
+        M = F_(self.__Δt, X_0, Y_0, drift_free_steps)
         return M
     def show(self, X, Y):
         print(f"X = {X}, Y = {Y}, G = {self.__G}")
         self.__chart.append(x = X.t, ys = [Y.ω_1, Y.ω_2, self.__G.ω_3])
-H = Helpers(𝔈_0, 𝔛_0, Δt, chart)
+H = Helpers(𝔈_0, Δt, chart)
 
-# Interactive simulation (regard pseudo-code 4)
-G = H.get_parameters()
-X = 𝔛_0
-Y = 𝔜_0
-M = H.get_model(X, Y)
+# Interactive simulation (regard pseudo-code 4), event driven: model is evaluated only when parameters changed,
+# ticks between changes are served from precomputed segment and idle time spent in UI event loop
+def simulation_segment(set_t, 𝔈, t_0, ω_0):
+    return simulation(H.get_model(𝔛_(t_0), 𝔜_(*ω_0)), set_t, 𝔈)
+E = EventDrivenEngine(
+    simulation_segment, Δt, 𝔛_0.t, (𝔜_0.ω_1, 𝔜_0.ω_2), H.get_parameters(),
+    segment_ticks=segment_ticks,
+    clock=TickClock(Δt, speed, wait=plt.pause))
 while H.not_terminated():
-    t_real = H.get_next_real_time().t
-    𝔈 = H.get_parameters()
-    if 𝔈 != G:
-      M = H.get_model(X, Y)
-      G = 𝔈
-    X = 𝔛_(t_real)
-    Y = simulation(M, [X], G)[0]
-    H.show(X, Y)
+    E.set_parameters(H.get_parameters())
+    Y = E.next()
+    H.show(𝔛_(Y.t), Y)
 
 # Make chart stay shown
 chart.show()
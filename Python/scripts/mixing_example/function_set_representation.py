@@ -14,6 +14,8 @@ Created 27.04.2018 author CAB
 import math as m
 import numpy as np
 import matplotlib.pyplot as plt
+from tools.mixing_model import closed_form, parameter_table
+from tools.state_columns import StateColumns
 
 
 # Script init
@@ -67,27 +69,33 @@ def F(X, 𝔈):
     return 𝔜_(
         ω_1 = ((13.0 * em * q) / 21.0) - ((13.0 * ep * q) / 21.0) - (5.0 * em) - (5.0 * ep) + 10.0,
         ω_2 = -((5.0 * em * q) / 21.0) + ((5.0 * ep * q) / 21.0) + (5.0 * em) + (5.0 * ep) + 10.0)
+def F_batch(t, 𝔈s=None): # Vectorized F over float64 array of t, 𝔈s is optional array of 𝔈 rows (see PARAMETERS)
+    if 𝔈s is not None:
+        return closed_form(t, 𝔈s, ω_0=(.0, 20.0))
+    q = np.sqrt(105.0)
+    em = np.exp(((q - 15.0) * t) / 16.0)
+    ep = np.exp(-(((q + 15.0) * t) / 16.0))
+    ω_1 = ((13.0 * em * q) / 21.0) - ((13.0 * ep * q) / 21.0) - (5.0 * em) - (5.0 * ep) + 10.0
+    ω_2 = -((5.0 * em * q) / 21.0) + ((5.0 * ep * q) / 21.0) + (5.0 * em) + (5.0 * ep) + 10.0
+    return ω_1, ω_2
 
 # Simulations
-def simulation(setX, 𝔈):
-    set𝔜 = np.array([])
-    for 𝔛 in setX:
-        𝔜 = F(𝔛, 𝔈)
-        set𝔜 = np.append(set𝔜, [𝔜])
-    return set𝔜
+def simulation(set_t, 𝔈):
+    𝔈s = parameter_table([𝔈])[0]
+    ω_1, ω_2 = F_batch(set_t, 𝔈s)
+    return StateColumns(set_t, ω_1, ω_2, 𝔈=𝔈s)
 
 # Run simulation
-set𝔛 = np.vectorize(lambda t: 𝔛_(t))(np.arange(0.0, 10.1, 0.1))
-set𝔜 = simulation(set𝔛, 𝔈)
+set𝔜 = simulation(np.arange(0.0, 10.1, 0.1), 𝔈)
 
 # Print result
 print("Simulation result (𝔛 -> 𝔜): ")
-for [𝔛, 𝔜] in np.column_stack((set𝔛, set𝔜)):
-    print(f"    {str(𝔛):30} --> {𝔜}")
+for 𝔜 in set𝔜:
+    print(f"    {str(𝔛_(𝔜.t)):30} --> {𝔜_(𝔜.ω_1, 𝔜.ω_2)}")
 
 # Plot result
 plt.figure("Simulation of function set representation")
 plt.grid(color="gray")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_1 for 𝔜 in set𝔜], "g", label="ω_1")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_2 for 𝔜 in set𝔜], "r", label="ω_2")
+plt.plot(set𝔜.t, set𝔜.ω_1, "g", label="ω_1")
+plt.plot(set𝔜.t, set𝔜.ω_2, "r", label="ω_2")
 plt.show()
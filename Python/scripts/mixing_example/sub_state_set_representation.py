@@ -10,6 +10,9 @@ Created 27.04.2018 author CAB
 import math as m
 import numpy as np
 import matplotlib.pyplot as plt
+from tools.mixing_model import closed_form, rhs
+from tools.state_columns import StateColumns
+from tools.sub_state_store import SubStateStore
 
 
 # Script init
@@ -48,6 +51,10 @@ class 𝔖𝔛_q_:  # Sub-state, 𝔖 ⊆ 𝔜 is sub-stat value, 𝔛 ∈ 𝕏
         else:
             return f"𝔖^𝔛_q = 𝔖=[ω_2={self.ω_2}]^𝔛=[t={self.t}]_q=2"
 
+# Parameters
+𝔈s = np.array([4, 8, 3, 2, 5, 3, 10], dtype=np.float64)  # 𝔈 row [v_1, v_2, q_1, q_2, q_3, q_4, ω_3] of F solution
+interpolation_mode = None  # None to query only generated t, or "nearest", "linear", "hermite" to query any t
+
 # Function set model
 def F(X):
     q = m.sqrt(105.0)
@@ -56,41 +63,57 @@ def F(X):
     return 𝔜_(
         ω_1 = ((13.0 * em * q) / 21.0) - ((13.0 * ep * q) / 21.0) - (5.0 * em) - (5.0 * ep) + 10.0,
         ω_2 = -((5.0 * em * q) / 21.0) + ((5.0 * ep * q) / 21.0) + (5.0 * em) + (5.0 * ep) + 10.0)
+def F_batch(t, 𝔈s=None): # Vectorized F over float64 array of t, 𝔈s is optional array of 𝔈 rows (see PARAMETERS)
+    if 𝔈s is not None:
+        return closed_form(t, 𝔈s, ω_0=(.0, 20.0))
+    q = np.sqrt(105.0)
+    em = np.exp(((q - 15.0) * t) / 16.0)
+    ep = np.exp(-(((q + 15.0) * t) / 16.0))
+    ω_1 = ((13.0 * em * q) / 21.0) - ((13.0 * ep * q) / 21.0) - (5.0 * em) - (5.0 * ep) + 10.0
+    ω_2 = -((5.0 * em * q) / 21.0) + ((5.0 * ep * q) / 21.0) + (5.0 * em) + (5.0 * ep) + 10.0
+    return ω_1, ω_2
 
 # Generating of set of sub-states
 set𝔖X𝔈 = []
-for 𝔛 in [𝔛_(t) for t in np.round(np.arange(-15.0, 15.0, 0.1), 4)]:
-    𝔜 = F(𝔛)
+set_t = np.round(np.arange(-15.0, 15.0, 0.1), 4)
+set_ω_1, set_ω_2 = F_batch(set_t)
+for t, ω_1, ω_2 in zip(set_t, set_ω_1, set_ω_2):
+    𝔛 = 𝔛_(t)
+    𝔜 = 𝔜_(ω_1, ω_2)
     set𝔖X𝔈.append(𝔖𝔛_q_(𝔛, 𝔜, q=1))
     set𝔖X𝔈.append(𝔖𝔛_q_(𝔛, 𝔜, q=2))
+set_dω_1, set_dω_2 = rhs(set_ω_1, set_ω_2, 𝔈s)
+store𝔖X𝔈 = SubStateStore()  # Indexed set 𝔖^X|𝔈 used by simulation
+store𝔖X𝔈.extend(set_t, set_ω_1, q=1, dωs=set_dω_1)
+store𝔖X𝔈.extend(set_t, set_ω_2, q=2, dωs=set_dω_2)
 print("Generated set 𝔖^X|𝔈:")
 for 𝔖𝔛_q in set𝔖X𝔈: print("    "+ str(𝔖𝔛_q))
+print("Estimated interpolation error of 𝔖^X|𝔈:")
+for mode in SubStateStore.MODES:
+    print(f"    {mode:10} q=1: {store𝔖X𝔈.error_bound(1, mode):.3e}, q=2: {store𝔖X𝔈.error_bound(2, mode):.3e}")
 
 
 # Simulation function
-def simulation(set𝔛):
-    set𝔜 = []
-    for 𝔛 in set𝔛:
-        𝔖𝔛_1 = None
-        𝔖𝔛_2 = None
-        for 𝔖𝔛_q in set𝔖X𝔈:
-            if 𝔖𝔛_q.t == 𝔛.t and 𝔖𝔛_q.q == 1: 𝔖𝔛_1 = 𝔖𝔛_q
-            if 𝔖𝔛_q.t == 𝔛.t and 𝔖𝔛_q.q == 2: 𝔖𝔛_2 = 𝔖𝔛_q
-        set𝔜.append(𝔜_(𝔖𝔛_1.ω_1, 𝔖𝔛_2.ω_2))
-    return set𝔜
+def simulation(set_t):
+    if interpolation_mode is None:
+        return StateColumns(set_t, store𝔖X𝔈.lookup(set_t, q=1), store𝔖X𝔈.lookup(set_t, q=2))
+    else:
+        return StateColumns(
+            set_t,
+            store𝔖X𝔈.interpolate(set_t, q=1, mode=interpolation_mode),
+            store𝔖X𝔈.interpolate(set_t, q=2, mode=interpolation_mode))
 
 # Run simulation
-set𝔛 = np.vectorize(lambda t: 𝔛_(t))(np.round(np.arange(0.0, 10.1, 0.1), 4))
-set𝔜 = simulation(set𝔛)
+set𝔜 = simulation(np.round(np.arange(0.0, 10.1, 0.1), 4))
 
 # Print result
 print("Simulation result (𝔛 -> 𝔜): ")
-for [𝔛, 𝔜] in np.column_stack((set𝔛, set𝔜)):
-    print(f"    {str(𝔛):30} --> {𝔜}")
+for 𝔜 in set𝔜:
+    print(f"    {str(𝔛_(𝔜.t)):30} --> {𝔜_(𝔜.ω_1, 𝔜.ω_2)}")
 
 # Plot result
 plt.figure("Simulation of function set representation")
 plt.grid(color="gray")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_1 for 𝔜 in set𝔜], "g", label="ω_1")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_2 for 𝔜 in set𝔜], "r", label="ω_2")
+plt.plot(set𝔜.t, set𝔜.ω_1, "g", label="ω_1")
+plt.plot(set𝔜.t, set𝔜.ω_2, "r", label="ω_2")
 plt.show()
@@ -11,9 +11,14 @@ onenote:https://d.docs.live.net/8e55450f976ac566/Notes/AI/Статьи.one#SWRS%
 Created 24.07.2018 author CAB
 """
 
+from collections import deque
 import matplotlib.pyplot as plt
 from tools.graph_visualisation import NodeLike, GraphLike, GraphVisualisation
 from tools.chart_recorder_2d import ChartRecorder2D
+from tools.event_engine import EventDrivenEngine, TickClock
+from tools.headless_recorder import HeadlessChartRecorder, HeadlessGraphVisualisation
+from tools.shared_channel import ChartPublisher, GraphPublisher
+from tools.state_columns import StateColumns
 
 # Script init
 print(""" 
@@ -29,13 +34,6 @@ class b𝔛_:
         self.t = t
     def __repr__(self):
         return f"𝔛 = [t={self.t}]"
-class h𝔜_:
-    def __init__(self, ω_1, ω_2, ω_3):
-        self.ω_1 = ω_1
-        self.ω_2 = ω_2
-        self.ω_3 = ω_3
-    def __repr__(self):
-        return f"𝔜 = [ω_1={self.ω_1}, ω_2={self.ω_2}]"
 class 𝔈_:
     def __init__(self, v_1, v_2, q_1, q_2, q_3, q_4):
         self.v_1 = v_1
@@ -96,6 +94,8 @@ class S_(NodeLike): # Represent S (variable) node that holds sub-state 𝔖𝔛q
         self.d = d
         self.w = w
         self.S = None
+        self.consumers = [] # Θ𝔓 which take this S as input
+        self.on_assign = None # Callback S -> None, called after S assigned
         if Θ𝔓 is not None:
             Θ𝔓.set_S(self)
     def is_defined(self):
@@ -104,8 +104,12 @@ class S_(NodeLike): # Represent S (variable) node that holds sub-state 𝔖𝔛q
         assert 𝔖𝔛q is not None
         assert 𝔖𝔛q.q == self.w
         self.S = 𝔖𝔛q
+        if self.on_assign is not None:
+            self.on_assign(self)
     def get(self):
         return self.S
+    def reset(self):
+        self.S = None
     def graph_repr(self):
         label = f"S_{self.d},{self.w}"
         pos = (self.d, self.w)
@@ -128,6 +132,9 @@ class Θ𝔓_: # A transaction function
         self.𝔓_h  = 𝔓_h
         self.f_ω = f_ω
         self.gS = None
+        S_1.consumers.append(self)
+        S_2.consumers.append(self)
+        S_3.consumers.append(self)
     def set_S(self, gS):
         assert self.S_1.d == (gS.d - 1)
         assert self.S_2.d == (gS.d - 1)
@@ -165,25 +172,39 @@ class Γ𝔈_graph(GraphLike):
             assert not S.is_defined()
         self.setS = setS
         self.setΘ_𝔓 = setΘ_𝔓
+        self.indexS = {(S.d, S.w): S for S in setS}
+        self.ready = deque() # Θ_𝔓 which input was assigned since last eval (push based propagation)
+        self.depth = 0 # Depth of last evaluated layer
+        for S in setS:
+            S.on_assign = self.on_assign
+    def on_assign(self, S):
+        self.ready.extend(S.consumers)
+        if S.w != 3 and S.d > self.depth:
+            self.depth = S.d
     def init(self, p𝔖):
         for (d, w), 𝔖𝔛_q in p𝔖.items():
-            for S in self.setS:
-                if S.d == d and S.w == w:
-                    S.assign(𝔖𝔛_q)
+            self.indexS[(d, w)].assign(𝔖𝔛_q)
+    def reset(self, d): # Undefine sub-states evaluated after depth d (S_1, S_2 of depth > d and S_3 of depth >= d)
+        for k in range(d, self.depth + 1):
+            for w in ((3,) if k == d else (1, 2, 3)):
+                if (k, w) in self.indexS:
+                    self.indexS[(k, w)].reset()
+        self.depth = min(self.depth, d)
+        self.ready.clear()
     def eval(self):
-        do_eval = True
         set𝔖𝔛_q = [] # Set of 𝔖^𝔛_q evolved in this iteration
-        while do_eval:
-            do_eval = False
-            for Θ_𝔓 in self.setΘ_𝔓:
-                𝔖𝔛_q = Θ_𝔓.eval()
-                if 𝔖𝔛_q is not None:
-                    do_eval = True
-                    set𝔖𝔛_q.append(𝔖𝔛_q)
-                    self.redraw()
+        while self.ready:
+            𝔖𝔛_q = self.ready.popleft().eval()
+            if 𝔖𝔛_q is not None:
+                set𝔖𝔛_q.append(𝔖𝔛_q)
+                self.redraw()
         return set𝔖𝔛_q
     def graph_repr(self):
         return self.setS
+    def graph_repr_window(self, d_min, d_max):
+        return [self.indexS[(d, w)] for d in range(d_min, d_max + 1) for w in (1, 2, 3) if (d, w) in self.indexS]
+    def frontier(self):
+        return self.depth
     def __repr__(self):
         rs = "Γ^|𝔈: \n"
         for Θ_𝔓 in self.setΘ_𝔓: rs = rs + f"    {str(Θ_𝔓)}\n"
@@ -211,6 +232,64 @@ def build_interactive_Γ𝔈(n, 𝔈, S_transition):
         S_1 = gS_1
         S_2 = gS_2
     return Γ𝔈_graph(setS, setΘ_𝔓), setS_3
+class RollingΓ𝔈_graph(Γ𝔈_graph): # Lazy Γ^|𝔈, depth d + 1 is built when depth d complete, last window layers retained
+    def __init__(self, 𝔈, S_transition, window, sink=None):
+        assert window >= 2, "window should retain at least 2 layers (current and next)"
+        self.window = window
+        self.sink = sink # Optional callback [𝔖𝔛_q] -> None, take sub-states of evicted layer
+        self._𝔓_1 = 𝔓_h_(𝔈, h=1)
+        self._𝔓_2 = 𝔓_h_(𝔈, h=2)
+        self.f_ω_1, self.f_ω_2 = S_transition()
+        S_1 = S_(Θ𝔓=None, d=0, w=1)
+        S_2 = S_(Θ𝔓=None, d=0, w=2)
+        self.layers = deque([[S_1, S_2]]) # Retained layers of S, [S_1, S_2, S_3] for each depth d
+        super().__init__(deque([S_1, S_2]), deque())
+    def on_assign(self, S):
+        super().on_assign(S)
+        layer = self.layers[-1]
+        if S.w != 3 and S.d == layer[0].d and layer[0].is_defined() and layer[1].is_defined():
+            self.grow()
+    def grow(self):
+        S_1, S_2 = self.layers[-1]
+        S_3 = S_(Θ𝔓=None, d=S_1.d, w=3)
+        Θ_𝔓_1 = Θ𝔓_(S_1, S_2, S_3, self._𝔓_1, f_ω=self.f_ω_1)
+        Θ_𝔓_2 = Θ𝔓_(S_1, S_2, S_3, self._𝔓_2, f_ω=self.f_ω_2)
+        gS_1 = S_(Θ_𝔓_1, d=S_1.d + 1, w=1)
+        gS_2 = S_(Θ_𝔓_2, d=S_1.d + 1, w=2)
+        for S in [S_3, gS_1, gS_2]:
+            S.on_assign = self.on_assign
+            self.indexS[(S.d, S.w)] = S
+        self.layers[-1].append(S_3)
+        self.layers.append([gS_1, gS_2])
+        self.setS.extend([S_3, gS_1, gS_2])
+        self.setΘ_𝔓.extend([Θ_𝔓_1, Θ_𝔓_2])
+        while len(self.layers) > self.window and all(S.is_defined() for S in self.layers[0]):
+            self.evict()
+    def reset(self, d): # Also drop layers grown after depth d + 1
+        assert d >= self.layers[0][0].d, f"Depth {d} is already evicted"
+        while self.layers[-1][0].d > d + 1:
+            for S in self.layers.pop() + [self.layers[-1].pop()]:
+                self.setS.pop()
+                del self.indexS[(S.d, S.w)]
+            self.setΘ_𝔓.pop()
+            self.setΘ_𝔓.pop()
+            for S in self.layers[-1]:
+                S.consumers = []
+        super().reset(d)
+    def evict(self):
+        layer = self.layers.popleft()
+        for S in layer:
+            self.setS.popleft()
+            del self.indexS[(S.d, S.w)]
+            S.consumers = []
+        self.setΘ_𝔓.popleft()
+        self.setΘ_𝔓.popleft()
+        for S in self.layers[0][:2]: # Oldest retained depth become root of graph
+            S.Θ𝔓 = None
+        if self.sink is not None:
+            self.sink([S.get() for S in layer])
+    def next_S_3(self):
+        return self.layers[-2][2]
 
 # Parameters
 𝔈 = 𝔈_(
@@ -221,12 +300,21 @@ def build_interactive_Γ𝔈(n, 𝔈, S_transition):
      q_3 = 5,  # L/m
      q_4 = 3)  # L/m
 n = 100
+rolling_window = None # None to build all n layers up front, or number of retained layers to run without horizon
+graph_depth_window = None # None to draw whole Γ graph, or number of layers drawn around evaluation frontier
+record_path = None # None to show UI, or path prefix to record chart and graph headless (runs n steps, no keys),
+                   # recorded run can be rendered to video by tools.offline_renderer
+viewer_processes = False # True to show chart and graph in viewer processes over shared memory (runs n steps, no keys)
 Δt = .1
 p𝔖 = {
     (0,1): 𝔖𝔛_q_(t=.0, ω=0, q=1),    #State for S_d=0,w=1
     (0,2): 𝔖𝔛_q_(t=.0, ω=20, q=2)}   #State for S_d=0,w=2
 init_ω_3 = 10.0
 up_down_step = 1
+speed = None # None to pace ticks by UI pauses, or real time factor of ticks (model time per wall time), UI is then
+             # repainted with fps cap and idle time between ticks spent in UI event loop
+segment_ticks = 10 # Number of ticks (layers) evaluated ahead at once, layers are evaluated again only on ω_3 change,
+                   # with rolling window should be at most rolling_window - 2
 
 # Transition implementation
 def S_transition():
@@ -237,17 +325,43 @@ def S_transition():
     return f_ω_1, f_ω_2
 
 # Build Γ^|𝔈
-Γ𝔈, setS_3 = build_interactive_Γ𝔈(n, 𝔈, S_transition)
+if rolling_window is None:
+    Γ𝔈, setS_3 = build_interactive_Γ𝔈(n, 𝔈, S_transition)
+else:
+    Γ𝔈 = RollingΓ𝔈_graph(𝔈, S_transition, rolling_window)
 print(Γ𝔈)
-graph_viz = GraphVisualisation("Γ_graph", Γ𝔈, pause=.05)
+if viewer_processes:
+    graph_viz = GraphPublisher("Γ_graph", Γ𝔈)
+    graph_viz.start_viewer(depth_window=graph_depth_window, summary=True)
+elif record_path is None:
+    graph_viz = GraphVisualisation(
+        "Γ_graph", Γ𝔈, pause=.05, fps=None if speed is None else 25, depth_window=graph_depth_window, summary=True)
+else:
+    graph_viz = HeadlessGraphVisualisation("Γ_graph", Γ𝔈, record_path + "_graph.npz", record_states=True)
 
 # Chart
-chart = ChartRecorder2D(
-    "Simulation for ω_1 and ω_1 with variable ω_3",
-    lines=[("ω_1", "g"), ("ω_2", "r"), ("ω_3", "b--")],
-    y_range=(0, 20),
-    x_range=(0, 10),
-    pause=.05)
+if viewer_processes:
+    chart = ChartPublisher(
+        "Simulation for ω_1 and ω_1 with variable ω_3",
+        lines=[("ω_1", "g"), ("ω_2", "r"), ("ω_3", "b--")],
+        y_range=(0, 20),
+        x_range=(0, 10))
+    chart.start_viewer()
+elif record_path is None:
+    chart = ChartRecorder2D(
+        "Simulation for ω_1 and ω_1 with variable ω_3",
+        lines=[("ω_1", "g"), ("ω_2", "r"), ("ω_3", "b--")],
+        y_range=(0, 20),
+        x_range=(0, 10),
+        pause=.05,
+        fps=None if speed is None else 25)
+else:
+    chart = HeadlessChartRecorder(
+        "Simulation for ω_1 and ω_1 with variable ω_3",
+        lines=[("ω_1", "g"), ("ω_2", "r"), ("ω_3", "b--")],
+        path=record_path + "_chart.npz",
+        y_range=(0, 20),
+        x_range=(0, 10))
 
 # Helpers functions
 class Interaction:
@@ -261,44 +375,74 @@ class Interaction:
             print(f"Pressed key = {key}")
             self.input = key
         chart.on_kay_press(on_key)
-    def next_𝔖𝔛_3(self, i):
-        t = i * self.Δt
+    def not_terminated(self):
+        if self.input == "e":
+            self.input = ""
+            print("Program ended!")
+            return False
+        else:
+            return True
+    def get_ω_3(self):
         if self.input == "up":
             self.ω_3 += self.up_down_step
             self.input = ""
         if self.input == "down":
             self.ω_3 -= self.up_down_step
             self.input = ""
-        return 𝔖𝔛_q_(t, self.ω_3, q=3)
+        return self.ω_3
     def show(self, X, Y):
         print(f"X = {X}, Y = {Y}")
         self.chart.append(x = X.t, ys = [Y.ω_1, Y.ω_2, Y.ω_3])
 I = Interaction(Δt, init_ω_3, up_down_step, chart)
+clock = TickClock(Δt, speed if record_path is None and not viewer_processes else None, wait=plt.pause)
 
-# Interactive simulation
+# Interactive simulation, event driven: Γ^|𝔈 is evaluated ahead for segment of ticks (layers) and ticks are served
+# from it, on ω_3 change layers evaluated ahead are reset and evaluated again from last served tick
+assert rolling_window is None or segment_ticks <= rolling_window - 2, "segment should fit in rolling window"
 Γ𝔈.init(p𝔖)
-i = 0
-while i < n:
-    S_3 = setS_3[i]
-    assert S_3.d == i
-    assert S_3.w == 3
-    assert not S_3.is_defined()
-    𝔖𝔛_3 = I.next_𝔖𝔛_3(i)
-    S_3.assign(𝔖𝔛_3)
-    graph_viz.update()
-    set𝔖𝔛_q = Γ𝔈.eval()
-    assert len(set𝔖𝔛_q) == 2, f"Not all 𝔖𝔛_q evaluated, set𝔖𝔛_q = {set𝔖𝔛_q}"
-    𝔖𝔛_1 = None
-    𝔖𝔛_2 = None
-    for 𝔖𝔛_q in set𝔖𝔛_q:
-        if 𝔖𝔛_q.q == 1:
-            𝔖𝔛_1 = 𝔖𝔛_q
-        if 𝔖𝔛_q.q == 2:
-            𝔖𝔛_2 = 𝔖𝔛_q
-    X = b𝔛_(𝔖𝔛_3.t_real)
-    Y = h𝔜_(𝔖𝔛_1.ω_1, 𝔖𝔛_2.ω_2, 𝔖𝔛_3.ω_3)
-    I.show(X, Y)
+set𝔜 = StateColumns.allocate(n, with_ω_3=True) # Last n rows when run with rolling window
+i = 0 # Number of served ticks, tick i assigns S_3 of depth i
+def simulation_segment(set_t, ω_3, t_0, ω_0): # Ticks from origin state are layers from last served one
+    Γ𝔈.reset(i)
+    rows = StateColumns.allocate(len(set_t), with_ω_3=True)
+    for j in range(len(set_t)):
+        d = i + j
+        if rolling_window is None and d == n:
+            return rows[:j]
+        S_3 = setS_3[d] if rolling_window is None else Γ𝔈.next_S_3()
+        assert S_3.d == d
+        assert S_3.w == 3
+        assert not S_3.is_defined()
+        𝔖𝔛_3 = 𝔖𝔛_q_(d * Δt, ω_3, q=3)
+        S_3.assign(𝔖𝔛_3)
+        graph_viz.update()
+        set𝔖𝔛_q = Γ𝔈.eval()
+        assert len(set𝔖𝔛_q) == 2, f"Not all 𝔖𝔛_q evaluated, set𝔖𝔛_q = {set𝔖𝔛_q}"
+        𝔖𝔛_1 = None
+        𝔖𝔛_2 = None
+        for 𝔖𝔛_q in set𝔖𝔛_q:
+            if 𝔖𝔛_q.q == 1:
+                𝔖𝔛_1 = 𝔖𝔛_q
+            if 𝔖𝔛_q.q == 2:
+                𝔖𝔛_2 = 𝔖𝔛_q
+        rows.set(j, 𝔖𝔛_3.t_real, 𝔖𝔛_1.ω_1, 𝔖𝔛_2.ω_2, 𝔖𝔛_3.ω_3)
+    return rows
+E = EventDrivenEngine(
+    simulation_segment, Δt, p𝔖[(0,1)].t, (p𝔖[(0,1)].ω_1, p𝔖[(0,2)].ω_2), I.get_ω_3(),
+    segment_ticks=segment_ticks,
+    clock=clock)
+while (i < n) if rolling_window is None or record_path is not None or viewer_processes else I.not_terminated():
+    E.set_parameters(I.get_ω_3())
+    Y = E.next()
+    set𝔜.set(i % n, Y.t, Y.ω_1, Y.ω_2, Y.ω_3)
+    I.show(b𝔛_(Y.t), set𝔜[i % n])
     i += 1
 
 #Show plots
-plt.show()
+if viewer_processes:
+    chart.show()
+    graph_viz.show()
+elif record_path is None:
+    plt.show()
+else:
+    print(f"Recorded: {chart.show() + graph_viz.show()}")
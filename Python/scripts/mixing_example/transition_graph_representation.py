@@ -13,8 +13,11 @@ Created 13.06.2018 author CAB
 
 import numpy as np
 import matplotlib.pyplot as plt
-import math as m
 from tools.graph_visualisation import NodeLike, GraphLike, GraphVisualisation
+from tools.compact_graph import CompactGraph
+from tools.mixing_model import JumpAhead
+from tools.state_columns import StateColumns
+from tools.sub_state_store import SubStateStore
 
 
 # Script init
@@ -153,15 +156,38 @@ class Γ𝔈_graph(GraphLike):
             assert not S.is_defined()
         self.setS = setS
         self.setΘ_𝔓 = setΘ_𝔓
+        self.indexS = {(S.d, S.w): S for S in setS}
+        self.plan = self.schedule(setΘ_𝔓)
+    @staticmethod
+    def schedule(setΘ_𝔓): # Compile level ordered (topological) execution plan [[Θ_𝔓 of level]] from Θ -> S edges
+        consumers = {}
+        n_inputs = {}
+        for Θ_𝔓 in setΘ_𝔓:
+            inputs = [S for S, _ in Θ_𝔓.graph_repr_edges() if S.Θ𝔓 is not None]
+            n_inputs[Θ_𝔓] = len(inputs)
+            for S in inputs:
+                consumers.setdefault(S, []).append(Θ_𝔓)
+        level = [Θ_𝔓 for Θ_𝔓 in setΘ_𝔓 if n_inputs[Θ_𝔓] == 0]
+        plan = []
+        while level:
+            plan.append(level)
+            next_level = []
+            for Θ_𝔓 in level:
+                for consumer in consumers.get(Θ_𝔓.gS, []):
+                    n_inputs[consumer] -= 1
+                    if n_inputs[consumer] == 0:
+                        next_level.append(consumer)
+            level = next_level
+        assert sum(len(level) for level in plan) == len(setΘ_𝔓), "Γ graph should not have cycles"
+        return plan
     def γ(self, p𝔖):
         for (d, w), 𝔖𝔛_q in p𝔖.items():
-            for S in self.setS:
-                if S.d == d and S.w == w:
-                    S.assign(𝔖𝔛_q)
-        while False in [S.is_defined() for S in self.setS]:
-            for Θ_𝔓 in self.setΘ_𝔓:
+            self.indexS[(d, w)].assign(𝔖𝔛_q)
+        for level in self.plan:
+            for Θ_𝔓 in level:
                 if Θ_𝔓.eval():
                     self.redraw()
+        assert all(S.is_defined() for S in self.setS), "Not all S defined, p𝔖 should define all source S"
         return γ𝔈_graph(self.setS, self.setΘ_𝔓)
     def graph_repr(self):
         return self.setS
@@ -192,7 +218,7 @@ def build_Γ𝔈(n, Δt, 𝔈, X_transition, S_transition):
     _𝔓_1 = 𝔓_h_(𝔈, h=1)
     _𝔓_2 = 𝔓_h_(𝔈, h=2)
     f_t = X_transition(Δt)
-    f_ω_1, f_ω_2 = S_transition()
+    f_ω_1, f_ω_2 = S_transition(𝔈)
     S_1 = S_(Θ𝔓=None, d=0, w=1)
     S_2 = S_(Θ𝔓=None, d=0, w=2)
     setS = [S_1, S_2]
@@ -208,6 +234,20 @@ def build_Γ𝔈(n, Δt, 𝔈, X_transition, S_transition):
         S_2 = gS_2
     set𝔓 = [_𝔓_1, _𝔓_2]
     return Γ𝔈_graph(setS, setΘ_𝔓)
+def build_compact_Γ𝔈(n, Δt, 𝔈, X_transition, S_transition, rate_2=1): # Array backed Γ^|𝔈, S_d,w values in (d, w) arrays
+    _𝔓_1 = 𝔓_h_(𝔈, h=1)
+    _𝔓_2 = 𝔓_h_(𝔈, h=2)
+    f_t = X_transition(Δt)
+    f_t_2 = X_transition(rate_2 * Δt)
+    f_ω_1, f_ω_2 = S_transition(𝔈)
+    def Θ_𝔓_1(ω, t): # ω, t of input S_d-1,1 and S_d-1,2
+        t_next = f_t(t[0])
+        return t_next, f_ω_1(ω[0], ω[1], t[0], t_next, _𝔓_1)
+    def Θ_𝔓_2(ω, t): # ω, t of input S_d-k,1 and S_d-k,2 for rate k of S_d,2
+        t_next = f_t_2(t[0])
+        return t_next, f_ω_2(ω[0], ω[1], t[0], t_next, _𝔓_2)
+    return CompactGraph(
+        n, width=2, edges={1: (1, 2), 2: (1, 2)}, transitions={1: Θ_𝔓_1, 2: Θ_𝔓_2}, rates={2: rate_2})
 
 # Parameters
 𝔈 = 𝔈_(
@@ -224,24 +264,22 @@ p𝔖 = {
     (0,1): 𝔖𝔛_q_(t=.0, ω=0, q=1),    #State for S_d=0,w=1
     (0,2): 𝔖𝔛_q_(t=.0, ω=20, q=2)}   #State for S_d=0,w=2
 use_earlier_transition_function = True
+use_compact_graph = False
+tank_2_rate = 1 # Compact graph only: S_d,2 (slow tank 2) evaluated every k layers and interpolated between, k divides n
 
 # Transition implementation
 def X_transition(Δt):
     def f_t(t):
         return np.round(t + Δt, 4)
     return f_t
-def S_functional_transition():
-    q = m.sqrt(105.0)
-    def em(t):
-        return m.exp(((q - 15.0) * t) / 16.0)
-    def ep(t):
-        return m.exp(-(((q + 15.0) * t) / 16.0))
+def S_functional_transition(𝔈): # Exact step ω(t) = e^(M(t - t_prev))ω(t_prev) for given 𝔈
+    jump = JumpAhead()
     def f_ω_1(ω_1, ω_2, t_prev, t, 𝔓_1):
-        return ((13.0 * em(t) * q) / 21.0) - ((13.0 * ep(t) * q) / 21.0) - (5.0 * em(t)) - (5.0 * ep(t)) + 10.0
+        return jump.exact(𝔈, t - t_prev, (ω_1, ω_2))[0]
     def f_ω_2(ω_1, ω_2, t_prev, t, 𝔓_2):
-        return -((5.0 * em(t) * q) / 21.0) + ((5.0 * ep(t) * q) / 21.0) + (5.0 * em(t)) + (5.0 * ep(t)) + 10.0
+        return jump.exact(𝔈, t - t_prev, (ω_1, ω_2))[1]
     return f_ω_1, f_ω_2
-def S_earlier_transition():
+def S_earlier_transition(𝔈): # Uses only 𝔓_h parts of 𝔈 given to transitions
     def f_ω_1(ω_1, ω_2, t, t_next, 𝔓_1):
         return ω_1 + (t_next - t) * (((𝔓_1.q_1 * 𝔓_1.ω_3) + (𝔓_1.q_2 * ω_2) - (𝔓_1.q_3 * ω_1)) / 𝔓_1.v_1)
     def f_ω_2(ω_1, ω_2, t, t_next, 𝔓_2):
@@ -249,46 +287,47 @@ def S_earlier_transition():
     return f_ω_1, f_ω_2
 
 # Build Γ^|𝔈
-if use_earlier_transition_function:
-    Γ𝔈 = build_Γ𝔈(n, Δt, 𝔈, X_transition, S_earlier_transition)
+assert tank_2_rate == 1 or use_compact_graph, "tank_2_rate supported only with use_compact_graph = True"
+assert n % tank_2_rate == 0, f"tank_2_rate should divide n = {n}, got {tank_2_rate}"
+S_transition = S_earlier_transition if use_earlier_transition_function else S_functional_transition
+if use_compact_graph:
+    Γ𝔈 = build_compact_Γ𝔈(n, Δt, 𝔈, X_transition, S_transition, rate_2=tank_2_rate)
 else:
-    Γ𝔈 = build_Γ𝔈(n, Δt, 𝔈, X_transition, S_functional_transition)
+    Γ𝔈 = build_Γ𝔈(n, Δt, 𝔈, X_transition, S_transition)
 print(Γ𝔈)
 graph_viz = GraphVisualisation("Γ_graph", Γ𝔈, pause=.05)
 
 # Eval γ^|𝔈 for given 𝔖' and get 𝔖^X|𝔈 set
-γ𝔈 = Γ𝔈.γ(p𝔖)
-print(γ𝔈)
-set𝔖X𝔈 = γ𝔈.𝔖()
-print("Set 𝔖^X|𝔈 gotten from γ^|𝔈:")
-for 𝔖X𝔈 in set𝔖X𝔈: print("    " + str(𝔖X𝔈))
+if use_compact_graph:
+    γ𝔈 = Γ𝔈.γ({dw: (𝔖𝔛_q.t, getattr(𝔖𝔛_q, f"ω_{𝔖𝔛_q.q}")) for dw, 𝔖𝔛_q in p𝔖.items()})
+    print(γ𝔈)
+    store𝔖X𝔈 = SubStateStore()  # Indexed set 𝔖^X|𝔈 used by simulation
+    store𝔖X𝔈.extend(*γ𝔈.column(1), q=1)
+    store𝔖X𝔈.extend(*γ𝔈.column(2), q=2)
+else:
+    γ𝔈 = Γ𝔈.γ(p𝔖)
+    print(γ𝔈)
+    set𝔖X𝔈 = γ𝔈.𝔖()
+    print("Set 𝔖^X|𝔈 gotten from γ^|𝔈:")
+    for 𝔖X𝔈 in set𝔖X𝔈: print("    " + str(𝔖X𝔈))
+    store𝔖X𝔈 = SubStateStore.from_sub_states(set𝔖X𝔈)  # Indexed set 𝔖^X|𝔈 used by simulation
 
 # Simulation function
-def simulation(set𝔛):
-    set𝔜 = []
-    for 𝔛 in set𝔛:
-        𝔖𝔛_1 = None
-        𝔖𝔛_2 = None
-        for 𝔖𝔛_q in set𝔖X𝔈:
-            if 𝔖𝔛_q.t == 𝔛.t and 𝔖𝔛_q.q == 1:
-                𝔖𝔛_1 = 𝔖𝔛_q
-            if 𝔖𝔛_q.t == 𝔛.t and 𝔖𝔛_q.q == 2:
-                𝔖𝔛_2 = 𝔖𝔛_q
-        set𝔜.append(h𝔜_(𝔖𝔛_1.ω_1, 𝔖𝔛_2.ω_2))
-    return set𝔜
+def simulation(set_t):
+    ω_2 = store𝔖X𝔈.lookup(set_t, q=2) if tank_2_rate == 1 else store𝔖X𝔈.interpolate(set_t, q=2)
+    return StateColumns(set_t, store𝔖X𝔈.lookup(set_t, q=1), ω_2)
 
 # Run simulation
-set𝔛 = np.vectorize(lambda t: b𝔛_(t))(np.round(np.arange(0.0, (n + 1) * Δt, Δt), 4))
-set𝔜 = simulation(set𝔛)
+set𝔜 = simulation(np.round(np.arange(0.0, (n + 1) * Δt, Δt), 4))
 
 # Print result
 print("Simulation result (𝔛 -> 𝔜): ")
-for [𝔛, 𝔜] in np.column_stack((set𝔛, set𝔜)):
-    print(f"    {str(𝔛):30} --> {𝔜}")
+for 𝔜 in set𝔜:
+    print(f"    {str(b𝔛_(𝔜.t)):30} --> {h𝔜_(𝔜.ω_1, 𝔜.ω_2)}")
 
 # Plot result
 plt.figure("Simulation of function set representation")
 plt.grid(color="gray")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_1 for 𝔜 in set𝔜], "g", label="ω_1")
-plt.plot([𝔛.t for 𝔛 in set𝔛], [𝔜.ω_2 for 𝔜 in set𝔜], "r", label="ω_2")
+plt.plot(set𝔜.t, set𝔜.ω_1, "g", label="ω_1")
+plt.plot(set𝔜.t, set𝔜.ω_2, "r", label="ω_2")
 plt.show()
@@ -10,10 +10,269 @@ Plotting of points and react on keyboard input
 Created 09.06.2018 author CAB
 """
 
-from typing import Callable, List, Tuple
+from typing import Callable, List, Optional, Tuple
+from collections import deque
+import time
+import numpy as np
 import matplotlib.pyplot as plt
 
 # Definitions
+def _bucket_min_max(values: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Indexes of min and max of each bucket of k consecutive values for each row, last bucket can be partial
+    r, m = values.shape
+    nb = m // k
+    full = values[:, :nb * k].reshape(r, nb, k)
+    offsets = np.arange(nb, dtype=np.int64) * k
+    mins = np.argmin(full, axis=2) + offsets
+    maxs = np.argmax(full, axis=2) + offsets
+    if m % k:
+        rest = values[:, nb * k:]
+        mins = np.concatenate([mins, np.argmin(rest, axis=1)[:, None] + nb * k], axis=1)
+        maxs = np.concatenate([maxs, np.argmax(rest, axis=1)[:, None] + nb * k], axis=1)
+    return mins, maxs
+
+class SeriesBuffer:
+    '''
+    Columns X and Y of each line in preallocated NumPy buffer, growable or fixed capacity ring (scrolling mode),
+    with running min/max of each column (O(1) amortized per append, NaN values are ignored).
+    '''
+
+    def __init__(self, n_lines: int, max_points: Optional[int] = None, initial_capacity: int = 1024):
+        '''
+        Construct a empty buffer
+        :param n_lines: number of Y columns
+        :param max_points: if given buffer keep only last max_points points (ring buffer), else grows unlimited
+        :param initial_capacity: initial capacity of growable buffer
+        '''
+        # Parameters
+        self.__n_columns = 1 + n_lines
+        self.__max_points = max_points
+        # Fields
+        self.__n = 0  # Number of stored points
+        self.__start = 0  # Position of oldest point
+        self.__count = 0  # Total number of appended points
+        self.__x_sorted = True  # X values non decreasing, so decimation by X range can be used
+        self.__last_x = -np.inf
+        self.__levels = []  # Pyramid of growable buffer, [min indexes, max indexes, count] for buckets of 2^L points
+        if max_points is None:
+            self.__data = np.empty((self.__n_columns, max(initial_capacity, 1)))
+            self.__mins = np.full(self.__n_columns, np.nan)
+            self.__maxs = np.full(self.__n_columns, np.nan)
+        else:
+            # Each point written twice (at i and i + max_points) so last points always are contiguous slice
+            self.__data = np.empty((self.__n_columns, 2 * max_points))
+            self.__min_deques = [deque() for _ in range(self.__n_columns)]  # Monotonic deques of (count, value)
+            self.__max_deques = [deque() for _ in range(self.__n_columns)]
+
+    @classmethod
+    def from_arrays(cls, xs: np.ndarray, yss: List[np.ndarray]) -> 'SeriesBuffer':
+        '''
+        Construct growable buffer holding given columns (copied), e.g. series loaded from file
+        :param xs: X column
+        :param yss: list of Y column for each line
+        :return: SeriesBuffer
+        '''
+        n = len(xs)
+        buffer = cls(len(yss), initial_capacity=max(n, 1))
+        buffer.__data[0, :n] = xs
+        for i, ys in enumerate(yss):
+            buffer.__data[1 + i, :n] = ys
+        buffer.__n = n
+        buffer.__count = n
+        if n > 0:
+            buffer.__mins = np.fmin.reduce(buffer.__data[:, :n], axis=1)
+            buffer.__maxs = np.fmax.reduce(buffer.__data[:, :n], axis=1)
+            buffer.__x_sorted = bool(np.all(np.diff(buffer.__data[0, :n]) >= 0))
+            buffer.__last_x = buffer.__data[0, n - 1]
+        return buffer
+
+    def append(self, x: float, ys: List[float]) -> None:
+        '''
+        Append point (x, ys)
+        '''
+        row = np.array([x, *ys], dtype=np.float64)
+        if not x >= self.__last_x:
+            self.__x_sorted = False
+        self.__last_x = x
+        if self.__max_points is None:
+            if self.__n == self.__data.shape[1]:
+                data = np.empty((self.__n_columns, 2 * self.__n))
+                data[:, :self.__n] = self.__data
+                self.__data = data
+            self.__data[:, self.__n] = row
+            self.__n += 1
+            self.__mins = np.fmin(self.__mins, row)
+            self.__maxs = np.fmax(self.__maxs, row)
+        else:
+            cap = self.__max_points
+            if self.__n < cap:
+                i = self.__n
+                self.__n += 1
+            else:
+                i = self.__start
+                self.__start = (self.__start + 1) % cap
+            self.__data[:, i] = row
+            self.__data[:, i + cap] = row
+            oldest = self.__count - self.__n + 1
+            for v, min_deque, max_deque in zip(row.tolist(), self.__min_deques, self.__max_deques):
+                if v == v:
+                    while min_deque and min_deque[-1][1] >= v:
+                        min_deque.pop()
+                    min_deque.append((self.__count, v))
+                    while max_deque and max_deque[-1][1] <= v:
+                        max_deque.pop()
+                    max_deque.append((self.__count, v))
+                while min_deque and min_deque[0][0] < oldest:
+                    min_deque.popleft()
+                while max_deque and max_deque[0][0] < oldest:
+                    max_deque.popleft()
+        self.__count += 1
+
+    def extend(self, xs: np.ndarray, yss: List[np.ndarray]) -> None:
+        '''
+        Append points in bulk, columns (e.g. zero-copy views of shared memory) are copied once into buffer
+        :param xs: X column
+        :param yss: list of Y column for each line
+        '''
+        m = len(xs)
+        if m == 0:
+            return
+        if not (xs[0] >= self.__last_x and np.all(np.diff(xs) >= 0)):
+            self.__x_sorted = False
+        self.__last_x = xs[-1]
+        if self.__max_points is None:
+            if self.__n + m > self.__data.shape[1]:
+                data = np.empty((self.__n_columns, max(2 * self.__n, self.__n + m)))
+                data[:, :self.__n] = self.__data[:, :self.__n]
+                self.__data = data
+            block = self.__data[:, self.__n:self.__n + m]
+            block[0] = xs
+            for i, ys in enumerate(yss):
+                block[1 + i] = ys
+            self.__n += m
+            self.__mins = np.fmin(self.__mins, np.fmin.reduce(block, axis=1))
+            self.__maxs = np.fmax(self.__maxs, np.fmax.reduce(block, axis=1))
+        else:
+            # Only last max_points of new points are kept
+            cap = self.__max_points
+            k = min(m, cap)
+            counts = np.arange(self.__count + m - k, self.__count + m)
+            block = np.array([xs[m - k:], *(ys[m - k:] for ys in yss)], dtype=np.float64)
+            self.__data[:, counts % cap] = block
+            self.__data[:, counts % cap + cap] = block
+            self.__n = min(self.__n + m, cap)
+            self.__start = (self.__count + m - self.__n) % cap
+            oldest = self.__count + m - self.__n
+            for values, min_deque, max_deque in zip(block, self.__min_deques, self.__max_deques):
+                valid = values == values
+                vs, cs = values[valid], counts[valid]
+                if len(vs) > 0:
+                    # New points which stay in deques are ones less (greater) than all after them
+                    lows = np.minimum.accumulate(vs[::-1])[::-1]
+                    highs = np.maximum.accumulate(vs[::-1])[::-1]
+                    while min_deque and min_deque[-1][1] >= lows[0]:
+                        min_deque.pop()
+                    keep = vs < np.append(lows[1:], np.inf)
+                    min_deque.extend(zip(cs[keep].tolist(), vs[keep].tolist()))
+                    while max_deque and max_deque[-1][1] <= highs[0]:
+                        max_deque.pop()
+                    keep = vs > np.append(highs[1:], -np.inf)
+                    max_deque.extend(zip(cs[keep].tolist(), vs[keep].tolist()))
+                while min_deque and min_deque[0][0] < oldest:
+                    min_deque.popleft()
+                while max_deque and max_deque[0][0] < oldest:
+                    max_deque.popleft()
+        self.__count += m
+
+    def views(self) -> Tuple[np.ndarray, List[np.ndarray]]:
+        '''
+        :return: (X view, [Y view for each line]) of stored points in append order, no data copied
+        '''
+        block = self.__data[:, self.__start:self.__start + self.__n]
+        return block[0], [block[i] for i in range(1, self.__n_columns)]
+
+    def extrema(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        :return: (mins, maxs) arrays of each column (X first then Y of each line), NaN for empty column
+        '''
+        if self.__max_points is None:
+            return self.__mins.copy(), self.__maxs.copy()
+        mins = np.array([d[0][1] if d else np.nan for d in self.__min_deques])
+        maxs = np.array([d[0][1] if d else np.nan for d in self.__max_deques])
+        return mins, maxs
+
+    def __extend_levels(self, level: int) -> None:
+        # Build buckets of pyramid levels 1..level completed since last call, level L from level L - 1
+        ys = self.__data[1:, :self.__n]
+        r = self.__n_columns - 1
+        for l in range(1, level + 1):
+            if len(self.__levels) < l:
+                self.__levels.append([np.empty((r, 16), dtype=np.int64), np.empty((r, 16), dtype=np.int64), 0])
+            mins, maxs, count = self.__levels[l - 1]
+            n_complete = self.__n >> l
+            if count == n_complete:
+                continue
+            if l == 1:
+                new_mins, new_maxs = _bucket_min_max(ys[:, 2 * count:2 * n_complete], 2)
+                new_mins += 2 * count
+                new_maxs += 2 * count
+            else:
+                prev_mins, prev_maxs, _ = self.__levels[l - 2]
+                pairs = prev_mins[:, 2 * count:2 * n_complete].reshape(r, -1, 2)
+                values = np.take_along_axis(ys, pairs.reshape(r, -1), axis=1).reshape(pairs.shape)
+                new_mins = np.take_along_axis(pairs, np.argmin(values, axis=2)[..., None], axis=2)[..., 0]
+                pairs = prev_maxs[:, 2 * count:2 * n_complete].reshape(r, -1, 2)
+                values = np.take_along_axis(ys, pairs.reshape(r, -1), axis=1).reshape(pairs.shape)
+                new_maxs = np.take_along_axis(pairs, np.argmax(values, axis=2)[..., None], axis=2)[..., 0]
+            if n_complete > mins.shape[1]:
+                capacity = max(2 * mins.shape[1], n_complete)
+                mins = np.concatenate([mins[:, :count], np.empty((r, capacity - count), dtype=np.int64)], axis=1)
+                maxs = np.concatenate([maxs[:, :count], np.empty((r, capacity - count), dtype=np.int64)], axis=1)
+            mins[:, count:n_complete] = new_mins
+            maxs[:, count:n_complete] = new_maxs
+            self.__levels[l - 1] = [mins, maxs, n_complete]
+
+    def decimated(self, x_min: float, x_max: float, n_buckets: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        '''
+        Min/max decimated points in X range [x_min, x_max]: from each of about n_buckets buckets of consecutive
+        points only points with min and max Y are kept (in append order), so peaks stay visible.
+        Growable buffer use pyramid of buckets of 2^L points, extended only by buckets completed since last call,
+        ring buffer decimate points in range on the fly. If X not non decreasing all points are returned.
+        :param x_min: start of X range
+        :param x_max: end of X range
+        :param n_buckets: number of buckets (e.g. width of axes in pixels)
+        :return: ([X for each line], [Y for each line])
+        '''
+        xs, yss = self.views()
+        n_lines = self.__n_columns - 1
+        if not self.__x_sorted:
+            return [xs] * n_lines, yss
+        i_0 = max(int(np.searchsorted(xs, x_min, side="left")) - 1, 0)
+        i_1 = min(int(np.searchsorted(xs, x_max, side="right")) + 1, self.__n)
+        m = i_1 - i_0
+        if m <= 2 * n_buckets:
+            return [xs[i_0:i_1]] * n_lines, [ys[i_0:i_1] for ys in yss]
+        level = int(np.ceil(np.log2(m / n_buckets)))
+        ys = self.__data[1:, self.__start:self.__start + self.__n]
+        if self.__max_points is None:
+            self.__extend_levels(level)
+            mins, maxs, count = self.__levels[level - 1]
+            b_0 = i_0 >> level
+            b_1 = min(i_1 >> level, count)
+            parts = [mins[:, b_0:b_1], maxs[:, b_0:b_1]]
+            tail = max(b_1 << level, i_0)
+            if tail < i_1:
+                tail_mins, tail_maxs = _bucket_min_max(ys[:, tail:i_1], i_1 - tail)
+                parts += [tail_mins + tail, tail_maxs + tail]
+        else:
+            bucket_mins, bucket_maxs = _bucket_min_max(ys[:, i_0:i_1], 1 << level)
+            parts = [bucket_mins + i_0, bucket_maxs + i_0]
+        indexes = np.sort(np.concatenate(parts, axis=1), axis=1)
+        return [xs[i] for i in indexes], [ys[i] for ys, i in zip(yss, indexes)]
+
+    def __len__(self) -> int:
+        return self.__n
+
 class ChartRecorder2D:
     '''
     Plotting of points and react on keyboard input.
@@ -27,7 +286,10 @@ class ChartRecorder2D:
             y_range: Tuple[float, float] = None,
             xy_label: Tuple[str, str] = ("X", "Y"),
             pause: float = .01,
-            window_size: Tuple[float, float] = (10, 6)):
+            window_size: Tuple[float, float] = (10, 6),
+            max_points: Optional[int] = None,
+            fps: Optional[float] = None,
+            decimation: bool = True):
         '''
         Construct a empty plot wit given number of lines
         :param lines: list of lines [(<line name>, <matplotlib format>)]
@@ -35,6 +297,13 @@ class ChartRecorder2D:
         :param y_range: the optional range of Y axis, if None will auto scaled
         :param pause: execution timeout (should not be to small since UI will frozen)
         :param window_size: Size of the window (w, h), in inches (1in == 2.54cm)
+        :param max_points: if given only last max_points are shown (scrolling mode), else all points kept
+        :param fps: if given points are accumulated and chart repainted (with blitting of lines) not often than
+                    fps frames per second, without pause, so simulation not blocked by UI, else chart repainted
+                    and paused on each append
+        :param decimation: if True lines show only min/max points of each pixel bucket of visible X range
+                           (re-queried on autoscale and zoom), so draw cost bounded by axes width,
+                           not by number of points
         '''
         # Parameters
         self.__window_title = "Chart Recorder 2D"
@@ -47,15 +316,21 @@ class ChartRecorder2D:
         self.__padding_right=.97
         self.__padding_top=.95
         # Fields
-        self.__xs = []
-        self.__yss = []
+        self.__buffer = SeriesBuffer(len(lines), max_points)
         self.__plots = []
         self.__callbacks = []
         self.__x_range = x_range
         self.__y_range = y_range
         self.__pause = pause
+        self.__frame_interval = None if fps is None else 1.0 / fps
+        self.__last_frame = 0.0
+        self.__background = None  # Saved figure without lines, used for blitting
+        self.__limits = None  # Axes limits of last frame
+        self.__decimation = decimation
+        self.__updating = False  # Lines data and axes limits are being set
         # Init
         fig, self.__ax = plt.subplots()
+        self.__fig = fig
         self.__ax.grid(color="gray")
         fig.subplots_adjust(self.__padding_left, self.__padding_bottom, self.__padding_right, self.__padding_top)
         fig.canvas.set_window_title(self.__window_title)
@@ -73,11 +348,15 @@ class ChartRecorder2D:
         fig.set_size_inches(*window_size)
         # Build plots
         for name, form in lines:
-            ys = []
-            p, = self.__ax.plot(self.__xs, ys, form, label=name)
+            p, = self.__ax.plot([], [], form, label=name, animated=fps is not None)
             self.__plots.append(p)
-            self.__yss.append(ys)
         fig.legend()
+        # Save background on each full redraw (e.g. window resize)
+        if fps is not None:
+            fig.canvas.mpl_connect('draw_event', lambda event: self.__on_draw())
+        # Re-query decimated points on zoom
+        if decimation:
+            self.__ax.callbacks.connect('xlim_changed', lambda ax: self.__on_xlim_changed())
         # Set keyboard handler
         fig.canvas.mpl_connect(
             'key_release_event',
@@ -91,33 +370,101 @@ class ChartRecorder2D:
         :param x: X coordinate
         :param ys: list of Y coordinated
         '''
-        # Functions
-        def min_max(vs):
-            mnv = min(vs)
-            mxv = max(vs)
+        # Add new points
+        self.__buffer.append(x, ys)
+        # Update plot
+        if self.__frame_interval is None:
+            self.__update_lines()
+            plt.pause(self.__pause)
+        elif time.perf_counter() - self.__last_frame >= self.__frame_interval:
+            self.__draw_frame()
+
+    def extend(self, xs: np.ndarray, ys: List[np.ndarray]) -> None:
+        '''
+        Append points in bulk, chart is updated once for all of them
+        :param xs: X coordinates
+        :param ys: list of Y coordinates column for each line
+        '''
+        # Add new points
+        self.__buffer.extend(xs, ys)
+        # Update plot
+        if self.__frame_interval is None:
+            self.__update_lines()
+            plt.pause(self.__pause)
+        elif time.perf_counter() - self.__last_frame >= self.__frame_interval:
+            self.__draw_frame()
+
+    def __update_lines(self) -> Tuple[float, float, float, float]:
+        # Set lines data and axes ranges, return axes limits
+        def min_max(mnv, mxv):
             if mnv == mxv:
                 return mnv + self.__mim_min, mxv + self.__max_max
             else:
                 return mnv, mxv
-        # Add new points
-        self.__xs.append(x)
-        for plot, ys, y in zip(self.__plots, self.__yss, ys):
-            ys.append(y)
-            plot.set_data(self.__xs, ys)
+        self.__updating = True
+        mins, maxs = self.__buffer.extrema()
         # Set X range
         if self.__x_range is None:
-            self.__ax.set_xlim(*min_max(self.__xs))
+            self.__ax.set_xlim(*min_max(mins[0], maxs[0]))
         # Set Y range
         if self.__y_range is None:
             min_y = self.__mim_min
             max_y = self.__max_max
-            for ys in self.__yss:
-                mn, mx = min_max(ys)
+            for mn, mx in zip(mins[1:], maxs[1:]):
+                mn, mx = min_max(mn, mx)
                 if mn < min_y: min_y = mn
                 if mx > max_y: max_y = mx
             self.__ax.set_ylim(min_y, max_y)
-        # Update plot
-        plt.pause(self.__pause)
+        self.__set_lines_data()
+        self.__updating = False
+        return self.__ax.get_xlim() + self.__ax.get_ylim()
+
+    def __set_lines_data(self):
+        if self.__decimation:
+            x_min, x_max = self.__ax.get_xlim()
+            n_buckets = max(int(self.__ax.get_window_extent().width), 1)
+            xss, yss = self.__buffer.decimated(x_min, x_max, n_buckets)
+        else:
+            xs, yss = self.__buffer.views()
+            xss = [xs] * len(yss)
+        for plot, xs, ys in zip(self.__plots, xss, yss):
+            plot.set_data(xs, ys)
+
+    def __on_xlim_changed(self):
+        # X range changed by user (zoom or pan), show decimated points of new range
+        if not self.__updating:
+            self.__set_lines_data()
+
+    def __on_draw(self):
+        # Full redraw done (without animated lines), save it as background and draw lines on top
+        canvas = self.__fig.canvas
+        self.__background = canvas.copy_from_bbox(self.__fig.bbox)
+        for plot in self.__plots:
+            self.__ax.draw_artist(plot)
+
+    def __draw_frame(self):
+        # Repaint lines with blitting, full redraw only if axes limits changed
+        canvas = self.__fig.canvas
+        limits = self.__update_lines()
+        if self.__background is None or limits != self.__limits:
+            canvas.draw()
+        else:
+            canvas.restore_region(self.__background)
+            for plot in self.__plots:
+                self.__ax.draw_artist(plot)
+        canvas.blit(self.__fig.bbox)
+        canvas.flush_events()
+        self.__limits = limits
+        self.__last_frame = time.perf_counter()
+
+    def flush(self) -> None:
+        '''
+        Repaint chart with all accumulated points (in fps mode points appended after last frame not yet shown)
+        '''
+        if self.__frame_interval is None:
+            plt.pause(self.__pause)
+        else:
+            self.__draw_frame()
 
     def on_kay_press(self, handler: Callable[[str], None]) -> None:
         '''
@@ -130,4 +477,8 @@ class ChartRecorder2D:
         '''
         Used to make chart visible after program ended
         '''
+        if self.__frame_interval is not None:
+            self.__update_lines()
+            for plot in self.__plots:
+                plot.set_animated(False)
         plt.show()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Compact transition graph tool
+Array backed Γ graph: sub-states in preallocated arrays indexed by (d, w), edges as integer index arrays
+Created 18.10.2026 author CAB
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from tools.graph_visualisation import NodeLike, GraphLike
+
+# Definitions
+Transition = Callable[..., Tuple[float, float]]  # (ω inputs, t inputs[, parameters]) -> (t, ω)
+
+def _apply_transitions(chunk):
+    # Evaluate chunk of transitions [(f, arguments)] in pool worker
+    return [f(*args) for f, args in chunk]
+
+class CompactNode(NodeLike):
+    '''
+    Lightweight view of S node (d, w) of CompactGraph, created on demand for GraphVisualisation.
+    '''
+    __slots__ = ("graph", "d", "w")
+
+    def __init__(self, graph: 'CompactGraph', d: int, w: int):
+        self.graph = graph
+        self.d = d
+        self.w = w
+
+    def graph_repr(self):
+        label = f"S_{self.d},{self.w}"
+        pos = (self.d, self.w)
+        color = self.graph.defined_color if self.graph.is_defined(self.d, self.w) else self.graph.undefined_color
+        edges = [(CompactNode(self.graph, d, w), self) for d, w in self.graph.inputs(self.d, self.w)]
+        return label, pos, color, edges
+
+    def __eq__(self, other):
+        return isinstance(other, CompactNode) and other.graph is self.graph and other.d == self.d and other.w == self.w
+
+    def __hash__(self):
+        return hash((id(self.graph), self.d, self.w))
+
+    def __repr__(self):
+        if self.graph.is_defined(self.d, self.w):
+            t, ω = self.graph.get(self.d, self.w)
+            return f"S_d,w = (ω={ω}, t={t})_d={self.d},w={self.w}"
+        else:
+            return f"S_d,w = (∅)_d={self.d},w={self.w}"
+
+class _Band:
+    # Storage of sub-states of one rate k, row r holds layer d = rk
+    def __init__(self, k, ws, n):
+        self.k = k
+        self.ws = np.array(ws, dtype=np.int64)  # 0-based w
+        self.ω = np.zeros((n // k + 1, len(ws)))
+        self.t = np.zeros((n // k + 1, len(ws)))
+        self.defined = np.zeros((n // k + 1, len(ws)), dtype=bool)
+
+    def at(self, d, interpolate, cs=slice(None)):
+        # (t, ω) of sub-states of band (columns cs, all by default) in layer d, between stored layers linearly
+        # interpolated or held (held also where next stored layer is not defined or not exists)
+        r, i = divmod(d, self.k)
+        if i == 0 or not interpolate or r + 1 == len(self.ω):
+            return self.t[r, cs], self.ω[r, cs]
+        α = i / self.k
+        next_defined = self.defined[r + 1, cs]
+        t_r, ω_r = self.t[r, cs], self.ω[r, cs]
+        t = np.where(next_defined, t_r + α * (self.t[r + 1, cs] - t_r), t_r)
+        ω = np.where(next_defined, ω_r + α * (self.ω[r + 1, cs] - ω_r), ω_r)
+        return t, ω
+
+class CompactGraph(GraphLike):
+    '''
+    Γ graph of n + 1 layers (depth d = 0..n) with width sub-states each (w = 1..width).
+    Sub-state w of layer d > 0 is produced by transition of w from sub-states edges[w] of layer d - 1,
+    sub-states which have no transition are inputs (assigned from outside, like initial state or ω_3).
+    Transitions of one layer only read previous layer so they are independent, they are run by executor:
+        "sequential" - one by one in w order
+        "vectorized" - transitions which share same callable (and number of inputs) are run by single call
+                       with (number of inputs, number of sub-states) arrays, so callable should use only
+                       numpy compatible operations (ω[0] is then array of first inputs of all sub-states)
+                       and parameters, if given, are (number of parameters, number of sub-states) array, so
+                       one callable shared by many sub-states (which differ only by parameters) is single call
+        "threads"/"processes" - in thread/process pool (callables should be picklable for "processes"),
+                       synchronized on layer boundary
+    Multirate: sub-state w of rate k exists only in layers d = 0, k, 2k, ... (so it takes k times less
+    memory and transition calls), its transition steps over k layers, i.e. S_d,w is produced from inputs
+    of layer d - k. Consumers read slow sub-state in layers between its own ones as linearly interpolated
+    (or held) value. To have both ends for interpolation, slow sub-state of layer d is evaluated ahead,
+    together with layer d - k + 1, so evaluation step d reads only layer d - 1 for any mix of rates.
+    '''
+
+    def __init__(
+            self,
+            n: int,
+            width: int,
+            edges: Dict[int, Tuple[int, ...]],
+            transitions: Dict[int, Transition],
+            defined_color: str = "k",
+            undefined_color: str = "m",
+            executor: str = "sequential",
+            workers: Optional[int] = None,
+            rates: Optional[Dict[int, int]] = None,
+            interpolate: bool = True,
+            parameters: Optional[Dict[int, Sequence[float]]] = None):
+        '''
+        Construct graph with all sub-states undefined
+        :param n: depth of graph (number of transition layers)
+        :param width: number of sub-states in layer
+        :param edges: w -> tuple of input sub-state indexes w' (from previous layer) of transition of w
+        :param transitions: w -> callable (ω inputs, t inputs) -> (t, ω), inputs given in edges[w] order,
+                            transition of sub-state of rate k should step kΔt
+        :param defined_color: color char of defined S node for GraphVisualisation
+        :param undefined_color: color char of undefined S node for GraphVisualisation
+        :param executor: "sequential", "vectorized", "threads" or "processes", see class description
+        :param workers: number of workers of "threads" and "processes" executors, None for default
+        :param rates: w -> rate k (sub-state exists in every k-th layer), default rate is 1
+        :param interpolate: if True slow sub-states are linearly interpolated for consumers between own
+                            layers, else held (last value), assigned slow inputs are held till next value assigned
+        :param parameters: w -> constant parameters of transition of w, given to it as third argument
+                           (ω inputs, t inputs, parameters), transitions without parameters take two arguments
+        '''
+        rates = rates or {}
+        parameters = parameters or {}
+        assert executor in self.EXECUTORS, f"executor should be one of {self.EXECUTORS}, got {executor}"
+        assert set(edges) == set(transitions), "edges and transitions should be given for same sub-states"
+        for w, ins in edges.items():
+            assert 1 <= w <= width and all(1 <= i <= width for i in ins), f"w out of range [1, {width}] for {w}: {ins}"
+        for w, k in rates.items():
+            assert 1 <= w <= width, f"w out of range [1, {width}] for rate of {w}"
+            assert int(k) == k and k >= 1, f"Rate should be positive integer, got {k} for {w}"
+        assert set(parameters) <= set(transitions), "parameters should be given only for sub-states with transition"
+        # Parameters
+        self.n = n
+        self.width = width
+        self.defined_color = defined_color
+        self.undefined_color = undefined_color
+        self.executor = executor
+        self.workers = workers
+        self.interpolate = interpolate
+        # Fields
+        self.rates = np.array([int(rates.get(w, 1)) for w in range(1, width + 1)], dtype=np.int64)
+        self.__bands = [
+            _Band(int(k), np.flatnonzero(self.rates == k), n) for k in sorted(set(self.rates.tolist()) | {1})]
+        self.__band_of = [None] * width  # 0-based w -> band
+        self.__col_of = [0] * width      # 0-based w -> column in band
+        for band in self.__bands:
+            for c, w in enumerate(band.ws.tolist()):
+                self.__band_of[w] = band
+                self.__col_of[w] = c
+        self.ω = self.__bands[0].ω              # (layer, sub-state) arrays of rate 1 sub-states, column w - 1 if
+        self.t = self.__bands[0].t              # no rates given (then all sub-states are of rate 1)
+        self.defined = self.__bands[0].defined
+        self.produced = np.array(sorted(w - 1 for w in transitions), dtype=np.int64)  # 0-based w with transition
+        self.edges = [np.array([i - 1 for i in edges[w + 1]], dtype=np.int64) for w in self.produced]
+        self.transitions = [transitions[w + 1] for w in self.produced]
+        self.parameters = [None if w + 1 not in parameters else np.asarray(parameters[w + 1], dtype=np.float64)
+                           for w in self.produced]
+        self.is_produced = np.zeros(width, dtype=bool)
+        self.is_produced[self.produced] = True
+        required = set(int(i) for ins in self.edges for i in ins)
+        self.required = sorted(required)  # 0-based w which are inputs of any transition
+        self.required_inputs = sorted(w for w in required if not self.is_produced[w])  # Required but not produced
+        # Per rate schedule [(band, plan [(column, inputs, f, parameters)], groups, produced columns)], groups are
+        # [(columns, inputs matrix (number of inputs, len(columns)), f, parameters matrix or None)] for "vectorized"
+        self.__schedule = []
+        for band in self.__bands:
+            plan = [(self.__col_of[w], ins.tolist(), f, p)
+                    for w, ins, f, p in zip(self.produced.tolist(), self.edges, self.transitions, self.parameters)
+                    if self.rates[w] == band.k]
+            if not plan:
+                continue
+            grouped = {}
+            for c, ins, f, p in plan:
+                key = (id(f), len(ins), None if p is None else len(p))
+                grouped.setdefault(key, (f, [], [], []))
+                grouped[key][1].append(c)
+                grouped[key][2].append(ins)
+                grouped[key][3].append(p)
+            groups = [(np.array(cs, dtype=np.int64), np.array(inss, dtype=np.int64).T, f,
+                       None if ps[0] is None else np.array(ps).T)
+                      for f, cs, inss, ps in grouped.values()]
+            self.__schedule.append((band, plan, groups, np.array([c for c, _, _, _ in plan], dtype=np.int64)))
+        self.__gathers = {}  # Active schedule entries -> (sources [(band, columns)], entries with gathered inputs)
+        self.__pool = None
+        self.depth = 1  # Next evaluation step (layer of rate 1 sub-states) to evaluate
+
+    EXECUTORS = ("sequential", "vectorized", "threads", "processes")
+
+    def rate(self, w: int) -> int:
+        '''
+        :return: rate k of sub-state w (it exists in layers 0, k, 2k, ...)
+        '''
+        return int(self.rates[w - 1])
+
+    def assign(self, d: int, w: int, t: float, ω: float) -> None:
+        '''
+        Assign input sub-state (d, w)
+        '''
+        band, c = self.__band_of[w - 1], self.__col_of[w - 1]
+        assert d % band.k == 0, f"S_{d},{w} not exists, sub-state of rate {band.k} exists only in every {band.k} layer"
+        assert not band.defined[d // band.k, c], f"S_{d},{w} already defined"
+        assert d == 0 or not self.is_produced[w - 1], f"S_{d},{w} is produced by transition, can't be assigned"
+        band.t[d // band.k, c] = t
+        band.ω[d // band.k, c] = ω
+        band.defined[d // band.k, c] = True
+
+    def is_defined(self, d: int, w: int) -> bool:
+        band = self.__band_of[w - 1]
+        return d % band.k == 0 and bool(band.defined[d // band.k, self.__col_of[w - 1]])
+
+    def get(self, d: int, w: int) -> Tuple[float, float]:
+        '''
+        :return: (t, ω) of sub-state (d, w), for layer between layers of slow sub-state value seen by consumers
+                 (interpolated or held)
+        '''
+        t, ω = self.__band_of[w - 1].at(d, self.interpolate)
+        return t[self.__col_of[w - 1]], ω[self.__col_of[w - 1]]
+
+    def inputs(self, d: int, w: int) -> List[Tuple[int, int]]:
+        '''
+        :return: list of (d, w) of input sub-states of (d, w), empty for input sub-states, for slow inputs
+                 last own layer of input is given
+        '''
+        k = self.rates[w - 1]
+        if d == 0 or not self.is_produced[w - 1] or d % k != 0:
+            return []
+        i = int(np.searchsorted(self.produced, w - 1))
+        return [(int((d - k) // self.rates[w_in] * self.rates[w_in]), int(w_in) + 1) for w_in in self.edges[i]]
+
+    def column(self, w: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        :return: (t, ω) views over all layers for sub-state w (layers 0, k, 2k, ... for sub-state of rate k)
+        '''
+        band, c = self.__band_of[w - 1], self.__col_of[w - 1]
+        return band.t[:, c], band.ω[:, c]
+
+    def __gather(self, active: Tuple[int, ...]):
+        # Sources [(band, columns)] of inputs read by active schedule entries, and these entries with inputs
+        # remapped to positions in gathered row (concatenated sources), built once per set of active entries
+        if active not in self.__gathers:
+            entries = [self.__schedule[i] for i in active]
+            ws = sorted(set(w for _, plan, _, _ in entries for _, ins, _, _ in plan for w in ins))
+            sources = []
+            position = np.zeros(self.width, dtype=np.int64)  # 0-based w -> position in gathered row
+            n_gathered = 0
+            for band in self.__bands:
+                band_ws = [w for w in ws if self.__band_of[w] is band]
+                if band_ws:
+                    sources.append((band, np.array([self.__col_of[w] for w in band_ws], dtype=np.int64)))
+                    position[band_ws] = np.arange(n_gathered, n_gathered + len(band_ws))
+                    n_gathered += len(band_ws)
+            remapped = [(band, [(c, position[ins].tolist(), f, p) for c, ins, f, p in plan],
+                         [(cs_f, position[ins], f, p) for cs_f, ins, f, p in groups], cs)
+                        for band, plan, groups, cs in entries]
+            self.__gathers[active] = (sources, remapped)
+        return self.__gathers[active]
+
+    def __layer_ready(self, d: int) -> bool:
+        # Produced sub-states read by step d are defined if previous steps were evaluated (d > 1), so only
+        # inputs checked (last own layer of slow ones)
+        ws = self.required if d == 1 else self.required_inputs
+        return all(self.__band_of[w].defined[(d - 1) // self.__band_of[w].k, self.__col_of[w]] for w in ws)
+
+    def eval_layer(self, d: int) -> None:
+        '''
+        Evaluation step d, evaluate all transitions which read layer d - 1 (inputs should be defined): sub-states
+        of rate 1 of layer d and sub-states of rate k of layer d + k - 1 if d - 1 is multiple of k
+        '''
+        active = tuple(i for i, (band, _, _, _) in enumerate(self.__schedule)
+                       if (d - 1) % band.k == 0 and d + band.k - 1 <= self.n)
+        if len(self.__bands) == 1:
+            t_prev, ω_prev = self.t[d - 1], self.ω[d - 1]
+            active = [self.__schedule[i] for i in active]
+        else:
+            # Only input columns of active transitions are read (and interpolated for slow ones), so cost of step
+            # not depends on width of slow bands which are not evaluated in this step
+            sources, active = self.__gather(active)
+            rows = [band.at(d - 1, self.interpolate, cs) for band, cs in sources]
+            t_prev = np.concatenate([t for t, _ in rows]) if rows else np.empty(0)
+            ω_prev = np.concatenate([ω for _, ω in rows]) if rows else np.empty(0)
+        if self.executor == "vectorized":
+            for band, _, groups, _ in active:
+                r = (d + band.k - 1) // band.k
+                t_row, ω_row = band.t[r], band.ω[r]
+                for cs, ins, f, p in groups:
+                    t, ω = f(ω_prev[ins], t_prev[ins]) if p is None else f(ω_prev[ins], t_prev[ins], p)
+                    t_row[cs] = t
+                    ω_row[cs] = ω
+        else:
+            ω_prev = ω_prev.tolist()
+            t_prev = t_prev.tolist()
+            tasks = [(f, ([ω_prev[i] for i in ins], [t_prev[i] for i in ins]) + (() if p is None else (p,)))
+                     for _, plan, _, _ in active for _, ins, f, p in plan]
+            if self.executor == "sequential":
+                results = [f(*args) for f, args in tasks]
+            else:
+                results = self.__run_in_pool(tasks)
+            results = iter(results)
+            for band, plan, _, _ in active:
+                r = (d + band.k - 1) // band.k
+                t_row, ω_row = band.t[r], band.ω[r]
+                for (c, _, _, _), (t, ω) in zip(plan, results):
+                    t_row[c] = t
+                    ω_row[c] = ω
+        for band, _, _, cs in active:
+            band.defined[(d + band.k - 1) // band.k, cs] = True
+
+    def __run_in_pool(self, tasks):
+        # Split layer tasks on chunk per worker, and wait all of them (layer boundary synchronization)
+        n_workers = self.workers or os.cpu_count() or 1
+        if self.__pool is None:
+            pool_class = ThreadPoolExecutor if self.executor == "threads" else ProcessPoolExecutor
+            self.__pool = pool_class(max_workers=n_workers)
+        n_chunks = max(min(len(tasks), n_workers), 1)
+        chunks = [tasks[i::n_chunks] for i in range(n_chunks)]
+        results = [None] * len(tasks)
+        for i, chunk_results in enumerate(self.__pool.map(_apply_transitions, chunks)):
+            results[i::n_chunks] = chunk_results
+        return results
+
+    def close(self) -> None:
+        '''
+        Shutdown pool of "threads" or "processes" executor (if was started)
+        '''
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def eval(self) -> List[int]:
+        '''
+        Evaluate all layers which inputs are defined, starting from first not evaluated one
+        :return: list of evaluated depths d
+        '''
+        evaluated = []
+        while self.depth <= self.n and self.__layer_ready(self.depth):
+            self.eval_layer(self.depth)
+            evaluated.append(self.depth)
+            self.depth += 1
+            self.redraw()
+        return evaluated
+
+    def γ(self, p𝔖: Dict[Tuple[int, int], Tuple[float, float]]) -> 'CompactGraph':
+        '''
+        Assign initial sub-states and evaluate whole graph
+        :param p𝔖: (d, w) -> (t, ω) for input sub-states
+        :return: self
+        '''
+        for (d, w), (t, ω) in p𝔖.items():
+            self.assign(d, w, t, ω)
+        self.eval()
+        assert self.depth > self.n, f"Not all layers evaluated, stopped on depth {self.depth}"
+        return self
+
+    def __shown(self, d: int, w: int) -> bool:
+        # Input sub-states of last layer not used by any transition and layers not existing for slow sub-states
+        # are not shown
+        return d % self.rates[w - 1] == 0 and (d == 0 or self.is_produced[w - 1] or d < self.n)
+
+    def graph_repr(self) -> List[NodeLike]:
+        return [CompactNode(self, d, w) for d in range(self.n + 1) for w in range(1, self.width + 1)
+                if self.__shown(d, w)]
+
+    def graph_repr_window(self, d_min: int, d_max: int) -> List[NodeLike]:
+        return [CompactNode(self, d, w) for d in range(max(d_min, 0), min(d_max, self.n) + 1)
+                for w in range(1, self.width + 1) if self.__shown(d, w)]
+
+    def frontier(self) -> int:
+        return self.depth - 1
+
+    def nbytes(self) -> int:
+        '''
+        :return: number of bytes used by sub-state arrays
+        '''
+        return sum(band.ω.nbytes + band.t.nbytes + band.defined.nbytes for band in self.__bands)
+
+    def __repr__(self):
+        return f"CompactGraph(n = {self.n}, width = {self.width}, evaluated depth = {self.depth - 1})"
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Ensemble tool
+Batched simulation of mixing model for table of 𝔈 rows (ensemble members) over common time grid
+Created 18.10.2026 author CAB
+"""
+
+from typing import Iterator, Optional, Tuple, Union
+import numpy as np
+from tools.mixing_model import PARAMETERS, closed_form, earlier_steps
+
+# Definitions
+MODELS = ("earlier", "closed_form")
+
+def _initial_states(ω_0, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Initial (ω_1, ω_2) columns of n members from single state or (n, 2) table
+    ω_0 = np.asarray(ω_0, dtype=np.float64)
+    if ω_0.ndim == 1:
+        return np.full(n, ω_0[0]), np.full(n, ω_0[1])
+    assert ω_0.shape == (n, 2), f"ω_0 should be (ω_1, ω_2) or table of shape ({n}, 2), got {ω_0.shape}"
+    return ω_0[:, 0].copy(), ω_0[:, 1].copy()
+
+def _earlier_chunk(𝔈s, set_t, ω_0, t_0, Δt, drift_free, out):
+    # Step all members of chunk together, state is recorded for grid points reached by each number of steps
+    ω_1, ω_2 = ω_0
+    v_1, v_2, q_1, q_2, q_3, q_4, ω_3 = (𝔈s[:, i] for i in range(len(PARAMETERS)))
+    q_1ω_3 = q_1 * ω_3
+    steps = earlier_steps(set_t, Δt, t_0, drift_free)
+    order = np.argsort(steps, kind="stable")
+    j = 0
+    for i in order:
+        while j < steps[i]:
+            ω_1_m1 = ω_1
+            ω_1 = ω_1_m1 + (Δt * ((q_1ω_3 + (q_2 * ω_2) - (q_3 * ω_1_m1)) / v_1))
+            ω_2 = ω_2 + (Δt * (((q_3 * ω_1_m1) - (q_2 * ω_2) - (q_4 * ω_2)) / v_2))
+            j += 1
+        out[:, i, 0] = ω_1
+        out[:, i, 1] = ω_2
+
+def ensemble_chunks(
+        𝔈s: np.ndarray,
+        set_t: np.ndarray,
+        ω_0: Union[Tuple[float, float], np.ndarray],
+        model: str = "closed_form",
+        Δt: Optional[float] = None,
+        t_0: float = 0.0,
+        chunk_size: Optional[int] = None,
+        drift_free: bool = False) -> Iterator[Tuple[int, np.ndarray]]:
+    '''
+    Evaluate ensemble chunk by chunk, so only one chunk of results (and temporaries) is in memory
+    :param 𝔈s: table of 𝔈 rows of shape (N, 7), columns in PARAMETERS order
+    :param set_t: time grid, float64 array of shape (T,)
+    :param ω_0: initial state (ω_1, ω_2) of all members or table of shape (N, 2)
+    :param model: "earlier" (Earlier scheme with step Δt, all members stepped together) or "closed_form"
+    :param Δt: step of "earlier" model
+    :param t_0: initial time
+    :param chunk_size: number of members evaluated at once, None for chunk_size_for(T)
+    :param drift_free: "earlier" model steps counting, by default by accumulated t as Earlier loop of scripts
+                       (F_) does, so results are same as of scripts, if True by t, see mixing_model.earlier_steps
+    :return: iterator of (index of first member, array of shape (chunk, T, 2) of (ω_1, ω_2))
+    '''
+    assert model in MODELS, f"model should be one of {MODELS}, got {model}"
+    assert model != "earlier" or Δt is not None, "Δt should be given for earlier model"
+    𝔈s = np.asarray(𝔈s, dtype=np.float64)
+    set_t = np.asarray(set_t, dtype=np.float64)
+    chunk_size = chunk_size or chunk_size_for(len(set_t))
+    assert 𝔈s.ndim == 2 and 𝔈s.shape[1] == len(PARAMETERS), f"𝔈s should be (N, 7) table, got {𝔈s.shape}"
+    ω_1_0, ω_2_0 = _initial_states(ω_0, len(𝔈s))
+    for start in range(0, len(𝔈s), chunk_size):
+        end = min(start + chunk_size, len(𝔈s))
+        out = np.empty((end - start, len(set_t), 2))
+        if model == "earlier":
+            _earlier_chunk(𝔈s[start:end], set_t, (ω_1_0[start:end], ω_2_0[start:end]), t_0, Δt, drift_free, out)
+        else:
+            ω_0_chunk = (ω_1_0[start:end, None], ω_2_0[start:end, None])
+            out[..., 0], out[..., 1] = closed_form(set_t[None, :], 𝔈s[start:end, None, :], ω_0_chunk, t_0)
+        yield start, out
+
+def ensemble(
+        𝔈s: np.ndarray,
+        set_t: np.ndarray,
+        ω_0: Union[Tuple[float, float], np.ndarray],
+        model: str = "closed_form",
+        Δt: Optional[float] = None,
+        t_0: float = 0.0,
+        chunk_size: Optional[int] = None,
+        out: Optional[np.ndarray] = None,
+        drift_free: bool = False) -> np.ndarray:
+    '''
+    Evaluate mixing model for all members of ensemble, see ensemble_chunks for parameters
+    :param out: optional array of shape (N, T, 2) to write results to (e.g. np.memmap for large N),
+                if None new array allocated
+    :return: array of shape (N, T, 2), [member, t index, 0] is ω_1 and [member, t index, 1] is ω_2
+    '''
+    n, n_t = len(𝔈s), len(set_t)
+    if out is None:
+        out = np.empty((n, n_t, 2))
+    assert out.shape == (n, n_t, 2), f"out should have shape {(n, n_t, 2)}, got {out.shape}"
+    for start, chunk in ensemble_chunks(𝔈s, set_t, ω_0, model, Δt, t_0, chunk_size, drift_free):
+        out[start:start + len(chunk)] = chunk
+    return out
+
+def chunk_size_for(n_t: int, memory: int = 64 << 20) -> int:
+    '''
+    :param n_t: number of time grid points
+    :param memory: bytes available for one chunk (results and temporaries of closed form, about 16 arrays)
+    :return: number of members in chunk
+    '''
+    return max(1, memory // (16 * 8 * max(n_t, 1)))
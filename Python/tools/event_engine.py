@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Event driven engine tool
+Interactive simulation which evaluates model only on parameter change, ticks are served from precomputed segment
+Created 18.10.2026 author CAB
+"""
+
+from typing import Any, Callable, Optional, Tuple
+import time
+import numpy as np
+from tools.state_columns import StateColumns, StateRow
+
+# Definitions
+Segment = Callable[[np.ndarray, Any, float, Tuple[float, float]], StateColumns]  # (set_t, 𝔈, t_0, ω_0) -> rows
+
+class TickClock:
+    '''
+    Paces ticks of Δt model time to Δt / speed of wall time, time between ticks is spent in wait function
+    (e.g. plt.pause which runs UI event loop), so idle simulation not uses CPU.
+    '''
+
+    def __init__(self, Δt: float, speed: Optional[float] = 1.0, wait: Callable[[float], Any] = time.sleep):
+        '''
+        :param Δt: model time of one tick
+        :param speed: real time factor (model time per wall time), None to not wait (as fast as possible)
+        :param wait: function which blocks for given number of seconds
+        '''
+        # Parameters
+        self.period = None if speed is None else Δt / speed
+        self.wait = wait
+        # Fields
+        self.__deadline = None
+
+    def tick(self) -> None:
+        '''
+        Wait till wall time of next tick, if simulation is late more than one period pacing restarted from now
+        '''
+        if self.period is None:
+            return
+        now = time.perf_counter()
+        if self.__deadline is None or now - self.__deadline > self.period:
+            self.__deadline = now
+        else:
+            self.__deadline += self.period
+            if self.__deadline > now:
+                self.wait(self.__deadline - now)
+
+class EventDrivenEngine:
+    '''
+    Interactive simulation engine, model is evaluated only when parameters change (event) or precomputed
+    segment is exhausted: segment function is called once for next segment_ticks ticks from origin state
+    of current parameters (state of tick on which parameters were changed), all other ticks are served
+    from segment rows. Segment function could be closed form or jump ahead model, so cost of tick between
+    events is one row read.
+    '''
+
+    def __init__(
+            self,
+            segment: Segment,
+            Δt: float,
+            t_0: float,
+            ω_0: Tuple[float, float],
+            𝔈: Any,
+            segment_ticks: int = 256,
+            clock: Optional[TickClock] = None):
+        '''
+        :param segment: (set_t, 𝔈, t_0, ω_0) -> StateColumns of states at set_t for 𝔈 and initial state ω_0
+                        at t_0
+        :param Δt: model time of one tick
+        :param t_0: initial time
+        :param ω_0: initial state (ω_1, ω_2)
+        :param 𝔈: initial parameters, compared with != to detect change
+        :param segment_ticks: number of ticks evaluated by one segment function call
+        :param clock: optional TickClock to pace ticks, if None ticks are served without waiting
+        '''
+        assert segment_ticks > 0, f"segment_ticks should be positive, got {segment_ticks}"
+        # Parameters
+        self.segment = segment
+        self.Δt = Δt
+        self.segment_ticks = segment_ticks
+        self.clock = clock
+        # Fields
+        self.𝔈 = 𝔈
+        self.t = t_0                   # Time of last served tick
+        self.ω = ω_0                   # State of last served tick
+        self.origin = (t_0, ω_0)       # Initial (t, ω) of current parameters
+        self.n_segments = 0            # Number of segment function calls
+        self.__rows = None             # Current segment
+        self.__i = 0                   # Index of next row to serve
+
+    def set_parameters(self, 𝔈: Any) -> bool:
+        '''
+        Set parameters for next ticks, segment is dropped only if they changed
+        :return: True if parameters changed
+        '''
+        if 𝔈 != self.𝔈:
+            self.𝔈 = 𝔈
+            self.origin = (self.t, self.ω)
+            self.__rows = None
+            return True
+        return False
+
+    def next(self) -> StateRow:
+        '''
+        Wait for next tick (if clock given) and serve its state
+        :return: row of next tick
+        '''
+        if self.clock is not None:
+            self.clock.tick()
+        if self.__rows is None or self.__i == len(self.__rows):
+            self.__compute()
+        row = self.__rows[self.__i]
+        self.__i += 1
+        self.t = row.t
+        self.ω = (row.ω_1, row.ω_2)
+        return row
+
+    def run(self, n: int) -> StateColumns:
+        '''
+        Serve next n ticks at once without waiting (faster than real time run) by single segment function call,
+        parameters are not changed during run
+        :return: rows of n ticks
+        '''
+        rows = self.__evaluate(n)
+        self.__rows = None
+        if n > 0:
+            self.t = rows.t[-1]
+            self.ω = (rows.ω_1[-1], rows.ω_2[-1])
+        return rows
+
+    def __compute(self) -> None:
+        # Compute segment of next segment_ticks ticks
+        self.__rows = self.__evaluate(self.segment_ticks)
+        self.__i = 0
+
+    def __evaluate(self, n: int) -> StateColumns:
+        # States of next n ticks from origin of current parameters, t is accumulated tick by tick after last
+        # served tick (as t += Δt of interactive loop)
+        set_t = np.cumsum(np.concatenate(([self.t], np.full(n, self.Δt))))[1:]
+        self.n_segments += 1
+        return self.segment(set_t, self.𝔈, *self.origin)
@@ -10,11 +10,15 @@ Plotting of points and react on keyboard input
 Created 09.06.2018 author CAB
 """
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from types import MethodType
+import time
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba, to_rgba_array
+from matplotlib.transforms import blended_transform_factory
 import abc
-import networkx as nx
 
 # Definitions
 class NodeLike(metaclass=abc.ABCMeta):
@@ -34,6 +38,27 @@ class GraphLike(metaclass=abc.ABCMeta):
         :return: list of all nodes
         """
         pass
+    def graph_repr_window(self, d_min: int, d_max: int) -> List[NodeLike]:
+        """
+        Used to pool of nodes with depth (x position) in [d_min, d_max] by GraphVisualisation (around evaluation
+        frontier on each render and in viewport mode), graphs with many nodes should override it to not visit all nodes
+        :return: list of nodes in depth window
+        """
+        return [node for node in self.graph_repr() if d_min <= node.graph_repr()[1][0] <= d_max]
+    def frontier(self) -> Optional[int]:
+        """
+        Used by GraphVisualisation to re-pool only layers around evaluation frontier and in viewport mode to follow it
+        :return: depth of last evaluated layer or None if unknown (then all nodes are re-pooled on each render and
+                 deepest node is followed)
+        """
+        return None
+    def changed_depths(self) -> Optional[Tuple[int, int]]:
+        """
+        Used by GraphVisualisation to also re-pool layers which were changed since last render but not seen on
+        evaluation frontier by it (e.g. graph published by other process)
+        :return: (lowest, highest) depth of layers changed since last call or None if unknown or not changed
+        """
+        return None
     def redraw(self):
         """
         Can be used by Graph implementation to update its visual representation
@@ -51,12 +76,21 @@ class GraphVisualisation:
             name: str,
             graph: GraphLike,
             pause: float = .01,
-            window_size: Tuple[float, float] = (14, 6)):
+            window_size: Tuple[float, float] = (14, 6),
+            fps: Optional[float] = None,
+            depth_window: Optional[int] = None,
+            summary: bool = False):
         '''
         Construct a visualisation for given graph implementation
         :param graph: an graph implementation as list of ones
         :param pause: execution timeout (should not be to small since UI will frozen)
         :param window_size: Size of the window (w, h), in inches (1in == 2.54cm)
+        :param fps: if given graph redraw requests are accumulated and graph repainted not often than fps
+                    frames per second, without pause, so simulation not blocked by UI, else graph repainted
+                    and paused on each redraw
+        :param depth_window: if given only nodes in window of depth_window layers around evaluation frontier
+                             are pooled and drawn (viewport mode), window is moved when frontier leave it
+        :param summary: in viewport mode show summary glyph of layers passed by window on the left of it
         '''
         # Parameters
         self.__window_title = "Graph visualisation: " + name
@@ -65,44 +99,252 @@ class GraphVisualisation:
         self.__padding_bottom=.09
         self.__padding_right=.97
         self.__padding_top=.98
+        self.__node_size = 300
+        self.__label_font_size = 12
+        self.__margin = .05  # Relative to range of nodes positions
+        self.__frontier_offset = max(depth_window // 4, 1) if depth_window else 0  # Frontier position in window
+        self.__frontier_margin = 1  # Layers around passed frontier which are re-pooled on render
         # Fields
         self.__graph = graph
         self.__pause = pause
+        self.__frame_interval = None if fps is None else 1.0 / fps
+        self.__last_frame = 0.0
+        self.__dirty = False  # Redraw requested after last frame
+        self.__animated = fps is not None  # Nodes and labels are blitted over background with edges
+        self.__background = None
+        self.__index = {}  # Node -> index of node in artists
+        self.__layers = {}  # Depth -> set of shown nodes of layer
+        self.__lowest = None  # Lowest depth of shown nodes
+        self.__frontier = None  # Frontier of last render, None to pool all nodes
+        self.__passed = None  # (lowest, highest) frontier of redraw requests coalesced since last render
+        self.__labels = []  # Label strings of nodes
+        self.__colors = []  # Color chars of nodes
+        self.__positions = []  # (x, y) of nodes
+        self.__segments = []  # Edges as [(x, y), (x, y)]
+        self.__rgba = np.zeros((0, 4))  # Face colors of nodes
+        self.__nodes_artist = None
+        self.__edges_artist = None
+        self.__label_artists = []
+        self.__depth_window = depth_window
+        self.__window = None  # (d_min, d_max) of viewport
+        self.__summary_artist = None
+        self.__pooled_depths = set()  # Depths of layers ever pooled in viewport mode with summary
         # Init
         fig, self.__ax = plt.subplots()
-        self.__graph_view = nx.Graph()
+        self.__fig = fig
         fig.subplots_adjust(self.__padding_left, self.__padding_bottom, self.__padding_right, self.__padding_top)
         fig.canvas.set_window_title(self.__window_title)
         self.__ax.set_xlabel("depth", fontsize=self.__xy_label_font_size)
         self.__ax.set_ylabel("width", fontsize=self.__xy_label_font_size)
+        self.__ax.tick_params(axis="both", which="both", bottom=False, left=False, labelbottom=False, labelleft=False)
         fig.set_size_inches(*window_size)
+        # Save background on each full redraw (e.g. window resize)
+        if self.__animated:
+            fig.canvas.mpl_connect('draw_event', lambda event: self.__on_draw())
+        if summary and depth_window is not None:
+            self.__summary_artist = self.__ax.text(  # Placed in slot on the left of window, X in data Y in axes
+                0, .5, "", transform=blended_transform_factory(self.__ax.transData, self.__ax.transAxes),
+                size=self.__label_font_size, color="k",
+                horizontalalignment="center", verticalalignment="center", visible=False,
+                bbox=dict(boxstyle="round", facecolor="lightgray", edgecolor="gray"))
         # Set callback
-        graph.redraw = MethodType(lambda a: self.__render(pause), self)
+        graph.redraw = MethodType(lambda a: self.__request_render(), self)
         # First render of graph
         self.__render(0.0001)
 
-    def __render(self, t_pause):
-        # Build view
-        nodes = self.__graph.graph_repr()
-        labels = {}
-        positions = {}
+    def __build(self, reprs):
+        # Remove old and build new node, edge and label artists for all nodes
+        for artist in [self.__nodes_artist, self.__edges_artist] + self.__label_artists:
+            if artist is not None:
+                artist.remove()
+        self.__index = {}
+        self.__layers = {}
+        self.__lowest = None
+        self.__labels = []
+        self.__colors = []
+        self.__positions = []
+        self.__segments = []
+        self.__rgba = np.zeros((0, 4))
+        self.__label_artists = []
+        self.__nodes_artist = self.__ax.scatter([], [], s=self.__node_size, zorder=2, animated=self.__animated)
+        self.__edges_artist = LineCollection([], colors="k", linewidths=1.0, zorder=1)
+        self.__ax.add_collection(self.__edges_artist)
+        self.__add(reprs)
+
+    def __add(self, reprs):
+        # Append artists of new nodes (and their edges) to existing ones
         edges = []
-        colors = ""
-        for node in nodes:
-            label, pos, color, eds = node.graph_repr()
-            assert len(color) == 1, f"color string should have exactly 1 char length, got{color} len({len(color)})"
-            labels[node] = label
-            positions[node] = pos
-            colors += color
+        for node, (label, pos, color, eds) in reprs:
+            self.__index[node] = len(self.__positions)
+            depth = int(pos[0])
+            self.__layers.setdefault(depth, set()).add(node)
+            self.__lowest = depth if self.__lowest is None else min(self.__lowest, depth)
+            self.__labels.append(label)
+            self.__colors.append(color)
+            self.__positions.append(pos)
+            self.__label_artists.append(self.__ax.text(
+                pos[0], pos[1], label, size=self.__label_font_size, color="k",
+                horizontalalignment="center", verticalalignment="center", clip_on=True, animated=self.__animated))
             edges.extend(eds)
-        # Set view
-        self.__graph_view.clear()
-        self.__ax.clear()
-        self.__graph_view.add_nodes_from(nodes)
-        self.__graph_view.add_edges_from(edges)
-        nx.draw_networkx(self.__graph_view, ax= self.__ax, labels=labels, pos=positions, node_color=colors)
+        self.__segments.extend(
+            [self.__positions[self.__index[a]], self.__positions[self.__index[b]]]
+            for a, b in edges if a in self.__index and b in self.__index)
+        self.__rgba = np.concatenate([self.__rgba, to_rgba_array([color for _, (_, _, color, _) in reprs])])
+        positions = np.array(self.__positions, dtype=np.float64).reshape(-1, 2)
+        self.__nodes_artist.set_offsets(positions)
+        self.__nodes_artist.set_facecolor(self.__rgba)
+        self.__nodes_artist.set_edgecolor(self.__rgba)
+        self.__edges_artist.set_segments(self.__segments)
+        if len(positions) > 0:
+            (x_min, y_min), (x_max, y_max) = positions.min(axis=0), positions.max(axis=0)
+            if self.__window is not None:
+                x_min, x_max = self.__window
+                if self.__summary_artist is not None and self.__summary_artist.get_visible():
+                    x_min -= 1
+            x_pad = (x_max - x_min) * self.__margin or .5
+            y_pad = (y_max - y_min) * self.__margin or .5
+            self.__ax.set_xlim(x_min - x_pad, x_max + x_pad)
+            self.__ax.set_ylim(y_min - y_pad, y_max + y_pad)
+
+    def __reprs(self, nodes):
+        # Pairs (node, repr), repr of each node is got once per render
+        reprs = []
+        for node in nodes:
+            node_repr = node.graph_repr()
+            assert len(node_repr[2]) == 1, \
+                f"color string should have exactly 1 char length, got{node_repr[2]} len({len(node_repr[2])})"
+            reprs.append((node, node_repr))
+        return reprs
+
+    def __pooled(self):
+        # All nodes, or in viewport mode nodes of depth window
+        if self.__window is None:
+            return self.__reprs(self.__graph.graph_repr())
+        return self.__reprs(self.__graph.graph_repr_window(*self.__window))
+
+    def __move_window(self, frontier):
+        # In viewport mode move window if frontier left it, return True if moved
+        if self.__window is not None and self.__window[0] <= frontier < self.__window[1]:
+            return False
+        d_min = max(frontier - self.__frontier_offset, 0)
+        self.__window = (d_min, d_min + self.__depth_window - 1)
+        if self.__summary_artist is not None:
+            # Only layers which were pooled (shown by window before, maybe evicted since) are summarised
+            passed = [d for d in self.__pooled_depths if d < d_min]
+            if passed:
+                self.__summary_artist.set_text(f"{min(passed)}..{max(passed)}\n({len(passed)} layers)")
+                self.__summary_artist.set_x(d_min - 1)
+            self.__summary_artist.set_visible(len(passed) > 0)
+        return True
+
+    def __pool_nodes(self):
+        # Reprs of all pooled nodes (then returned layers is None) on first render, when viewport moved or
+        # frontier unknown, else only of nodes in layers around frontier passed since last render (returned
+        # layers is range of them), viewport follows evaluation frontier
+        frontier = self.__graph.frontier()
+        prev, self.__frontier = self.__frontier, frontier
+        passed = [d for ds in [self.__passed, self.__graph.changed_depths()] if ds is not None for d in ds]
+        self.__passed = None
+        if frontier is None:
+            reprs = self.__reprs(self.__graph.graph_repr())
+            if self.__depth_window is None:
+                return reprs, None
+            self.__move_window(max((node_repr[1][0] for _, node_repr in reprs), default=0))
+            d_min, d_max = self.__window
+            return [(node, node_repr) for node, node_repr in reprs if d_min <= node_repr[1][0] <= d_max], None
+        moved = self.__depth_window is not None and self.__move_window(frontier)
+        if self.__nodes_artist is None or prev is None or moved:
+            return self.__pooled(), None
+        d_min = max(min(frontier, prev, *passed) - self.__frontier_margin, 0)
+        d_max = max(frontier, prev, *passed) + 1 + self.__frontier_margin
+        if self.__window is not None:
+            d_min, d_max = max(d_min, self.__window[0]), min(d_max, self.__window[1])
+        return self.__reprs(self.__graph.graph_repr_window(d_min, d_max)), range(d_min, d_max + 1)
+
+    def __vanished(self, reprs, layers):
+        # True if some of shown nodes in re-pooled layers or in lowest shown layer (evicted first) disappeared
+        pooled = set(node for node, _ in reprs)
+        if any(node not in pooled for d in layers for node in self.__layers.get(d, ())):
+            return True
+        if self.__lowest is None or self.__lowest in layers:
+            return False
+        lowest = self.__layers[self.__lowest]
+        return len(lowest.intersection(self.__graph.graph_repr_window(self.__lowest, self.__lowest))) != len(lowest)
+
+    def __render(self, t_pause):
+        # Update view, artists are rebuilt only if some of shown nodes disappeared, new nodes are appended,
+        # for existing nodes only changed labels and colors are updated
+        reprs, layers = self.__pool_nodes()
+        if layers is None:
+            rebuild = self.__nodes_artist is None or \
+                len(reprs) - sum(node not in self.__index for node, _ in reprs) != len(self.__index)
+        elif self.__vanished(reprs, layers):
+            reprs, rebuild = self.__pooled(), True
+        else:
+            rebuild = False
+        if self.__summary_artist is not None:
+            self.__pooled_depths.update(int(node_repr[1][0]) for _, node_repr in reprs)
+        topology_changed = rebuild
+        if rebuild:
+            self.__build(reprs)
+        else:
+            new_nodes = [(node, node_repr) for node, node_repr in reprs if node not in self.__index]
+            topology_changed = len(new_nodes) > 0
+            colors_changed = False
+            for node, (label, _, color, _) in reprs:
+                i = self.__index.get(node)
+                if i is None:
+                    continue
+                if label != self.__labels[i]:
+                    self.__labels[i] = label
+                    self.__label_artists[i].set_text(label)
+                if color != self.__colors[i]:
+                    self.__colors[i] = color
+                    self.__rgba[i] = to_rgba(color)
+                    colors_changed = True
+            if new_nodes:
+                self.__add(new_nodes)
+            elif colors_changed:
+                self.__nodes_artist.set_facecolor(self.__rgba)
+                self.__nodes_artist.set_edgecolor(self.__rgba)
         # Show plot
-        plt.pause(t_pause)
+        if self.__frame_interval is None:
+            plt.pause(t_pause)
+        else:
+            canvas = self.__fig.canvas
+            if topology_changed or self.__background is None:
+                canvas.draw()
+            else:
+                canvas.restore_region(self.__background)
+                self.__draw_animated()
+            canvas.blit(self.__fig.bbox)
+            canvas.flush_events()
+            self.__last_frame = time.perf_counter()
+            self.__dirty = False
+
+    def __draw_animated(self):
+        self.__ax.draw_artist(self.__nodes_artist)
+        for artist in self.__label_artists:
+            self.__ax.draw_artist(artist)
+
+    def __on_draw(self):
+        # Full redraw done (without animated nodes and labels), save it as background and draw them on top
+        if self.__nodes_artist is not None:
+            self.__background = self.__fig.canvas.copy_from_bbox(self.__fig.bbox)
+            self.__draw_animated()
+
+    def __request_render(self):
+        # In fps mode redraw requests between frames are coalesced into single render
+        if self.__frame_interval is None:
+            self.__render(self.__pause)
+        else:
+            self.__dirty = True
+            frontier = self.__graph.frontier()
+            if frontier is not None:
+                lowest, highest = self.__passed or (frontier, frontier)
+                self.__passed = (min(lowest, frontier), max(highest, frontier))
+            if time.perf_counter() - self.__last_frame >= self.__frame_interval:
+                self.__render(self.__pause)
 
     def update(self):
         """
@@ -115,4 +357,9 @@ class GraphVisualisation:
         '''
         Used to make chart visible after program ended
         '''
+        if self.__dirty:
+            self.__render(self.__pause)
+        if self.__animated:
+            for artist in [self.__nodes_artist] + self.__label_artists:
+                artist.set_animated(False)
         plt.show()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Headless recorder tool
+Recording of chart series and graph states without GUI, with same API as ChartRecorder2D and GraphVisualisation
+Created 18.10.2026 author CAB
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from types import MethodType
+import json
+import math
+import os
+import zipfile
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from tools.chart_recorder_2d import SeriesBuffer
+from tools.graph_visualisation import GraphLike
+
+# Definitions
+def _render_chart(
+        file: str,
+        name: str,
+        lines: List[Tuple[str, str]],
+        xss: List[np.ndarray],
+        yss: List[np.ndarray],
+        limits: Tuple[float, float, float, float],
+        xy_label: Tuple[str, str],
+        window_size: Tuple[float, float]) -> str:
+    # Render chart frame to image file with Agg (run in background process)
+    fig = Figure(figsize=window_size)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.grid(color="gray")
+    ax.set_title(name, fontsize=12)
+    for (line_name, form), xs, ys in zip(lines, xss, yss):
+        ax.plot(xs, ys, form, label=line_name)
+    ax.set_xlim(limits[0], limits[1])
+    ax.set_ylim(limits[2], limits[3])
+    ax.set_xlabel(xy_label[0], fontsize=12)
+    ax.set_ylabel(xy_label[1], fontsize=12)
+    fig.legend()
+    fig.savefig(file)
+    return file
+
+def _render_graph(
+        file: str,
+        labels: List[str],
+        positions: np.ndarray,
+        colors: List[str],
+        segments: List[List[Tuple[float, float]]],
+        window_size: Tuple[float, float]) -> str:
+    # Render graph frame to image file with Agg (run in background process)
+    fig = Figure(figsize=window_size)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_xlabel("depth", fontsize=12)
+    ax.set_ylabel("width", fontsize=12)
+    ax.tick_params(axis="both", which="both", bottom=False, left=False, labelbottom=False, labelleft=False)
+    ax.add_collection(LineCollection(segments, colors="k", linewidths=1.0, zorder=1))
+    if len(positions) > 0:
+        ax.scatter(positions[:, 0], positions[:, 1], s=300, c=colors, zorder=2)
+        for label, (x, y) in zip(labels, positions):
+            ax.text(x, y, label, size=12, color="k", horizontalalignment="center", verticalalignment="center")
+        (x_min, y_min), (x_max, y_max) = positions.min(axis=0), positions.max(axis=0)
+        x_pad = (x_max - x_min) * .05 or .5
+        y_pad = (y_max - y_min) * .05 or .5
+        ax.set_xlim(x_min - x_pad, x_max + x_pad)
+        ax.set_ylim(y_min - y_pad, y_max + y_pad)
+    fig.savefig(file)
+    return file
+
+def load_series(path: str) -> Tuple[Dict[str, Any], np.ndarray, List[np.ndarray]]:
+    '''
+    Read series recorded by HeadlessChartRecorder
+    :param path: path of recorded .npz file
+    :return: (meta data dict, X column, [Y column for each line])
+    '''
+    with zipfile.ZipFile(path) as zf:
+        meta = json.loads(zf.read("meta.json"))
+        names = sorted(n for n in zf.namelist() if n.startswith("chunk_"))
+        chunks = [np.lib.format.read_array(zf.open(n)) for n in names]
+    data = np.concatenate(chunks, axis=1) if chunks else np.empty((1 + len(meta["lines"]), 0))
+    return meta, data[0], list(data[1:])
+
+class HeadlessChartRecorder:
+    '''
+    Recording of points without GUI, has same API as ChartRecorder2D.
+    Points are streamed in chunks of chunk_size to single .npz file (each chunk is .npy member added on the fly,
+    so file is readable by load_series at any time), optional frames are rendered with Agg in background process.
+    '''
+
+    def __init__(
+            self,
+            name: str,
+            lines: List[Tuple[str, str]],
+            path: str,
+            x_range: Tuple[float, float] = None,
+            y_range: Tuple[float, float] = None,
+            xy_label: Tuple[str, str] = ("X", "Y"),
+            window_size: Tuple[float, float] = (10, 6),
+            max_points: Optional[int] = None,
+            chunk_size: int = 65536,
+            frame_every: Optional[int] = None,
+            final_frame: bool = True):
+        '''
+        Construct a recorder and create (or replace) recording file
+        :param name: chart name
+        :param lines: list of lines [(<line name>, <matplotlib format>)]
+        :param path: path of .npz file to stream points to, frames saved as <path without .npz>_<frame>.png
+        :param x_range: the optional range of X axis of frames, if None will auto scaled
+        :param y_range: the optional range of Y axis of frames, if None will auto scaled
+        :param xy_label: labels of axes of frames
+        :param window_size: size of frames (w, h), in inches
+        :param max_points: if given frames show only last max_points (scrolling mode), all points are recorded
+        :param chunk_size: number of points in one chunk written to file
+        :param frame_every: if given frame is rendered every frame_every appended points
+        :param final_frame: if True frame is rendered on show()
+        '''
+        # Parameters
+        self.__mim_min = -.1
+        self.__max_max = +.1
+        self.__frame_buckets = 2000  # Max number of min/max buckets of line in frame
+        # Fields
+        self.__name = name
+        self.__lines = lines
+        self.__path = path
+        self.__x_range = x_range
+        self.__y_range = y_range
+        self.__xy_label = xy_label
+        self.__window_size = window_size
+        self.__frame_every = frame_every
+        self.__final_frame = final_frame
+        self.__chunk = np.empty((1 + len(lines), chunk_size))
+        self.__i = 0  # Number of points in current chunk
+        self.__n_chunks = 0
+        self.__n = 0  # Number of appended points
+        self.__buffer = SeriesBuffer(len(lines), max_points) if frame_every or final_frame else None
+        self.__callbacks = []
+        self.__pool = None
+        self.__frames = []  # Futures of rendered frames
+        # Init
+        with zipfile.ZipFile(path, "w") as zf:
+            zf.writestr("meta.json", json.dumps(
+                {"name": name, "lines": lines, "xy_label": xy_label, "x_range": x_range, "y_range": y_range}))
+
+    def append(self, x: float, ys: [float]) -> None:
+        '''
+        Append point fot each Y coordinate at X coordinate
+        :param x: X coordinate
+        :param ys: list of Y coordinated
+        '''
+        self.__chunk[0, self.__i] = x
+        self.__chunk[1:, self.__i] = ys
+        self.__i += 1
+        self.__n += 1
+        if self.__i == self.__chunk.shape[1]:
+            self.__write_chunk()
+        if self.__buffer is not None:
+            self.__buffer.append(x, ys)
+            if self.__frame_every and self.__n % self.__frame_every == 0:
+                self.__render_frame()
+
+    def __write_chunk(self):
+        # Add points of current chunk to file as new .npy member
+        if self.__i == 0:
+            return
+        with zipfile.ZipFile(self.__path, "a") as zf:
+            with zf.open(f"chunk_{self.__n_chunks:06d}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.ascontiguousarray(self.__chunk[:, :self.__i]))
+        self.__n_chunks += 1
+        self.__i = 0
+
+    def __limits(self) -> Tuple[float, float, float, float]:
+        # Axes limits, auto scaled same way as in ChartRecorder2D
+        def min_max(mnv, mxv):
+            if mnv == mxv:
+                return mnv + self.__mim_min, mxv + self.__max_max
+            else:
+                return mnv, mxv
+        mins, maxs = self.__buffer.extrema()
+        x_lim = self.__x_range if self.__x_range is not None else min_max(mins[0], maxs[0])
+        if self.__y_range is not None:
+            y_lim = self.__y_range
+        else:
+            min_y = self.__mim_min
+            max_y = self.__max_max
+            for mn, mx in zip(mins[1:], maxs[1:]):
+                mn, mx = min_max(mn, mx)
+                if mn < min_y: min_y = mn
+                if mx > max_y: max_y = mx
+            y_lim = (min_y, max_y)
+        return float(x_lim[0]), float(x_lim[1]), float(y_lim[0]), float(y_lim[1])
+
+    def __render_frame(self):
+        # Send decimated snapshot of lines to background process
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(max_workers=1)
+        limits = self.__limits()
+        xss, yss = self.__buffer.decimated(limits[0], limits[1], self.__frame_buckets)
+        file = f"{os.path.splitext(self.__path)[0]}_{self.__n:09d}.png"
+        self.__frames.append(self.__pool.submit(
+            _render_chart, file, self.__name, self.__lines, [np.array(xs) for xs in xss],
+            [np.array(ys) for ys in yss], limits, self.__xy_label, self.__window_size))
+
+    def on_kay_press(self, handler: Callable[[str], None]) -> None:
+        '''
+        Handler kept for API compatibility with ChartRecorder2D, no keyboard input in headless mode
+        '''
+        self.__callbacks.append(handler)
+
+    def flush(self) -> None:
+        '''
+        Write points accumulated in current chunk to file
+        '''
+        self.__write_chunk()
+
+    def show(self) -> List[str]:
+        '''
+        Write remaining points, render final frame (if enabled) and wait all frames rendered
+        :return: list of rendered frame files
+        '''
+        self.__write_chunk()
+        if self.__final_frame and self.__n > 0:
+            self.__render_frame()
+        files = [frame.result() for frame in self.__frames]
+        self.__frames = []
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+        return files
+
+class HeadlessGraphVisualisation:
+    '''
+    Recording of graph states without GUI, has same API as GraphVisualisation.
+    Frames are rendered with Agg in background process, final nodes table is saved to .npz file on show().
+    Optionally colors of nodes are recorded on each update as changes since previous update (0 color code for
+    node which is no more shown), together with table of all ever shown nodes, so run can be rendered offline
+    (see tools.offline_renderer). If graph knows its evaluation frontier (see GraphLike.frontier) only nodes of
+    layers evaluated since last update (got by graph_repr_window) are recorded, so cost of update not depends on
+    size of graph. Frames rendered during run are built from recorded table, not by walking whole graph.
+    '''
+
+    def __init__(
+            self,
+            name: str,
+            graph: GraphLike,
+            path: str,
+            window_size: Tuple[float, float] = (14, 6),
+            frame_every: Optional[int] = None,
+            final_frame: bool = True,
+            record_states: bool = False,
+            margin: int = 1):
+        '''
+        Construct a recorder for given graph implementation
+        :param name: graph name
+        :param graph: an graph implementation
+        :param path: path of .npz file for nodes table, frames saved as <path without .npz>_<frame>.png
+        :param window_size: size of frames (w, h), in inches
+        :param frame_every: if given frame is rendered every frame_every redraw or update calls
+        :param final_frame: if True frame is rendered on show()
+        :param record_states: if True colors of nodes are recorded on each redraw or update call
+        :param margin: number of layers before last recorded frontier and after current one which are recorded too
+                       (e.g. inputs assigned ahead of evaluation)
+        '''
+        # Parameters
+        self.margin = margin
+        # Fields
+        self.__graph = graph
+        self.__path = path
+        self.__window_size = window_size
+        self.__frame_every = frame_every
+        self.__final_frame = final_frame
+        self.__n = 0  # Number of redraw and update calls
+        self.__pool = None
+        self.__frames = []  # Futures of rendered frames
+        self.__record_states = record_states
+        self.__track = record_states or bool(frame_every)  # Node table is kept up to date on each update
+        self.__node_ids = {}  # Node -> id in table of all ever shown nodes
+        self.__node_labels = []
+        self.__node_positions = []
+        self.__node_edges = []  # (id, id)
+        self.__node_colors = []  # Last recorded color code of each node, 0 if not shown
+        self.__shown = {}  # Layer (floor of node x) -> ids of shown nodes
+        self.__frontier = None  # Last recorded frontier
+        self.__lowest = 0  # Lowest layer which can have shown nodes
+        self.__state_offsets = [0]  # Start of changes of each update in state_ids and state_colors
+        self.__state_ids = []
+        self.__state_colors = []
+        # Set callback
+        graph.redraw = MethodType(lambda a: self.update(), self)
+
+    def __snapshot(self) -> Tuple[List[str], np.ndarray, List[str], List[List[Tuple[float, float]]]]:
+        # Labels, positions, colors and edges segments of all nodes, from node table if it's kept up to date
+        if not self.__track:
+            return self.__walk()
+        colors = np.array(self.__node_colors, dtype=np.uint32)
+        shown = np.flatnonzero(colors)
+        positions = np.array(self.__node_positions, dtype=np.float64).reshape(-1, 2)
+        edges = np.array(self.__node_edges, dtype=np.int64).reshape(-1, 2)
+        edges = edges[(colors[edges[:, 0]] != 0) & (colors[edges[:, 1]] != 0)]
+        segments = np.stack((positions[edges[:, 0]], positions[edges[:, 1]]), axis=1).tolist()
+        return ([self.__node_labels[i] for i in shown.tolist()], positions[shown],
+                [chr(code) for code in colors[shown].tolist()], segments)
+
+    def __walk(self) -> Tuple[List[str], np.ndarray, List[str], List[List[Tuple[float, float]]]]:
+        # Labels, positions, colors and edges segments of all nodes of graph
+        labels = []
+        positions = []
+        colors = []
+        edges = []
+        index = {}
+        for node in self.__graph.graph_repr():
+            label, pos, color, eds = node.graph_repr()
+            index[node] = len(positions)
+            labels.append(label)
+            positions.append(pos)
+            colors.append(color)
+            edges.extend(eds)
+        segments = [[positions[index[a]], positions[index[b]]] for a, b in edges if a in index and b in index]
+        return labels, np.array(positions, dtype=np.float64).reshape(-1, 2), colors, segments
+
+    def __render_frame(self):
+        # Send snapshot of nodes to background process
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(max_workers=1)
+        file = f"{os.path.splitext(self.__path)[0]}_{self.__n:09d}.png"
+        self.__frames.append(self.__pool.submit(_render_graph, file, *self.__snapshot(), self.__window_size))
+
+    def __record_state(self):
+        # Record changed colors of nodes of layers evaluated since last update (all nodes on first update or if
+        # frontier unknown) and hiding of nodes which are no more in graph
+        frontier = self.__graph.frontier()
+        if frontier is None or self.__frontier is None:
+            self.__record_nodes(self.__graph.graph_repr(), list(self.__shown))
+        else:
+            d_min = max(min(frontier, self.__frontier) - self.margin, 0)
+            d_max = max(frontier, self.__frontier) + 1 + self.margin
+            self.__record_nodes(self.__graph.graph_repr_window(d_min, d_max), range(d_min, d_max + 1))
+            # Layers below window are evicted (if at all) oldest first, so checked up to first retained one
+            while self.__lowest < d_min:
+                ids = self.__shown.get(self.__lowest)
+                if ids:
+                    self.__record_nodes(self.__graph.graph_repr_window(self.__lowest, self.__lowest), [self.__lowest])
+                    if self.__shown.get(self.__lowest):
+                        break
+                self.__lowest += 1
+        self.__frontier = frontier
+        self.__state_offsets.append(len(self.__state_ids))
+
+    def __record_nodes(self, nodes, layers):
+        # Record colors of given nodes, shown nodes of given layers which are not in nodes are hidden
+        seen = set()
+        new_edges = []
+        for node in nodes:
+            label, pos, color, eds = node.graph_repr()
+            i = self.__node_ids.get(node)
+            if i is None:
+                i = len(self.__node_labels)
+                self.__node_ids[node] = i
+                self.__node_labels.append(label)
+                self.__node_positions.append(pos)
+                self.__node_colors.append(0)
+                new_edges.extend(eds)
+            seen.add(i)
+            code = ord(color)
+            if self.__node_colors[i] != code:
+                if self.__node_colors[i] == 0:
+                    layer = math.floor(pos[0])
+                    self.__shown.setdefault(layer, set()).add(i)
+                    self.__lowest = min(self.__lowest, layer)
+                self.__node_colors[i] = code
+                self.__state_ids.append(i)
+                self.__state_colors.append(code)
+        for layer in layers:
+            hidden = self.__shown.get(layer, set()) - seen
+            for i in sorted(hidden):
+                self.__node_colors[i] = 0
+                self.__state_ids.append(i)
+                self.__state_colors.append(0)
+            if hidden:
+                self.__shown[layer] -= hidden
+                if not self.__shown[layer]:
+                    del self.__shown[layer]
+        ids = self.__node_ids
+        self.__node_edges.extend((ids[a], ids[b]) for a, b in new_edges if a in ids and b in ids)
+
+    def update(self):
+        """
+        Count update, record state and render frame if it's time
+        :return: None
+        """
+        self.__n += 1
+        if self.__track:
+            self.__record_state()
+        if self.__frame_every and self.__n % self.__frame_every == 0:
+            self.__render_frame()
+
+    def show(self) -> List[str]:
+        '''
+        Save nodes table (labels, positions, colors, edges segments) and recorded states (if enabled),
+        render final frame (if enabled) and wait all frames rendered
+        :return: list of rendered frame files
+        '''
+        labels, positions, colors, segments = self.__walk()
+        states = {}
+        if self.__record_states:
+            states = dict(
+                node_labels=np.array(self.__node_labels, dtype=str),
+                node_positions=np.array(self.__node_positions, dtype=np.float64).reshape(-1, 2),
+                node_edges=np.array(self.__node_edges, dtype=np.int64).reshape(-1, 2),
+                state_offsets=np.array(self.__state_offsets, dtype=np.int64),
+                state_ids=np.array(self.__state_ids, dtype=np.int64),
+                state_colors=np.array(self.__state_colors, dtype=np.uint32))
+        np.savez(
+            self.__path,
+            labels=np.array(labels, dtype=str),
+            positions=positions,
+            colors=np.array(colors, dtype=str),
+            segments=np.array(segments, dtype=np.float64).reshape(-1, 2, 2),
+            **states)
+        if self.__final_frame:
+            self.__render_frame()
+        files = [frame.result() for frame in self.__frames]
+        self.__frames = []
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+        return files
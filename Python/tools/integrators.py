@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Integrators tool
+Adaptive step integrators with error control and dense output on requested grid, and mixing model backed by them
+Created 18.10.2026 author CAB
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+import math
+import numpy as np
+from tools.mixing_model import JumpAhead, rhs, system_matrix
+
+# Definitions
+RHS = Callable[[float, np.ndarray], np.ndarray]        # (t, y) -> dy/dt
+Jacobian = Callable[[float, np.ndarray], np.ndarray]   # (t, y) -> ∂f/∂y
+METHODS = ("dopri5", "rosenbrock")
+
+# Dormand-Prince 5(4) tableau, error weights (b - b*) and dense output polynomial coefficients
+_DP_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1])
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656]]
+_DP_B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+_DP_E = np.array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40])
+_DP_P = np.array([
+    [1, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+    [0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+    [0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+    [0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+    [0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423]])
+
+# Rosenbrock 2(3) (ode23s of Shampine and Reichelt), L-stable so suitable for stiff flows
+_RB_D = 1 / (2 + math.sqrt(2))
+_RB_E32 = 6 + math.sqrt(2)
+
+class Solution:
+    '''
+    Result of integration: states on requested grid and work statistics.
+    '''
+
+    def __init__(self, ys: np.ndarray, n_steps: int, n_rejected: int, n_evals: int):
+        '''
+        :param ys: states, shape (number of grid points, number of variables)
+        :param n_steps: number of accepted steps
+        :param n_rejected: number of rejected steps
+        :param n_evals: number of right hand side evaluations
+        '''
+        self.ys = ys
+        self.n_steps = n_steps
+        self.n_rejected = n_rejected
+        self.n_evals = n_evals
+
+    def __repr__(self):
+        return f"Solution(points = {len(self.ys)}, steps = {self.n_steps}, rejected = {self.n_rejected}, " \
+             + f"evaluations = {self.n_evals})"
+
+def _error_norm(err, y, y_new, rtol, atol):
+    # RMS norm of error scaled by tolerance
+    scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+    return float(np.sqrt(np.mean((err / scale) ** 2)))
+
+def _initial_step(f, t, y, f_0, order, rtol, atol):
+    # Initial step by Hairer's heuristic: h such that first step error is about tolerance
+    scale = atol + rtol * np.abs(y)
+    d_0 = np.sqrt(np.mean((y / scale) ** 2))
+    d_1 = np.sqrt(np.mean((f_0 / scale) ** 2))
+    h_0 = 1e-6 if d_0 < 1e-5 or d_1 < 1e-5 else .01 * d_0 / d_1
+    f_1 = f(t + h_0, y + h_0 * f_0)
+    d_2 = np.sqrt(np.mean(((f_1 - f_0) / scale) ** 2)) / h_0
+    h_1 = max(1e-6, h_0 * 1e-3) if max(d_1, d_2) <= 1e-15 else (.01 / max(d_1, d_2)) ** (1 / (order + 1))
+    return min(100 * h_0, h_1)
+
+def _dopri5_step(f, t, y, h, f_0):
+    # One Dormand-Prince step, return (y_new, f_new, error, stages K)
+    k = np.empty((7, len(y)))
+    k[0] = f_0
+    for s in range(1, 6):
+        k[s] = f(t + _DP_C[s] * h, y + h * np.dot(_DP_A[s], k[:s]))
+    y_new = y + h * np.dot(_DP_B, k[:6])
+    k[6] = f(t + h, y_new)
+    return y_new, k[6], h * np.dot(_DP_E, k), k
+
+def _dopri5_dense(y, h, k, x):
+    # States at fractions x (array in [0, 1]) of step
+    powers = np.cumprod(np.repeat(np.asarray(x, dtype=np.float64)[:, None], 4, axis=1), axis=1)
+    return y + h * powers.dot(k.T.dot(_DP_P).T)
+
+def _rosenbrock_step(f, jac, t, y, h, f_0):
+    # One Rosenbrock 2(3) step, return (y_new, f_new, error, (k_1, k_2)), ∂f/∂t by forward difference
+    δ = 1e-8 * max(1.0, abs(t))
+    hdT = h * _RB_D * ((f(t + δ, y) - f_0) / δ)
+    w = np.eye(len(y)) - h * _RB_D * jac(t, y)
+    k_1 = np.linalg.solve(w, f_0 + hdT)
+    f_1 = f(t + .5 * h, y + .5 * h * k_1)
+    k_2 = np.linalg.solve(w, f_1 - k_1) + k_1
+    y_new = y + h * k_2
+    f_2 = f(t + h, y_new)
+    k_3 = np.linalg.solve(w, f_2 - _RB_E32 * (k_2 - f_1) - 2.0 * (k_1 - f_0) + hdT)
+    return y_new, f_2, (h / 6.0) * (k_1 - 2.0 * k_2 + k_3), (k_1, k_2)
+
+def _rosenbrock_dense(y, h, k, x):
+    # States at fractions x (array in [0, 1]) of step
+    x = np.asarray(x, dtype=np.float64)[:, None]
+    k_1, k_2 = k
+    return y + h * (((x * (1 - x)) / (1 - 2 * _RB_D)) * k_1 + ((x * (x - 2 * _RB_D)) / (1 - 2 * _RB_D)) * k_2)
+
+def _numeric_jacobian(f):
+    # Forward difference Jacobian of f
+    def jac(t, y):
+        f_0 = f(t, y)
+        j = np.empty((len(y), len(y)))
+        for i in range(len(y)):
+            δ = 1e-8 * max(1.0, abs(y[i]))
+            y_δ = y.copy()
+            y_δ[i] += δ
+            j[:, i] = (f(t, y_δ) - f_0) / δ
+        return j
+    return jac
+
+def integrate(
+        f: RHS,
+        set_t: np.ndarray,
+        y_0: np.ndarray,
+        t_0: float = 0.0,
+        method: str = "dopri5",
+        rtol: float = 1e-6,
+        atol: float = 1e-9,
+        jac: Optional[Jacobian] = None,
+        max_step: float = math.inf,
+        h_0: Optional[float] = None) -> Solution:
+    '''
+    Integrate dy/dt = f(t, y) from (t_0, y_0) with adaptive step: step is accepted if its error estimate
+    is within tolerance and next step is scaled by error, so smooth stretches take big steps and only
+    transients small ones. States on grid are taken from dense output of steps (grid not limits steps).
+        "dopri5" - explicit Dormand-Prince 5(4), for non stiff problems
+        "rosenbrock" - linearly implicit Rosenbrock 2(3), L-stable, for stiff problems (uses Jacobian)
+    :param f: right hand side (t, y) -> dy/dt
+    :param set_t: output grid, sorted, all points should be >= t_0
+    :param y_0: initial state
+    :param t_0: initial time
+    :param method: "dopri5" or "rosenbrock"
+    :param rtol: relative tolerance
+    :param atol: absolute tolerance
+    :param jac: Jacobian (t, y) -> ∂f/∂y for "rosenbrock", if None computed by finite differences
+    :param max_step: max step size
+    :param h_0: initial step size, if None chosen automatically
+    :return: Solution with states of shape (len(set_t), len(y_0))
+    '''
+    assert method in METHODS, f"method should be one of {METHODS}, got {method}"
+    set_t = np.asarray(set_t, dtype=np.float64)
+    assert len(set_t) == 0 or (set_t[0] >= t_0 and np.all(np.diff(set_t) >= 0)), "set_t should be sorted and >= t_0"
+    evals = [0]
+    def f_counted(t, y):
+        evals[0] += 1
+        return np.asarray(f(t, y), dtype=np.float64)
+    order = 4 if method == "dopri5" else 2
+    if method == "rosenbrock" and jac is None:
+        jac = _numeric_jacobian(f_counted)
+    y = np.array(y_0, dtype=np.float64)
+    ys = np.empty((len(set_t), len(y)))
+    t = t_0
+    f_y = f_counted(t, y)
+    i = int(np.searchsorted(set_t, t, side="right"))
+    ys[:i] = y
+    t_end = set_t[-1] if len(set_t) else t_0
+    h = min(h_0 or _initial_step(f_counted, t, y, f_y, order, rtol, atol), max_step)
+    n_steps = n_rejected = 0
+    while t < t_end:
+        h = min(h, max_step, t_end - t)
+        if method == "dopri5":
+            y_new, f_new, err, k = _dopri5_step(f_counted, t, y, h, f_y)
+        else:
+            y_new, f_new, err, k = _rosenbrock_step(f_counted, jac, t, y, h, f_y)
+        err_norm = _error_norm(err, y, y_new, rtol, atol)
+        finite = bool(np.isfinite(err_norm)) and bool(np.all(np.isfinite(y_new)))
+        if not finite:
+            factor = .2  # Overflow (e.g. too large step of stiff problem), rejected with max step reduction
+        else:
+            factor = 10.0 if err_norm == 0 else min(10.0, max(.2, .9 * err_norm ** (-1 / (order + 1))))
+        if not finite or err_norm > 1.0:
+            h *= factor
+            n_rejected += 1
+            assert h > 1e-14 * max(1.0, abs(t)), f"Step size too small at t = {t}"
+            continue
+        t_new = t + h if t + h < t_end else t_end
+        j = int(np.searchsorted(set_t, t_new, side="right"))
+        if j > i:
+            x = (set_t[i:j] - t) / h
+            ys[i:j] = _dopri5_dense(y, h, k, x) if method == "dopri5" else _rosenbrock_dense(y, h, k, x)
+            i = j
+        t, y, f_y = t_new, y_new, f_new
+        n_steps += 1
+        h *= factor
+    return Solution(ys, n_steps, n_rejected, evals[0])
+
+class AdaptiveModel:
+    '''
+    Mixing model integrated by adaptive integrator, same call interface as Earlier model F_ of scripts
+    (eval_t(t, 𝔈) -> (ω_1, ω_2)), integration is continued from last evaluated state of same 𝔈.
+    '''
+
+    def __init__(
+            self,
+            t_0: float,
+            ω_0: Tuple[float, float],
+            method: str = "dopri5",
+            rtol: float = 1e-6,
+            atol: float = 1e-9):
+        '''
+        :param t_0: initial time
+        :param ω_0: initial state (ω_1, ω_2)
+        :param method: integrator method, see integrate
+        :param rtol: relative tolerance
+        :param atol: absolute tolerance
+        '''
+        # Parameters
+        self.t_0 = t_0
+        self.ω_0 = ω_0
+        self.method = method
+        self.rtol = rtol
+        self.atol = atol
+        # Fields
+        self.n_steps = 0   # Accepted steps of all integrations
+        self.__last: Dict[Tuple[float, ...], Tuple[float, np.ndarray]] = {}  # 𝔈 key -> (t, ω) of last evaluation
+
+    def __system(self, 𝔈):
+        row = np.array(JumpAhead.key(𝔈))
+        m = system_matrix(row)
+        def f(t, ω):
+            return np.array(rhs(ω[0], ω[1], row))
+        def jac(t, ω):
+            return m[:2, :2]
+        return row, f, jac
+
+    def eval_grid(self, set_t: np.ndarray, 𝔈: Any) -> Solution:
+        '''
+        :param set_t: sorted grid of t >= t_0
+        :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+        :return: Solution with (ω_1, ω_2) rows
+        '''
+        _, f, jac = self.__system(𝔈)
+        solution = integrate(
+            f, set_t, self.ω_0, self.t_0, self.method, self.rtol, self.atol, jac=jac)
+        self.n_steps += solution.n_steps
+        return solution
+
+    def eval_t(self, t_x: float, 𝔈: Any) -> Tuple[float, float]:
+        '''
+        :param t_x: time >= t_0
+        :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+        :return: (ω_1, ω_2) at t_x
+        '''
+        row, f, jac = self.__system(𝔈)
+        key = tuple(row.tolist())
+        t, ω = self.__last.get(key, (self.t_0, np.array(self.ω_0, dtype=np.float64)))
+        if t_x < t:
+            t, ω = self.t_0, np.array(self.ω_0, dtype=np.float64)
+        solution = integrate(f, [t_x], ω, t, self.method, self.rtol, self.atol, jac=jac)
+        self.n_steps += solution.n_steps
+        ω = solution.ys[0]
+        self.__last[key] = (t_x, ω)
+        return float(ω[0]), float(ω[1])
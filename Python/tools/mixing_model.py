@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Mixing problem model tool
+Vectorized evaluation of two tank mixing model over arrays of t and 𝔈 rows, jump ahead by transition matrices
+and checkpointed Earlier model
+Created 18.10.2026 author CAB
+"""
+
+from typing import Any, List, Optional, Tuple
+import bisect
+import math
+import numpy as np
+
+# Definitions
+PARAMETERS = ("v_1", "v_2", "q_1", "q_2", "q_3", "q_4", "ω_3")  # Column order of 𝔈 rows
+
+def parameter_table(set𝔈: List[Any]) -> np.ndarray:
+    '''
+    Convert list of 𝔈 objects (with fields v_1, v_2, q_1, q_2, q_3, q_4, ω_3) to float64 table of 𝔈 rows
+    :param set𝔈: list of 𝔈 objects
+    :return: array of shape (len(set𝔈), 7) with columns in PARAMETERS order
+    '''
+    return np.array([[getattr(𝔈, name) for name in PARAMETERS] for 𝔈 in set𝔈], dtype=np.float64)
+
+def rhs(ω_1: np.ndarray, ω_2: np.ndarray, 𝔈s: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Right hand side of mixing model ODE, i.e. derivatives (dω_1/dt, dω_2/dt) in given state
+    :param ω_1: array of ω_1
+    :param ω_2: array of ω_2
+    :param 𝔈s: 𝔈 rows (columns in PARAMETERS order), shape (7,) or any shape (..., 7) broadcastable with ω
+    :return: (dω_1/dt, dω_2/dt) arrays
+    '''
+    𝔈s = np.asarray(𝔈s, dtype=np.float64)
+    v_1, v_2, q_1, q_2, q_3, q_4, ω_3 = (𝔈s[..., i] for i in range(len(PARAMETERS)))
+    dω_1 = ((q_1 * ω_3) + (q_2 * ω_2) - (q_3 * ω_1)) / v_1
+    dω_2 = ((q_3 * ω_1) - (q_2 * ω_2) - (q_4 * ω_2)) / v_2
+    return dω_1, dω_2
+
+def closed_form(
+        t: np.ndarray,
+        𝔈s: np.ndarray,
+        ω_0: Tuple[float, float],
+        t_0: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Analytic solution of dω/dt = Aω + b (ω = [ω_1, ω_2]) for any 𝔈 evaluated by single broadcast,
+    uses ω(t) = ω* + e^(A(t - t_0))(ω_0 - ω*), where ω* is equilibrium state and e^(At) is expressed
+    by eigenvalues λ± = m ± s of A (always real for non negative flows)
+    :param t: float64 array of t
+    :param 𝔈s: 𝔈 rows (columns in PARAMETERS order), shape (7,) or any shape (..., 7) broadcastable with t
+    :param ω_0: initial state (ω_1, ω_2) at t_0
+    :param t_0: initial time
+    :return: (ω_1, ω_2) arrays of broadcast shape of t and 𝔈s[..., 0]
+    '''
+    t = np.asarray(t, dtype=np.float64)
+    a_11, a_12, a_21, a_22, b_1, ωs_1, ωs_2 = _system(𝔈s)
+    c, k, m = _exp_coefficients(a_11, a_12, a_21, a_22, t - t_0)
+    d_1 = ω_0[0] - ωs_1
+    d_2 = ω_0[1] - ωs_2
+    ω_1 = ωs_1 + (c * d_1) + (k * (((a_11 - m) * d_1) + (a_12 * d_2)))
+    ω_2 = ωs_2 + (c * d_2) + (k * ((a_21 * d_1) + ((a_22 - m) * d_2)))
+    return ω_1, ω_2
+
+def _system(𝔈s):
+    # System matrix A, input b = [b_1, 0] and equilibrium state ω* of dω/dt = Aω + b
+    𝔈s = np.asarray(𝔈s, dtype=np.float64)
+    v_1, v_2, q_1, q_2, q_3, q_4, ω_3 = (𝔈s[..., i] for i in range(len(PARAMETERS)))
+    a_11 = -q_3 / v_1
+    a_12 = q_2 / v_1
+    a_21 = q_3 / v_2
+    a_22 = -(q_2 + q_4) / v_2
+    b_1 = (q_1 * ω_3) / v_1
+    det = (a_11 * a_22) - (a_12 * a_21)
+    ωs_1 = -((a_22 * b_1) / det)
+    ωs_2 = (a_21 * b_1) / det
+    return a_11, a_12, a_21, a_22, b_1, ωs_1, ωs_2
+
+def _exp_coefficients(a_11, a_12, a_21, a_22, τ):
+    # e^(Aτ) = c(τ)I + k(τ)(A - mI), where c = e^(mτ)cosh(sτ), k = e^(mτ)sinh(sτ)/s
+    m = (a_11 + a_22) / 2.0
+    s = np.sqrt(np.maximum(((a_11 - a_22) / 2.0) ** 2 + (a_12 * a_21), 0.0))
+    e_p = np.exp((m + s) * τ)
+    e_m = np.exp((m - s) * τ)
+    c = (e_p + e_m) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        k = np.where(
+            s * np.abs(τ) < .5,
+            e_m * np.expm1(2.0 * s * τ) / (2.0 * s),
+            (e_p - e_m) / (2.0 * s))
+    k = np.where(s == 0.0, τ * np.exp(m * τ), k)
+    return c, k, m
+
+def system_matrix(𝔈: Any) -> np.ndarray:
+    '''
+    Augmented system matrix of mixing model, dz/dt = Mz for z = [ω_1, ω_2, 1]
+    :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+    :return: (3, 3) matrix M = [[A, b], [0, 0, 0]]
+    '''
+    a_11, a_12, a_21, a_22, b_1, _, _ = _system(_row(𝔈))
+    return np.array([[a_11, a_12, b_1], [a_21, a_22, 0.0], [0.0, 0.0, 0.0]])
+
+def exact_matrix(𝔈: Any, τ: float) -> np.ndarray:
+    '''
+    Exact transition matrix e^(Mτ) of augmented state z = [ω_1, ω_2, 1], i.e. z(t + τ) = e^(Mτ)z(t)
+    :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+    :param τ: time step
+    :return: (3, 3) matrix
+    '''
+    a_11, a_12, a_21, a_22, _, ωs_1, ωs_2 = _system(_row(𝔈))
+    c, k, m = _exp_coefficients(a_11, a_12, a_21, a_22, float(τ))
+    e = np.array([[c + (k * (a_11 - m)), k * a_12], [k * a_21, c + (k * (a_22 - m))]])
+    ωs = np.array([ωs_1, ωs_2])
+    z = np.eye(3)
+    z[:2, :2] = e
+    z[:2, 2] = ωs - (e @ ωs)
+    return z
+
+def earlier_matrix(𝔈: Any, Δt: float) -> np.ndarray:
+    '''
+    One step matrix I + ΔtM of Earlier scheme, i.e. z_(i + 1) = (I + ΔtM)z_i for z = [ω_1, ω_2, 1]
+    :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+    :param Δt: step
+    :return: (3, 3) matrix
+    '''
+    return np.eye(3) + (Δt * system_matrix(𝔈))
+
+def _row(𝔈):
+    # 𝔈 row from 𝔈 row or 𝔈 object
+    if hasattr(𝔈, PARAMETERS[0]):
+        return parameter_table([𝔈])[0]
+    return np.asarray(𝔈, dtype=np.float64)
+
+class JumpAhead:
+    '''
+    Jump ahead evaluation of mixing model, which is linear ODE with constant coefficients for given 𝔈:
+    state after time τ is e^(Mτ)z and state after k Earlier steps is (I + ΔtM)^k z, both are answered by
+    few (3, 3) matrix products instead of step by step integration. Matrices are cached keyed by (𝔈, τ)
+    and (𝔈, Δt), for Earlier scheme squares (I + ΔtM)^(2^j) are cached so k steps cost O(log k) products.
+    '''
+
+    def __init__(self):
+        # Fields
+        self.__exact = {}    # (𝔈 key, τ) -> e^(Mτ)
+        self.__squares = {}  # (𝔈 key, Δt) -> [(I + ΔtM)^(2^j)]
+
+    @staticmethod
+    def key(𝔈: Any) -> Tuple[float, ...]:
+        '''
+        :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+        :return: hashable key of 𝔈
+        '''
+        return tuple(_row(𝔈).tolist())
+
+    def exact_matrix(self, 𝔈: Any, τ: float) -> np.ndarray:
+        '''
+        :return: cached e^(Mτ), see exact_matrix function
+        '''
+        key = (self.key(𝔈), float(τ))
+        if key not in self.__exact:
+            self.__exact[key] = exact_matrix(key[0], τ)
+        return self.__exact[key]
+
+    def earlier_matrix(self, 𝔈: Any, Δt: float, k: int) -> np.ndarray:
+        '''
+        :return: (I + ΔtM)^k computed by repeated squaring from cached squares
+        '''
+        assert k >= 0, f"Number of steps should be non negative, got {k}"
+        key = (self.key(𝔈), float(Δt))
+        if key not in self.__squares:
+            self.__squares[key] = [earlier_matrix(key[0], Δt)]
+        squares = self.__squares[key]
+        while (1 << len(squares)) <= k:
+            squares.append(squares[-1] @ squares[-1])
+        z = np.eye(3)
+        j = 0
+        while k:
+            if k & 1:
+                z = squares[j] @ z
+            k >>= 1
+            j += 1
+        return z
+
+    def exact(self, 𝔈: Any, τ: float, ω_0: Tuple[float, float]) -> Tuple[float, float]:
+        '''
+        Exact state after time τ
+        :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+        :param τ: time from initial state
+        :param ω_0: initial state (ω_1, ω_2)
+        :return: (ω_1, ω_2)
+        '''
+        return _apply(self.exact_matrix(𝔈, τ), ω_0)
+
+    def earlier(self, 𝔈: Any, Δt: float, k: int, ω_0: Tuple[float, float]) -> Tuple[float, float]:
+        '''
+        State after k steps of Earlier scheme
+        :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+        :param Δt: step
+        :param k: number of steps
+        :param ω_0: initial state (ω_1, ω_2)
+        :return: (ω_1, ω_2)
+        '''
+        return _apply(self.earlier_matrix(𝔈, Δt, k), ω_0)
+
+def _apply(z, ω_0):
+    # Apply augmented matrix to state (ω_1, ω_2)
+    ω_1, ω_2 = ω_0
+    return (float((z[0, 0] * ω_1) + (z[0, 1] * ω_2) + z[0, 2]),
+            float((z[1, 0] * ω_1) + (z[1, 1] * ω_2) + z[1, 2]))
+
+def earlier_steps(set_t: np.ndarray, Δt: float, t_0: float = 0.0, drift_free: bool = False) -> np.ndarray:
+    '''
+    Number of steps done by Earlier loop "while t <= t_x: ...; t += Δt" started at t_0, for each t_x
+    :param set_t: float64 array of t
+    :param Δt: step
+    :param t_0: initial time
+    :param drift_free: if False steps are counted by accumulated t as loop does (t_0 + Δt + Δt + ...), so they
+                       are same as of loop, if True counted by t as floor((t_x - t_0) / Δt) + 1, which differs
+                       from loop where accumulated t drifts over or under grid point (e.g. t = 0.3 for Δt = 0.1)
+    :return: int64 array of number of steps
+    '''
+    set_t = np.asarray(set_t, dtype=np.float64)
+    drift_free_steps = np.floor(((set_t - t_0) / Δt) + 1e-9).astype(np.int64) + 1
+    if drift_free or len(set_t) == 0:
+        return np.where(set_t < t_0, 0, drift_free_steps)
+    # Accumulated t of loop (add.accumulate adds sequentially, as loop does), with margin over drift
+    n = max(int(drift_free_steps.max()), 0) + 2
+    ts = np.add.accumulate(np.concatenate(([t_0], np.full(n, Δt))))
+    while ts[-1] <= set_t.max():
+        ts = np.concatenate((ts, np.add.accumulate(np.concatenate(([ts[-1]], np.full(n, Δt))))[1:]))
+    return np.searchsorted(ts, set_t, side="right").astype(np.int64)
+
+class EarlierModel:
+    '''
+    Earlier model of mixing problem, state of Earlier loop "while t <= t_x: ...; t += Δt" for queried t_x.
+    Loop is resumed from last state of 𝔈 for forward queries or from nearest checkpoint (saved every
+    checkpoint_every steps for each 𝔈) at or below queried step, so monotone sweeps cost O(1) steps per
+    query and random access cost distance to nearest checkpoint, values are same as of whole loop.
+    If drift_free, steps are counted by t (see earlier_steps) and evaluated by jump ahead in O(log k).
+    '''
+
+    def __init__(
+            self,
+            Δt: float,
+            t_0: float,
+            ω_0: Tuple[float, float],
+            drift_free: bool = False,
+            checkpoint_every: int = 100,
+            jump_ahead: Optional[JumpAhead] = None):
+        '''
+        :param Δt: step
+        :param t_0: initial time
+        :param ω_0: initial state (ω_1, ω_2)
+        :param drift_free: count steps by t and evaluate by jump ahead, see earlier_steps
+        :param checkpoint_every: number of steps between checkpoints
+        :param jump_ahead: JumpAhead to use (e.g. shared by several models to share matrices cache)
+        '''
+        assert checkpoint_every >= 1, f"checkpoint_every should be positive, got {checkpoint_every}"
+        # Parameters
+        self.Δt = Δt
+        self.t_0 = t_0
+        self.ω_0 = (ω_0[0], ω_0[1])
+        self.drift_free = drift_free
+        self.checkpoint_every = checkpoint_every
+        self.jump_ahead = jump_ahead or JumpAhead()
+        # Fields
+        self.__ts = [t_0]         # Accumulated t of loop after i steps
+        self.__checkpoints = {}  # 𝔈 key -> [(ω_1, ω_2)] states after 0, N, 2N, ... steps (N = checkpoint_every)
+        self.__last = {}         # 𝔈 key -> (i, ω_1, ω_2) state after i steps, fast path for forward queries
+
+    def steps(self, t_x: float) -> int:
+        '''
+        :return: number of steps done by Earlier loop for t_x, see earlier_steps
+        '''
+        if t_x < self.t_0:
+            return 0
+        if self.drift_free:
+            return math.floor(((t_x - self.t_0) / self.Δt) + 1e-9) + 1
+        while self.__ts[-1] <= t_x:
+            self.__ts.append(self.__ts[-1] + self.Δt)
+        return bisect.bisect_right(self.__ts, t_x)
+
+    def eval_t(self, t_x: float, 𝔈: Any) -> Tuple[float, float]:
+        '''
+        State of Earlier loop for t_x
+        :param t_x: queried t
+        :param 𝔈: 𝔈 row (columns in PARAMETERS order) or 𝔈 object
+        :return: (ω_1, ω_2)
+        '''
+        k = self.steps(t_x)
+        if self.drift_free:
+            return self.jump_ahead.earlier(𝔈, self.Δt, k, self.ω_0)
+        key = JumpAhead.key(𝔈)
+        checkpoints = self.__checkpoints.setdefault(key, [self.ω_0])
+        j = min(k // self.checkpoint_every, len(checkpoints) - 1)
+        i, ω_1, ω_2 = (j * self.checkpoint_every,) + checkpoints[j]
+        last = self.__last.get(key)
+        if last is not None and i < last[0] <= k:
+            i, ω_1, ω_2 = last
+        v_1, v_2, q_1, q_2, q_3, q_4, ω_3 = key
+        Δt = self.Δt
+        while i < k:
+            ω_1_m1 = ω_1
+            ω_2_m1 = ω_2
+            ω_1 = ω_1_m1 + Δt * (((q_1 * ω_3) + (q_2 * ω_2_m1) - (q_3 * ω_1_m1)) / v_1)
+            ω_2 = ω_2 + Δt * (((q_3 * ω_1_m1) - (q_2 * ω_2_m1) - (q_4 * ω_2_m1)) / v_2)
+            i += 1
+            if i == len(checkpoints) * self.checkpoint_every:
+                checkpoints.append((ω_1, ω_2))
+        self.__last[key] = (i, ω_1, ω_2)
+        return ω_1, ω_2
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Offline renderer tool
+Parallel rendering of frames (chart and Γ graph coloring over time) of recorded run into image sequence or video
+Created 18.10.2026 author CAB
+"""
+
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import shutil
+import subprocess
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from tools.chart_recorder_2d import SeriesBuffer
+from tools.headless_recorder import load_series
+
+# Definitions
+class GraphStates:
+    '''
+    Node states recorded by HeadlessGraphVisualisation with record_states=True: table of all ever shown nodes
+    and color changes of each update.
+    '''
+
+    def __init__(self, path: str):
+        '''
+        Load recorded states
+        :param path: path of .npz file saved by HeadlessGraphVisualisation
+        '''
+        data = np.load(path)
+        assert "state_offsets" in data, f"No recorded states in {path}, record with record_states=True"
+        self.labels = data["node_labels"].tolist()
+        self.positions = data["node_positions"]
+        self.edges = data["node_edges"]
+        self.offsets = data["state_offsets"]
+        self.ids = data["state_ids"]
+        self.colors = data["state_colors"]
+        self.n_updates = len(self.offsets) - 1
+
+    def replay(
+            self,
+            updates: List[int],
+            start: Optional[Tuple[int, np.ndarray]] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        '''
+        Replay changes from first update or from given snapshot
+        :param updates: sorted list of updates indexes (not before snapshot update)
+        :param start: optional snapshot (update index, color codes after this update) to continue from
+        :return: iterator of (update index, color codes of all nodes after this update, 0 for not shown node)
+        '''
+        if start is None:
+            codes = np.zeros(len(self.labels), dtype=np.uint32)
+            applied = 0
+        else:
+            codes = start[1].copy()
+            applied = start[0] + 1
+        for u in updates:
+            start = self.offsets[applied]
+            end = self.offsets[u + 1]
+            codes[self.ids[start:end]] = self.colors[start:end]
+            applied = u + 1
+            yield u, codes
+
+def frame_plan(n_frames: int, n_points: int, n_updates: int) -> List[Tuple[int, int, int]]:
+    '''
+    Chart and graph progress are mapped linearly on frames (for run where each step appends same number of
+    points and does same number of graph updates frames match steps when n_frames is number of steps)
+    :return: list of (frame index, number of chart points shown, graph update index or -1)
+    '''
+    return [(k, math.ceil((k + 1) * n_points / n_frames), math.ceil((k + 1) * n_updates / n_frames) - 1)
+            for k in range(n_frames)]
+
+_prepared = None  # (chart, graph states) prepared once by render_frames, set in each pool worker by _init_worker
+
+def _prepare_chart(chart_path: str, n_buckets: int):
+    # Load series, build decimation pyramid (for widest frame, so levels of all frames) and running extrema once
+    meta, xs, yss = load_series(chart_path)
+    buffer = SeriesBuffer.from_arrays(xs, yss)
+    if len(xs):
+        buffer.decimated(xs[0], xs[-1], n_buckets)
+    data = np.vstack([xs] + yss) if len(xs) else np.zeros((1 + len(yss), 1))
+    return meta, xs, buffer, np.fmin.accumulate(data, axis=1), np.fmax.accumulate(data, axis=1)
+
+def _init_worker(chart, states):
+    # Pool worker initializer, prepared data is sent once per worker (not per range of frames)
+    global _prepared
+    _prepared = (chart, states)
+
+def _render_range(
+        out_dir: str,
+        plan: List[Tuple[int, int, int]],
+        window_size: Tuple[float, float],
+        dpi: int,
+        start: Optional[Tuple[int, np.ndarray]]) -> List[str]:
+    # Render contiguous range of frames in pool worker, artists built once and updated for each frame,
+    # graph states replayed from snapshot start (made by render_frames) instead of from first update
+    prepared_chart, states = _prepared
+    fig = Figure(figsize=window_size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    n_axes = (prepared_chart is not None) + (states is not None)
+    axes = [fig.add_subplot(n_axes, 1, i + 1) for i in range(n_axes)]
+    chart = None
+    if prepared_chart is not None:
+        meta, xs, buffer, mins, maxs = prepared_chart
+        ax = axes.pop(0)
+        ax.grid(color="gray")
+        ax.set_title(meta["name"], fontsize=12)
+        ax.set_xlabel(meta["xy_label"][0], fontsize=12)
+        ax.set_ylabel(meta["xy_label"][1], fontsize=12)
+        plots = [ax.plot([], [], form, label=name)[0] for name, form in meta["lines"]]
+        ax.legend(loc="upper right")
+        n_buckets = int(window_size[0] * dpi)
+        chart = (meta, xs, buffer, ax, plots, mins, maxs, n_buckets)
+    graph = None
+    if states is not None:
+        ax = axes.pop(0)
+        ax.set_xlabel("depth", fontsize=12)
+        ax.set_ylabel("width", fontsize=12)
+        ax.tick_params(axis="both", which="both", bottom=False, left=False, labelbottom=False, labelleft=False)
+        edges_artist = LineCollection(
+            [[states.positions[a], states.positions[b]] for a, b in states.edges], linewidths=1.0, zorder=1)
+        ax.add_collection(edges_artist)
+        nodes_artist = ax.scatter(states.positions[:, 0], states.positions[:, 1], s=300, zorder=2)
+        label_artists = [
+            ax.text(x, y, label, size=12, color="k", horizontalalignment="center", verticalalignment="center",
+                    clip_on=True, visible=False)
+            for label, (x, y) in zip(states.labels, states.positions)]
+        graph = (states, ax, edges_artist, nodes_artist, label_artists)
+    replay = states.replay(sorted({u for _, _, u in plan if u >= 0}), start) if graph is not None else iter([])
+    replayed = -1
+    rgba = {0: (0.0, 0.0, 0.0, 0.0)}
+    files = []
+    for k, n_points, u in plan:
+        if chart is not None:
+            meta, xs, buffer, ax, plots, mins, maxs, n_buckets = chart
+            if n_points > 0:
+                i = n_points - 1
+                x_lim = meta["x_range"] or _padded(mins[0, i], maxs[0, i])
+                y_lim = meta["y_range"] or (
+                    min(-.1, *(_padded(mn, mx)[0] for mn, mx in zip(mins[1:, i], maxs[1:, i]))),
+                    max(+.1, *(_padded(mn, mx)[1] for mn, mx in zip(mins[1:, i], maxs[1:, i]))))
+                ax.set_xlim(*x_lim)
+                ax.set_ylim(*y_lim)
+                xss, yss = buffer.decimated(xs[0], xs[i], n_buckets)
+                for plot, line_xs, line_ys in zip(plots, xss, yss):
+                    shown = line_xs <= xs[i]
+                    plot.set_data(line_xs[shown], line_ys[shown])
+        if graph is not None and u >= 0 and u != replayed:
+            states, ax, edges_artist, nodes_artist, label_artists = graph
+            replayed, codes = next(replay)
+            for code in np.unique(codes):
+                if code not in rgba:
+                    rgba[code] = to_rgba(chr(code))
+            colors = np.array([rgba[code] for code in codes.tolist()]).reshape(-1, 4)
+            nodes_artist.set_facecolor(colors)
+            nodes_artist.set_edgecolor(colors)
+            shown = codes > 0
+            if len(states.edges):
+                edges_shown = shown[states.edges[:, 0]] & shown[states.edges[:, 1]]
+                edges_artist.set_color([(0.0, 0.0, 0.0, 1.0 if s else 0.0) for s in edges_shown.tolist()])
+            for artist, s in zip(label_artists, shown.tolist()):
+                artist.set_visible(s)
+            if np.any(shown):
+                positions = states.positions[shown]
+                (x_min, y_min), (x_max, y_max) = positions.min(axis=0), positions.max(axis=0)
+                x_pad = (x_max - x_min) * .05 or .5
+                y_pad = (y_max - y_min) * .05 or .5
+                ax.set_xlim(x_min - x_pad, x_max + x_pad)
+                ax.set_ylim(y_min - y_pad, y_max + y_pad)
+        file = os.path.join(out_dir, f"frame_{k:06d}.png")
+        fig.savefig(file)
+        files.append(file)
+    return files
+
+def _padded(mnv: float, mxv: float) -> Tuple[float, float]:
+    # Range of values, widened if it's single value (same as auto scale of ChartRecorder2D)
+    return (mnv - .1, mxv + .1) if mnv == mxv else (mnv, mxv)
+
+def render_frames(
+        out_dir: str,
+        chart_path: Optional[str] = None,
+        graph_path: Optional[str] = None,
+        n_frames: Optional[int] = None,
+        workers: Optional[int] = None,
+        window_size: Tuple[float, float] = (14, 10),
+        dpi: int = 100) -> List[str]:
+    '''
+    Render frames of recorded run (chart on top, Γ graph coloring below) in process pool with Agg backend,
+    frames are split on contiguous ranges (several per worker) so graph states are replayed sequentially,
+    series, its decimation pyramid and graph states are prepared once and sent once to each worker
+    :param out_dir: directory for frame_<index>.png files, created if not exists
+    :param chart_path: optional path of series recorded by HeadlessChartRecorder
+    :param graph_path: optional path of states recorded by HeadlessGraphVisualisation with record_states=True
+    :param n_frames: number of frames, default is number of chart points (or graph updates if no chart)
+    :param workers: number of worker processes, None for number of CPUs
+    :param window_size: size of frames (w, h), in inches
+    :param dpi: resolution of frames
+    :return: sorted list of frame files
+    '''
+    assert chart_path is not None or graph_path is not None, "chart_path or graph_path should be given"
+    chart = _prepare_chart(chart_path, int(window_size[0] * dpi)) if chart_path is not None else None
+    states = GraphStates(graph_path) if graph_path is not None else None
+    n_points = len(chart[1]) if chart is not None else 0
+    n_updates = states.n_updates if states is not None else 0
+    if n_frames is None:
+        n_frames = n_points if chart_path is not None else n_updates
+    os.makedirs(out_dir, exist_ok=True)
+    plan = frame_plan(n_frames, n_points, n_updates)
+    n_workers = workers or os.cpu_count() or 1
+    ranges = [plan[r[0]:r[-1] + 1] for r in np.array_split(np.arange(len(plan)), n_workers * 4) if len(r)]
+    # Snapshots of graph states on first update of each range, made by single sequential replay
+    firsts = [min((u for _, _, u in plan_range if u >= 0), default=-1) for plan_range in ranges]
+    snapshots = {}
+    if states is not None:
+        snapshots = {u: (u, codes.copy()) for u, codes in states.replay(sorted(set(firsts) - {-1}))}
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(chart, states)) as pool:
+        futures = [pool.submit(_render_range, out_dir, plan_range, window_size, dpi, snapshots.get(u))
+                   for plan_range, u in zip(ranges, firsts)]
+        return [file for future in futures for file in future.result()]
+
+def assemble_video(files: List[str], path: str, fps: float = 25) -> str:
+    '''
+    Assemble frames into video, animated .gif is written with Pillow, other formats (e.g. .mp4) with ffmpeg
+    :param files: sorted list of frame files
+    :param path: path of video file
+    :param fps: frames per second
+    :return: path of video file
+    :raise RuntimeError: if ffmpeg required but not found
+    '''
+    if path.endswith(".gif"):
+        from PIL import Image
+        def frames():
+            # Frames opened one by one, so only one file is open at time
+            for file in files[1:]:
+                with Image.open(file) as image:
+                    yield image
+        with Image.open(files[0]) as first:
+            first.save(path, save_all=True, append_images=frames(), duration=int(1000 / fps), loop=0)
+        return path
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found, use .gif video or rendered image sequence")
+    pattern = os.path.join(os.path.dirname(files[0]), "frame_%06d.png")
+    subprocess.run(
+        [ffmpeg, "-y", "-loglevel", "error", "-framerate", str(fps), "-i", pattern, "-pix_fmt", "yuv420p", path],
+        check=True)
+    return path
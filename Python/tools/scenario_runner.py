@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Scenario runner tool
+Headless replay of many interactive sessions (scripted ω_3 up/down key events) in process pool
+Created 18.10.2026 author CAB
+"""
+
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import math
+import os
+import numpy as np
+from tools.compact_graph import CompactGraph
+from tools.event_engine import EventDrivenEngine
+from tools.mixing_model import PARAMETERS, EarlierModel, JumpAhead
+from tools.state_columns import StateColumns
+
+# Definitions
+ENGINES = ("function_set", "transition_graph")
+KEYS = ("up", "down", "e")
+
+def load_scenario(path: str) -> List[Tuple[float, str]]:
+    '''
+    Load scenario script, text file with one key event "<t> <key>" per line, where t is model time on which
+    key is pressed and key is "up", "down" (change ω_3 by up_down_step) or "e" (end of session),
+    empty lines and lines starting with # are skipped
+    :param path: path of scenario file
+    :return: list of (t, key) sorted by t
+    '''
+    events = []
+    with open(path, encoding="utf-8") as file:
+        for n, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            t, key = line.split()
+            assert key in KEYS, f"{path}:{n}: key should be one of {KEYS}, got {key}"
+            events.append((float(t), key))
+    return sorted(events, key=lambda event: event[0])
+
+class _Keys:
+    # Scripted keyboard, returns keys pressed up to given t (as Interaction/Helpers read last pressed key)
+    def __init__(self, events):
+        self.events = events
+        self.i = 0
+
+    def pressed(self, t):
+        keys = []
+        while self.i < len(self.events) and self.events[self.i][0] <= t:
+            keys.append(self.events[self.i][1])
+            self.i += 1
+        return keys
+
+def _apply_keys(keys, ω_3, up_down_step):
+    # New ω_3 and termination flag after keys
+    for key in keys:
+        if key == "e":
+            return ω_3, True
+        ω_3 += up_down_step if key == "up" else -up_down_step
+    return ω_3, False
+
+def run_function_set(
+        events: List[Tuple[float, str]],
+        𝔈: np.ndarray,
+        ω_0: Tuple[float, float],
+        Δt: float,
+        n: int,
+        up_down_step: float,
+        drift_free: bool = False) -> StateColumns:
+    '''
+    Replay session as function_set_interactive_simulation: Earlier model restarted from last state on each
+    ω_3 change, ticks t = Δt, 2Δt, ... served by EventDrivenEngine from segments of EarlierModel
+    :param drift_free: as drift_free_steps of script, count Earlier steps by t and evaluate them by jump ahead
+    :return: rows of ticks (t, ω_1, ω_2, ω_3)
+    '''
+    jump = JumpAhead()
+    models = {}  # Origin (t_0, ω_0) -> EarlierModel, next segments of same parameters resume from its last state
+    def segment(set_t, 𝔈_row, t_0, ω_0):
+        if (t_0, ω_0) not in models:
+            models.clear()
+            models[(t_0, ω_0)] = EarlierModel(Δt, t_0, ω_0, drift_free, jump_ahead=jump)
+        M = models[(t_0, ω_0)]
+        ω = np.array([M.eval_t(t, 𝔈_row) for t in set_t]).reshape(len(set_t), 2)
+        return StateColumns(set_t, ω[:, 0], ω[:, 1])
+    keys = _Keys(events)
+    𝔈 = tuple(np.asarray(𝔈, dtype=np.float64).tolist())
+    engine = EventDrivenEngine(segment, Δt, 0.0, ω_0, 𝔈, segment_ticks=min(max(n, 1), 256))
+    rows = StateColumns.allocate(n, with_ω_3=True)
+    ω_3 = 𝔈[-1]
+    t = 0.0
+    for i in range(n):
+        t += Δt
+        ω_3, ended = _apply_keys(keys.pressed(t), ω_3, up_down_step)
+        if ended:
+            return rows[:i]
+        engine.set_parameters(𝔈[:-1] + (ω_3,))
+        Y = engine.next()
+        rows.set(i, Y.t, Y.ω_1, Y.ω_2, ω_3)
+    return rows
+
+def run_transition_graph(
+        events: List[Tuple[float, str]],
+        𝔈: np.ndarray,
+        ω_0: Tuple[float, float],
+        Δt: float,
+        n: int,
+        up_down_step: float) -> StateColumns:
+    '''
+    Replay session as transition_graph_interactive_simulation on CompactGraph: input sub-state w = 3 of layer i
+    is (t = iΔt, ω_3) and Earlier transitions of layer i + 1 read it
+    :return: rows of ticks (t, ω_1, ω_2, ω_3)
+    '''
+    v_1, v_2, q_1, q_2, q_3, q_4, ω_3 = np.asarray(𝔈, dtype=np.float64).tolist()
+    def Θ_1(ω, t):
+        return t[2], ω[0] + (t[2] - t[0]) * (((q_1 * ω[2]) + (q_2 * ω[1]) - (q_3 * ω[0])) / v_1)
+    def Θ_2(ω, t):
+        return t[2], ω[1] + (t[2] - t[0]) * (((q_3 * ω[0]) - (q_2 * ω[1]) - (q_4 * ω[1])) / v_2)
+    Γ𝔈 = CompactGraph(n, width=3, edges={1: (1, 2, 3), 2: (1, 2, 3)}, transitions={1: Θ_1, 2: Θ_2})
+    Γ𝔈.assign(0, 1, 0.0, ω_0[0])
+    Γ𝔈.assign(0, 2, 0.0, ω_0[1])
+    keys = _Keys(events)
+    rows = StateColumns.allocate(n, with_ω_3=True)
+    for i in range(n):
+        t = i * Δt
+        ω_3, ended = _apply_keys(keys.pressed(t), ω_3, up_down_step)
+        if ended:
+            return rows[:i]
+        Γ𝔈.assign(i, 3, t, ω_3)
+        Γ𝔈.eval()
+        rows.set(i, t, Γ𝔈.ω[i + 1, 0], Γ𝔈.ω[i + 1, 1], ω_3)
+    return rows
+
+def _run_shard(shard):
+    # Run shard of scenarios in pool worker, return list of (t, ω_1, ω_2, ω_3) columns
+    paths, engine, 𝔈, ω_0, Δt, n, up_down_step, drift_free = shard
+    results = []
+    for path in paths:
+        if engine == "function_set":
+            rows = run_function_set(load_scenario(path), 𝔈, ω_0, Δt, n, up_down_step, drift_free)
+        else:
+            rows = run_transition_graph(load_scenario(path), 𝔈, ω_0, Δt, n, up_down_step)
+        results.append((rows.t, rows.ω_1, rows.ω_2, rows.ω_3))
+    return results
+
+def run_scenarios(
+        in_dir: str,
+        out_path: str,
+        engine: str = "function_set",
+        𝔈: Optional[np.ndarray] = None,
+        ω_0: Tuple[float, float] = (.0, 20.0),
+        Δt: float = .1,
+        n: int = 1000,
+        up_down_step: float = 1,
+        pattern: str = "*.txt",
+        workers: Optional[int] = None,
+        drift_free: bool = False) -> List[str]:
+    '''
+    Run all scenario scripts of directory headless in process pool and write results to single columnar
+    .npz file: columns scenario (index in names), t, ω_1, ω_2, ω_3 of all scenarios one after other,
+    names (scenario file names) and offsets (rows of scenario i are offsets[i]:offsets[i + 1])
+    :param in_dir: directory of scenario scripts, see load_scenario for format
+    :param out_path: path of .npz file
+    :param engine: "function_set" or "transition_graph"
+    :param 𝔈: 𝔈 row (columns in PARAMETERS order) with initial ω_3, default is parameters of scripts
+    :param ω_0: initial state (ω_1, ω_2)
+    :param Δt: tick
+    :param n: max number of ticks of scenario (session can end earlier by "e" key)
+    :param up_down_step: change of ω_3 on "up"/"down" key
+    :param pattern: glob pattern of scenario files in in_dir
+    :param workers: number of worker processes, None for number of CPUs
+    :param drift_free: "function_set" engine only, see run_function_set
+    :return: sorted list of scenario names
+    '''
+    assert engine in ENGINES, f"engine should be one of {ENGINES}, got {engine}"
+    𝔈 = np.array([4, 8, 3, 2, 5, 3, 10], dtype=np.float64) if 𝔈 is None else np.asarray(𝔈, dtype=np.float64)
+    assert 𝔈.shape == (len(PARAMETERS),), f"𝔈 should be row of {len(PARAMETERS)} parameters, got {𝔈.shape}"
+    paths = sorted(glob.glob(os.path.join(in_dir, pattern)))
+    names = [os.path.basename(path) for path in paths]
+    n_workers = workers or os.cpu_count() or 1
+    shard_size = max(1, math.ceil(len(paths) / (n_workers * 4)))
+    shards = [(paths[i:i + shard_size], engine, 𝔈, ω_0, Δt, n, up_down_step, drift_free)
+              for i in range(0, len(paths), shard_size)]
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        results = [columns for shard in pool.map(_run_shard, shards) for columns in shard]
+    lengths = [len(columns[0]) for columns in results]
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    def column(k):
+        return np.concatenate([columns[k] for columns in results]) if results else np.zeros(0)
+    np.savez(
+        out_path,
+        names=np.array(names, dtype=str),
+        offsets=offsets,
+        scenario=np.repeat(np.arange(len(names), dtype=np.int32), lengths),
+        t=column(0),
+        ω_1=column(1),
+        ω_2=column(2),
+        ω_3=column(3))
+    return names
+
+def load_results(path: str) -> Dict[str, StateColumns]:
+    '''
+    Load results written by run_scenarios
+    :param path: path of .npz file
+    :return: scenario name -> rows (views of loaded columns)
+    '''
+    data = np.load(path)
+    offsets = data["offsets"]
+    columns = StateColumns(data["t"], data["ω_1"], data["ω_2"], data["ω_3"])
+    return {name: columns[offsets[i]:offsets[i + 1]] for i, name in enumerate(data["names"].tolist())}
@@ -0,0 +1,587 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Shared channel tool
+Publishing of chart series and graph node states over shared memory, so visualisation runs in viewer processes
+Created 18.10.2026 author CAB
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from multiprocessing import shared_memory
+from types import MethodType
+import json
+import math
+import multiprocessing
+import sys
+import numpy as np
+from tools.graph_visualisation import NodeLike, GraphLike
+
+# Definitions
+def _attach(name: str, shared_tracker: bool) -> shared_memory.SharedMemory:
+    # Attach to existing block, only creator should unlink it. Before Python 3.13 attached block is registered in
+    # resource tracker (which unlink it on exit), so it is unregistered, except when tracker is shared with creator
+    # (viewer started by publisher, forked or spawned child inherits tracker), there registration is creator's one
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if not shared_tracker:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+def _fork_context():
+    # Viewers are forked (scripts have no main guard, so spawn would re-run them), spawn where fork not available
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+class SharedSeries:
+    '''
+    Columns X and Y of each line in shared memory ring, single writer and any number of readers.
+    Each point is written twice (at i and i + capacity) so last capacity points always are contiguous
+    and can be read zero-copy, no locks, readers detect overwritten points by total count of appended points.
+    Block layout: header int64[count, capacity, n_columns, closed, meta length], meta json, data float64.
+    '''
+
+    HEADER = 5
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        # Use create or attach
+        self.__shm = shm
+        self.__owner = owner
+        self.__header = np.ndarray((self.HEADER,), dtype=np.int64, buffer=shm.buf)
+        capacity, n_columns, meta_len = int(self.__header[1]), int(self.__header[2]), int(self.__header[4])
+        meta_start = self.HEADER * 8
+        data_start = meta_start + ((meta_len + 7) // 8) * 8
+        self.meta = json.loads(bytes(shm.buf[meta_start:meta_start + meta_len]))
+        self.__data = np.ndarray((n_columns, 2 * capacity), dtype=np.float64, buffer=shm.buf, offset=data_start)
+        self.capacity = capacity
+        self.n_lines = n_columns - 1
+
+    @classmethod
+    def create(
+            cls,
+            name: Optional[str],
+            n_lines: int,
+            capacity: int,
+            meta: Dict[str, Any] = None) -> 'SharedSeries':
+        '''
+        Create block (writer side)
+        :param name: block name, None for random name (see name property)
+        :param n_lines: number of Y columns
+        :param capacity: number of last points available to readers
+        :param meta: json serializable meta data for readers (e.g. chart name and lines)
+        :return: SharedSeries
+        '''
+        meta_bytes = json.dumps(meta or {}).encode()
+        size = (cls.HEADER * 8) + (((len(meta_bytes) + 7) // 8) * 8) + ((1 + n_lines) * 2 * capacity * 8)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((cls.HEADER,), dtype=np.int64, buffer=shm.buf)
+        header[:] = [0, capacity, 1 + n_lines, 0, len(meta_bytes)]
+        shm.buf[cls.HEADER * 8:cls.HEADER * 8 + len(meta_bytes)] = meta_bytes
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, shared_tracker: bool = False) -> 'SharedSeries':
+        '''
+        Attach to existing block (reader side)
+        :param name: block name
+        :param shared_tracker: True if process shares resource tracker with creator (is its multiprocessing child)
+        '''
+        return cls(_attach(name, shared_tracker), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    def append(self, x: float, ys: List[float]) -> None:
+        '''
+        Append point (writer side), point become visible to readers after it fully written
+        '''
+        count = int(self.__header[0])
+        i = count % self.capacity
+        self.__data[0, i] = x
+        self.__data[1:, i] = ys
+        self.__data[0, i + self.capacity] = x
+        self.__data[1:, i + self.capacity] = ys
+        self.__header[0] = count + 1
+
+    def count(self) -> int:
+        '''
+        :return: total number of appended points
+        '''
+        return int(self.__header[0])
+
+    def views(self) -> Tuple[int, np.ndarray, List[np.ndarray]]:
+        '''
+        Zero-copy views of last points, can be overwritten by writer while used (use read_since if it matter)
+        :return: (index of first point, X view, [Y view for each line])
+        '''
+        count = int(self.__header[0])
+        n = min(count, self.capacity)
+        start = (count - n) % self.capacity
+        block = self.__data[:, start:start + n]
+        return count - n, block[0], [block[i] for i in range(1, self.n_lines + 1)]
+
+    def views_since(self, first: int, margin: int = 0) -> Tuple[int, np.ndarray, List[np.ndarray]]:
+        '''
+        Zero-copy views of points with index >= first, of still available ones except margin oldest (writer
+        overwrite them first), so points are not overwritten while used unless writer appends more than margin
+        points meanwhile (use read_since if it matter)
+        :param first: index of first wanted point
+        :param margin: number of oldest available points which are skipped
+        :return: (index of first point, X view, [Y view for each line])
+        '''
+        count = int(self.__header[0])
+        first = min(max(first, count - self.capacity + margin, 0), count)
+        start = first % self.capacity
+        block = self.__data[:, start:start + (count - first)]
+        return first, block[0], [block[i] for i in range(1, self.n_lines + 1)]
+
+    def read_since(self, first: int) -> Tuple[int, np.ndarray, List[np.ndarray]]:
+        '''
+        Consistent copy of points with index >= first (or of all still available if some already overwritten)
+        :param first: index of first wanted point
+        :return: (index of first returned point, X column, [Y column for each line])
+        '''
+        count = int(self.__header[0])
+        first = max(first, count - self.capacity, 0)
+        start = first % self.capacity
+        block = self.__data[:, start:start + (count - first)].copy()
+        # Points overwritten while copied (writer may be writing point with index new count) are dropped
+        lost = max(int(self.__header[0]) + 1 - self.capacity - first, 0)
+        block = block[:, min(lost, block.shape[1]):]
+        first += lost
+        return first, block[0], [block[i] for i in range(1, self.n_lines + 1)]
+
+    def set_closed(self) -> None:
+        '''
+        Mark that no more points will be appended (writer side)
+        '''
+        self.__header[3] = 1
+
+    def is_closed(self) -> bool:
+        return bool(self.__header[3])
+
+    def close(self) -> None:
+        '''
+        Release block, writer also unlink it (readers which already attached can still read it)
+        '''
+        self.__header = None
+        self.__data = None
+        self.__shm.close()
+        if self.__owner:
+            self.__shm.unlink()
+
+class SharedNodeStates:
+    '''
+    Graph node states (color code per node, 0 for undefined) in shared memory, single writer and any number
+    of readers. Node table (label, position, input nodes) is append only, so graph can grow while published,
+    it is stored as json lines, one per node, readers parse only lines of nodes added since their last read.
+    Block layout: header int64[version, n_nodes, closed, meta length, frontier (-1 if unknown), capacity,
+    table capacity, table length], meta json, codes uint8[capacity], table bytes[table capacity].
+    '''
+
+    HEADER = 8
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        # Use create or attach
+        self.__shm = shm
+        self.__owner = owner
+        self.__header = np.ndarray((self.HEADER,), dtype=np.int64, buffer=shm.buf)
+        meta_len, capacity, table_capacity = int(self.__header[3]), int(self.__header[5]), int(self.__header[6])
+        meta_start = self.HEADER * 8
+        codes_start = meta_start + ((meta_len + 7) // 8) * 8
+        self.meta = json.loads(bytes(shm.buf[meta_start:meta_start + meta_len]))
+        self.__codes = np.ndarray((capacity,), dtype=np.uint8, buffer=shm.buf, offset=codes_start)
+        self.__table = np.ndarray((table_capacity,), dtype=np.uint8, buffer=shm.buf, offset=codes_start + capacity)
+        self.__read = (0, 0)  # (number of nodes, table offset) read by this side
+        self.capacity = capacity
+
+    @classmethod
+    def create(
+            cls,
+            name: Optional[str],
+            meta: Dict[str, Any] = None,
+            capacity: int = 1 << 16,
+            table_capacity: Optional[int] = None) -> 'SharedNodeStates':
+        '''
+        Create block (writer side) with empty node table
+        :param name: block name, None for random name (see name property)
+        :param meta: json serializable meta data for readers
+        :param capacity: max number of nodes
+        :param table_capacity: bytes of node table, None for 128 per node
+        :return: SharedNodeStates
+        '''
+        meta_bytes = json.dumps(meta or {}).encode()
+        table_capacity = table_capacity or 128 * capacity
+        size = (cls.HEADER * 8) + (((len(meta_bytes) + 7) // 8) * 8) + capacity + table_capacity
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((cls.HEADER,), dtype=np.int64, buffer=shm.buf)
+        header[:] = [0, 0, 0, len(meta_bytes), -1, capacity, table_capacity, 0]
+        shm.buf[cls.HEADER * 8:cls.HEADER * 8 + len(meta_bytes)] = meta_bytes
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, shared_tracker: bool = False) -> 'SharedNodeStates':
+        '''
+        Attach to existing block (reader side)
+        :param name: block name
+        :param shared_tracker: True if process shares resource tracker with creator (is its multiprocessing child)
+        '''
+        return cls(_attach(name, shared_tracker), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    @property
+    def n_nodes(self) -> int:
+        return int(self.__header[1])
+
+    def add_nodes(self, nodes: List[Tuple[str, Tuple[float, float], List[int]]]) -> None:
+        '''
+        Append nodes to table (writer side), they become visible to readers after fully written
+        :param nodes: list of (label, (x, y), indexes of input nodes)
+        '''
+        if not nodes:
+            return
+        n, length = self.n_nodes, int(self.__header[7])
+        lines = "".join(json.dumps([label, list(pos), inputs]) + "\n" for label, pos, inputs in nodes).encode()
+        assert n + len(nodes) <= self.capacity, f"Too many nodes, capacity is {self.capacity}"
+        assert length + len(lines) <= len(self.__table), f"Node table is full, capacity is {len(self.__table)} bytes"
+        self.__table[length:length + len(lines)] = np.frombuffer(lines, dtype=np.uint8)
+        self.__header[7] = length + len(lines)
+        self.__header[1] = n + len(nodes)
+
+    def read_nodes(self) -> List[Tuple[str, Tuple[float, float], List[int]]]:
+        '''
+        :return: nodes added since last call (reader side), as given to add_nodes
+        '''
+        n_read, offset = self.__read
+        n = self.n_nodes
+        if n == n_read:
+            return []
+        lines = bytes(self.__table[offset:int(self.__header[7])]).split(b"\n")[:n - n_read]
+        self.__read = (n, offset + sum(len(line) + 1 for line in lines))
+        return [(label, tuple(pos), inputs) for label, pos, inputs in map(json.loads, lines)]
+
+    def publish(self, ids: np.ndarray, codes: np.ndarray, frontier: Optional[int] = None) -> None:
+        '''
+        Write color codes of given nodes and frontier, and increment version (writer side)
+        :param ids: indexes of nodes
+        :param codes: color codes of these nodes
+        :param frontier: depth of last evaluated layer or None if unknown
+        '''
+        self.__codes[ids] = codes
+        self.__header[4] = -1 if frontier is None else frontier
+        self.__header[0] += 1
+
+    def version(self) -> int:
+        '''
+        :return: number of published states
+        '''
+        return int(self.__header[0])
+
+    def frontier(self) -> Optional[int]:
+        '''
+        :return: published depth of last evaluated layer or None if unknown
+        '''
+        frontier = int(self.__header[4])
+        return None if frontier < 0 else frontier
+
+    def codes(self) -> np.ndarray:
+        '''
+        :return: zero-copy view of color codes of nodes
+        '''
+        return self.__codes
+
+    def set_closed(self) -> None:
+        self.__header[2] = 1
+
+    def is_closed(self) -> bool:
+        return bool(self.__header[2])
+
+    def close(self) -> None:
+        '''
+        Release block, writer also unlink it (readers which already attached can still read it)
+        '''
+        self.__header = None
+        self.__codes = None
+        self.__table = None
+        self.__shm.close()
+        if self.__owner:
+            self.__shm.unlink()
+
+class ChartPublisher:
+    '''
+    Publishing of points to viewer processes, has same API as ChartRecorder2D, append only write to shared
+    memory so simulation is never blocked by UI, any number of viewers can be started.
+    '''
+
+    def __init__(
+            self,
+            name: str,
+            lines: List[Tuple[str, str]],
+            x_range: Tuple[float, float] = None,
+            y_range: Tuple[float, float] = None,
+            xy_label: Tuple[str, str] = ("X", "Y"),
+            capacity: int = 1 << 20,
+            channel: Optional[str] = None):
+        '''
+        Construct a publisher and create shared memory block
+        :param name: chart name
+        :param lines: list of lines [(<line name>, <matplotlib format>)]
+        :param x_range: the optional range of X axis, if None will auto scaled
+        :param y_range: the optional range of Y axis, if None will auto scaled
+        :param xy_label: labels of axes
+        :param capacity: number of last points kept in shared memory (viewers which fall behind skip points)
+        :param channel: shared memory block name, None for random name
+        '''
+        # Fields
+        self.series = SharedSeries.create(
+            channel, len(lines), capacity,
+            {"name": name, "lines": lines, "x_range": x_range, "y_range": y_range, "xy_label": xy_label})
+        self.__callbacks = []
+        self.__viewers = []
+
+    def append(self, x: float, ys: [float]) -> None:
+        '''
+        Append point fot each Y coordinate at X coordinate
+        :param x: X coordinate
+        :param ys: list of Y coordinated
+        '''
+        self.series.append(x, ys)
+
+    def on_kay_press(self, handler: Callable[[str], None]) -> None:
+        '''
+        Handler kept for API compatibility with ChartRecorder2D, keys of viewers are not sent back
+        '''
+        self.__callbacks.append(handler)
+
+    def start_viewer(self, **chart_kwargs) -> multiprocessing.Process:
+        '''
+        Start viewer process (see run_chart_viewer)
+        :param chart_kwargs: ChartRecorder2D parameters of viewer (e.g. fps, max_points)
+        :return: viewer process
+        '''
+        viewer = _fork_context().Process(
+            target=run_chart_viewer, args=(self.series.name,), kwargs=dict(chart_kwargs, shared_tracker=True))
+        viewer.start()
+        self.__viewers.append(viewer)
+        return viewer
+
+    def show(self) -> None:
+        '''
+        Mark series closed, wait until viewers windows closed and release shared memory
+        '''
+        self.series.set_closed()
+        for viewer in self.__viewers:
+            viewer.join()
+        self.series.close()
+
+class GraphPublisher:
+    '''
+    Publishing of graph node colors to viewer processes, has same API as GraphVisualisation.
+    If graph knows its evaluation frontier (see GraphLike.frontier) only nodes of layers evaluated since last
+    update (got by graph_repr_window) are published, so cost of update not depends on size of graph, nodes
+    created by growing graph (e.g. rolling window Γ graph) are added to shared node table, nodes evicted from
+    graph keep their last published color. Else all nodes are published on each update.
+    '''
+
+    def __init__(
+            self,
+            name: str,
+            graph: GraphLike,
+            channel: Optional[str] = None,
+            capacity: int = 1 << 16,
+            margin: int = 1):
+        '''
+        Construct a publisher, create shared memory block and publish all current nodes
+        :param name: graph name
+        :param graph: an graph implementation
+        :param channel: shared memory block name, None for random name
+        :param capacity: max number of published nodes
+        :param margin: number of layers before last published frontier and after current one which are
+                       published too (e.g. inputs assigned ahead of evaluation)
+        '''
+        # Parameters
+        self.margin = margin
+        # Fields
+        self.__graph = graph
+        self.__ids = {}  # Node -> index in shared node table
+        self.__frontier = None  # Last published frontier
+        self.states = SharedNodeStates.create(channel, {"name": name}, capacity)
+        self.__viewers = []
+        # Set callback
+        graph.redraw = MethodType(lambda a: self.update(), self)
+        self.__publish(graph.graph_repr(), graph.frontier())
+
+    def __publish(self, nodes, frontier):
+        # Add new nodes to table, then publish colors of given nodes
+        reprs = [(node, node.graph_repr()) for node in nodes]
+        new = []
+        for node, node_repr in reprs:
+            if node not in self.__ids:
+                self.__ids[node] = self.states.n_nodes + len(new)
+                new.append((node, node_repr))
+        ids = self.__ids
+        self.states.add_nodes([(label, pos, [ids[a] for a, _ in eds if a in ids]) for _, (label, pos, _, eds) in new])
+        self.states.publish(
+            np.fromiter((ids[node] for node, _ in reprs), np.int64, len(reprs)),
+            np.fromiter((ord(node_repr[2]) for _, node_repr in reprs), np.uint8, len(reprs)),
+            frontier)
+        self.__frontier = frontier
+
+    def update(self):
+        """
+        Publish colors of nodes changed since last update
+        :return: None
+        """
+        frontier = self.__graph.frontier()
+        if frontier is None:
+            self.__publish(self.__graph.graph_repr(), None)
+        else:
+            # Frontier can also go back (layers evaluated ahead are reset), so window covers both frontiers
+            prev = frontier if self.__frontier is None else self.__frontier
+            d_min = min(frontier, prev) - self.margin
+            d_max = max(frontier, prev) + 1 + self.margin
+            self.__publish(self.__graph.graph_repr_window(max(d_min, 0), d_max), frontier)
+
+    def start_viewer(self, **viz_kwargs) -> multiprocessing.Process:
+        '''
+        Start viewer process (see run_graph_viewer)
+        :param viz_kwargs: GraphVisualisation parameters of viewer (e.g. fps, depth_window)
+        :return: viewer process
+        '''
+        viewer = _fork_context().Process(
+            target=run_graph_viewer, args=(self.states.name,), kwargs=dict(viz_kwargs, shared_tracker=True))
+        viewer.start()
+        self.__viewers.append(viewer)
+        return viewer
+
+    def show(self) -> None:
+        '''
+        Mark states closed, wait until viewers windows closed and release shared memory
+        '''
+        self.states.set_closed()
+        for viewer in self.__viewers:
+            viewer.join()
+        self.states.close()
+
+class _SharedNode(NodeLike):
+    # Node of graph proxy, color read from shared node states
+    __slots__ = ("states", "i", "label", "pos", "inputs")
+
+    def __init__(self, states: SharedNodeStates, i: int, label: str, pos: Tuple[float, float]):
+        self.states = states
+        self.i = i
+        self.label = label
+        self.pos = pos
+        self.inputs = []
+
+    def graph_repr(self):
+        code = int(self.states.codes()[self.i])
+        return self.label, self.pos, chr(code) if code else "w", [(node, self) for node in self.inputs]
+
+class _SharedGraph(GraphLike):
+    # Graph proxy over shared node states, for GraphVisualisation in viewer process, nodes added by publisher
+    # are read on each pool of nodes
+    def __init__(self, states: SharedNodeStates):
+        self.states = states
+        self.nodes = []
+        self.by_depth = {}  # floor of x position -> nodes
+        self.depths = np.zeros(0, dtype=np.int64)  # floor of x position of nodes
+        self.seen = None  # Codes of nodes at last changed_depths call
+
+    def __sync(self):
+        added = self.states.read_nodes()
+        for label, pos, inputs in added:
+            node = _SharedNode(self.states, len(self.nodes), label, pos)
+            node.inputs = [self.nodes[i] for i in inputs]
+            self.nodes.append(node)
+            self.by_depth.setdefault(math.floor(pos[0]), []).append(node)
+        if added:
+            self.depths = np.concatenate([self.depths, [math.floor(pos[0]) for _, pos, _ in added]])
+
+    def graph_repr(self) -> List[NodeLike]:
+        self.__sync()
+        return self.nodes
+
+    def graph_repr_window(self, d_min: int, d_max: int) -> List[NodeLike]:
+        self.__sync()
+        return [node for d in range(math.floor(d_min), math.floor(d_max) + 1) for node in self.by_depth.get(d, [])
+                if d_min <= node.pos[0] <= d_max]
+
+    def frontier(self) -> Optional[int]:
+        return self.states.frontier()
+
+    def changed_depths(self) -> Optional[Tuple[int, int]]:
+        # Viewer polls, so publishes between polls can have changed layers around frontiers it not seen
+        self.__sync()
+        codes = self.states.codes()[:len(self.nodes)]
+        seen, self.seen = self.seen, codes.copy()
+        if seen is None:
+            return None
+        depths = np.concatenate([self.depths[np.flatnonzero(codes[:len(seen)] != seen)], self.depths[len(seen):]])
+        return (int(depths.min()), int(depths.max())) if len(depths) > 0 else None
+
+def run_chart_viewer(channel: str, poll: float = .02, shared_tracker: bool = False, **chart_kwargs) -> None:
+    '''
+    Viewer process body, show series published to channel in ChartRecorder2D until series closed
+    and window closed
+    :param channel: shared memory block name
+    :param poll: pause between reads of new points (views of shared memory, copied only into chart buffer)
+    :param shared_tracker: True if viewer is multiprocessing child of publisher (set by start_viewer)
+    :param chart_kwargs: ChartRecorder2D parameters (by default fps=25)
+    '''
+    import matplotlib.pyplot as plt
+    from tools.chart_recorder_2d import ChartRecorder2D
+    series = SharedSeries.attach(channel, shared_tracker)
+    meta = series.meta
+    chart_kwargs.setdefault("fps", 25)
+    chart = ChartRecorder2D(
+        meta["name"], [tuple(line) for line in meta["lines"]],
+        x_range=meta["x_range"], y_range=meta["y_range"], xy_label=tuple(meta["xy_label"]), **chart_kwargs)
+    first = 0
+    while True:
+        closed = series.is_closed()
+        first, xs, yss = series.views_since(first, 0 if closed else series.capacity // 4)
+        chart.extend(xs, yss)
+        first += len(xs)
+        if closed or not plt.get_fignums():
+            break
+        plt.pause(poll)
+    series.close()
+    chart.show()
+
+def run_graph_viewer(channel: str, poll: float = .02, shared_tracker: bool = False, **viz_kwargs) -> None:
+    '''
+    Viewer process body, show graph node states published to channel in GraphVisualisation until states
+    closed and window closed
+    :param channel: shared memory block name
+    :param poll: pause between checks of new states
+    :param shared_tracker: True if viewer is multiprocessing child of publisher (set by start_viewer)
+    :param viz_kwargs: GraphVisualisation parameters (by default fps=25)
+    '''
+    import matplotlib.pyplot as plt
+    from tools.graph_visualisation import GraphVisualisation
+    states = SharedNodeStates.attach(channel, shared_tracker)
+    viz_kwargs.setdefault("fps", 25)
+    viz = GraphVisualisation(states.meta.get("name", channel), _SharedGraph(states), **viz_kwargs)
+    version = -1
+    while True:
+        closed = states.is_closed()
+        if states.version() != version:
+            version = states.version()
+            viz.update()
+        if closed or not plt.get_fignums():
+            break
+        plt.pause(poll)
+    viz.show()
+    states.close()
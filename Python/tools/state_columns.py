@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Columnar state container tool
+Structure of arrays storage for simulation results (𝔛 -> 𝔜) with lightweight row views
+Created 18.10.2026 author CAB
+"""
+
+from typing import Iterator, Optional, Union
+import numpy as np
+
+# Definitions
+class StateRow:
+    '''
+    Lightweight view of one row of StateColumns (no data copied).
+    '''
+    __slots__ = ("columns", "i")
+
+    def __init__(self, columns: 'StateColumns', i: int):
+        self.columns = columns
+        self.i = i
+
+    @property
+    def t(self) -> float:
+        return self.columns.t[self.i]
+
+    @property
+    def ω_1(self) -> float:
+        return self.columns.ω_1[self.i]
+
+    @property
+    def ω_2(self) -> float:
+        return self.columns.ω_2[self.i]
+
+    @property
+    def ω_3(self) -> Optional[float]:
+        return None if self.columns.ω_3 is None else self.columns.ω_3[self.i]
+
+    @property
+    def 𝔈(self) -> Optional[np.ndarray]:
+        '''
+        :return: 𝔈 row (columns in tools.mixing_model.PARAMETERS order) or None if columns have no 𝔈 table
+        '''
+        𝔈 = self.columns.𝔈
+        if 𝔈 is None:
+            return None
+        return 𝔈 if 𝔈.ndim == 1 else 𝔈[self.i]
+
+    def __repr__(self):
+        if self.columns.ω_3 is None:
+            return f"[t = {self.t}, ω_1 = {self.ω_1}, ω_2 = {self.ω_2}]"
+        else:
+            return f"[t = {self.t}, ω_1 = {self.ω_1}, ω_2 = {self.ω_2}, ω_3 = {self.ω_3}]"
+
+class StateColumns:
+    '''
+    Simulation result as named float64 columns t, ω_1, ω_2, optional ω_3 and optional 𝔈 parameter table.
+    '''
+
+    def __init__(
+            self,
+            t: np.ndarray,
+            ω_1: np.ndarray,
+            ω_2: np.ndarray,
+            ω_3: Optional[np.ndarray] = None,
+            𝔈: Optional[np.ndarray] = None):
+        '''
+        Construct columns from arrays, contiguous float64 arrays are used as is (without copy)
+        :param t: column of t
+        :param ω_1: column of ω_1
+        :param ω_2: column of ω_2
+        :param ω_3: optional column of ω_3
+        :param 𝔈: optional 𝔈 table, single 𝔈 row shape (7,) for all points or one row per point shape (n, 7)
+        '''
+        self.t = np.ascontiguousarray(t, dtype=np.float64)
+        self.ω_1 = np.ascontiguousarray(ω_1, dtype=np.float64)
+        self.ω_2 = np.ascontiguousarray(ω_2, dtype=np.float64)
+        self.ω_3 = None if ω_3 is None else np.ascontiguousarray(ω_3, dtype=np.float64)
+        self.𝔈 = None if 𝔈 is None else np.ascontiguousarray(𝔈, dtype=np.float64)
+        n = len(self.t)
+        assert len(self.ω_1) == n and len(self.ω_2) == n, "columns t, ω_1 and ω_2 should have same length"
+        assert self.ω_3 is None or len(self.ω_3) == n, f"column ω_3 should have length {n}"
+        assert self.𝔈 is None or self.𝔈.ndim == 1 or len(self.𝔈) == n, f"𝔈 table should have 1 or {n} rows"
+
+    @classmethod
+    def allocate(cls, n: int, with_ω_3: bool = False, 𝔈: Optional[np.ndarray] = None) -> 'StateColumns':
+        '''
+        Construct zero filled columns, to be filled in place by index
+        :param n: number of rows
+        :param with_ω_3: if True column ω_3 will be allocated
+        :param 𝔈: optional 𝔈 table
+        :return: StateColumns
+        '''
+        return cls(
+            np.zeros(n), np.zeros(n), np.zeros(n),
+            ω_3=np.zeros(n) if with_ω_3 else None,
+            𝔈=𝔈)
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[StateRow, 'StateColumns']:
+        '''
+        :param i: row index or slice
+        :return: row view for index or columns of views for slice
+        '''
+        if isinstance(i, slice):
+            𝔈 = self.𝔈 if self.𝔈 is None or self.𝔈.ndim == 1 else self.𝔈[i]
+            ω_3 = None if self.ω_3 is None else self.ω_3[i]
+            return StateColumns(self.t[i], self.ω_1[i], self.ω_2[i], ω_3, 𝔈)
+        n = len(self.t)
+        if not -n <= i < n:
+            raise IndexError(f"row index {i} out of range for {n} rows")
+        return StateRow(self, i % n)
+
+    def __iter__(self) -> Iterator[StateRow]:
+        return (StateRow(self, i) for i in range(len(self.t)))
+
+    def set(self, i: int, t: float, ω_1: float, ω_2: float, ω_3: Optional[float] = None) -> None:
+        '''
+        Set values of row i in place
+        '''
+        self.t[i] = t
+        self.ω_1[i] = ω_1
+        self.ω_2[i] = ω_2
+        if ω_3 is not None:
+            self.ω_3[i] = ω_3
+
+    def nbytes(self) -> int:
+        '''
+        :return: number of bytes used by columns data
+        '''
+        return sum(c.nbytes for c in (self.t, self.ω_1, self.ω_2, self.ω_3, self.𝔈) if c is not None)
+
+    def __repr__(self):
+        names = "t, ω_1, ω_2" + (", ω_3" if self.ω_3 is not None else "") + (", 𝔈" if self.𝔈 is not None else "")
+        return f"StateColumns[{names}](n = {len(self.t)})"
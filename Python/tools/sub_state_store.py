@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Sub-state store tool
+Indexed storage of set 𝔖^X|𝔈 with batch lookup and interpolation of sub-states by t and sub-state index q
+Created 18.10.2026 author CAB
+"""
+
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+# Definitions
+class SubStateStore:
+    '''
+    Set 𝔖^X|𝔈 stored as sorted t and ω columns per sub-state index q.
+    Lookup is O(1) by integer tick when t column is uniform grid, O(log n) by searchsorted otherwise,
+    t values are matched with tolerance (no exact float equality needed).
+    Off-grid t can be served by interpolation (nearest, linear or cubic Hermite when derivatives are stored).
+    '''
+
+    MODES = ("nearest", "linear", "hermite")
+
+    def __init__(self, tolerance: float = 1e-9):
+        '''
+        Construct a empty store
+        :param tolerance: max absolute difference of t for queried and stored sub-state to be matched
+        '''
+        # Parameters
+        self.__tolerance = tolerance
+        self.__uniform_rtol = 1e-9
+        # Fields
+        self.__pending = {}  # q -> ([t chunk], [ω chunk], [dω/dt chunk]), not yet indexed sub-states
+        self.__columns = {}  # q -> (sorted t, ω, dω/dt columns, (t_0, Δt) if t column is uniform grid else None)
+
+    @classmethod
+    def from_sub_states(cls, set𝔖X𝔈: Iterable[Any], tolerance: float = 1e-9) -> 'SubStateStore':
+        '''
+        Construct store from sub-state objects with fields t, q and ω_q (e.g. ω_1 for q = 1)
+        :param set𝔖X𝔈: iterable of sub-states
+        :param tolerance: see __init__
+        :return: SubStateStore
+        '''
+        columns = {}
+        for 𝔖𝔛_q in set𝔖X𝔈:
+            ts, ωs = columns.setdefault(𝔖𝔛_q.q, ([], []))
+            ts.append(𝔖𝔛_q.t)
+            ωs.append(getattr(𝔖𝔛_q, f"ω_{𝔖𝔛_q.q}"))
+        store = cls(tolerance)
+        for q, (ts, ωs) in columns.items():
+            store.extend(np.array(ts, dtype=np.float64), np.array(ωs, dtype=np.float64), q)
+        return store
+
+    def extend(self, ts: np.ndarray, ωs: np.ndarray, q: int, dωs: Optional[np.ndarray] = None) -> None:
+        '''
+        Add sub-states of index q, index is rebuilt lazily on next lookup
+        :param ts: array of t
+        :param ωs: array of sub-state values
+        :param q: sub-state index
+        :param dωs: optional array of sub-state derivatives dω/dt (known from model), used by hermite interpolation
+        '''
+        ts = np.asarray(ts, dtype=np.float64)
+        ωs = np.asarray(ωs, dtype=np.float64)
+        dωs = np.full(ts.shape, np.nan) if dωs is None else np.asarray(dωs, dtype=np.float64)
+        assert ts.shape == ωs.shape == dωs.shape, \
+            f"ts, ωs and dωs should have same shape, got {ts.shape}, {ωs.shape} and {dωs.shape}"
+        pending_ts, pending_ωs, pending_dωs = self.__pending.setdefault(q, ([], [], []))
+        pending_ts.append(ts.ravel())
+        pending_ωs.append(ωs.ravel())
+        pending_dωs.append(dωs.ravel())
+
+    def add(self, t: float, ω: float, q: int, dω: Optional[float] = None) -> None:
+        '''
+        Add single sub-state (prefer extend for many sub-states)
+        '''
+        self.extend(np.array([t]), np.array([ω]), q, None if dω is None else np.array([dω]))
+
+    def __build(self, q: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Optional[Tuple[float, float]]]:
+        # Merge pending chunks with existing columns, sort by t and detect uniform grid
+        if q in self.__pending:
+            pending_ts, pending_ωs, pending_dωs = self.__pending.pop(q)
+            if q in self.__columns:
+                ts, ωs, dωs, _ = self.__columns[q]
+                pending_ts.insert(0, ts)
+                pending_ωs.insert(0, ωs)
+                pending_dωs.insert(0, dωs)
+            ts = np.concatenate(pending_ts)
+            ωs = np.concatenate(pending_ωs)
+            dωs = np.concatenate(pending_dωs)
+            order = np.argsort(ts, kind="stable")
+            ts = np.ascontiguousarray(ts[order])
+            ωs = np.ascontiguousarray(ωs[order])
+            dωs = np.ascontiguousarray(dωs[order])
+            grid = None
+            if len(ts) > 1:
+                Δt = (ts[-1] - ts[0]) / (len(ts) - 1)
+                ticks = ts[0] + Δt * np.arange(len(ts))
+                if Δt > 0 and np.all(np.abs(ts - ticks) <= max(self.__tolerance, abs(Δt) * self.__uniform_rtol)):
+                    grid = (ts[0], Δt)
+            self.__columns[q] = (ts, ωs, dωs, grid)
+        if q not in self.__columns:
+            raise KeyError(f"No sub-states with index q = {q}")
+        return self.__columns[q]
+
+    def column(self, q: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        :param q: sub-state index
+        :return: (sorted t column, ω column) for sub-state index q
+        '''
+        ts, ωs, _, _ = self.__build(q)
+        return ts, ωs
+
+    def indices(self, ts: np.ndarray, q: int) -> np.ndarray:
+        '''
+        Batch search of sub-states positions in column of index q
+        :param ts: array of queried t
+        :param q: sub-state index
+        :return: int array of positions in column(q), -1 where no sub-state matched within tolerance
+        '''
+        ts = np.asarray(ts, dtype=np.float64)
+        column_ts, _, _, grid = self.__build(q)
+        n = len(column_ts)
+        if n == 0:
+            return np.full(ts.shape, -1, dtype=np.int64)
+        if grid is not None:
+            t_0, Δt = grid
+            i = np.clip(np.rint((ts - t_0) / Δt), 0, n - 1).astype(np.int64)
+        else:
+            right = np.clip(np.searchsorted(column_ts, ts), 1, max(n - 1, 1))
+            left = right - 1
+            i = np.where(np.abs(column_ts[left] - ts) <= np.abs(column_ts[right % n] - ts), left, right % n)
+        return np.where(np.abs(column_ts[i] - ts) <= self.__tolerance, i, -1)
+
+    def lookup(self, ts: np.ndarray, q: int) -> np.ndarray:
+        '''
+        Batch lookup of sub-states values
+        :param ts: array of queried t
+        :param q: sub-state index
+        :return: array of ω values for each of ts
+        :raise KeyError: if any of ts have no matched sub-state
+        '''
+        ts = np.asarray(ts, dtype=np.float64)
+        i = self.indices(ts, q)
+        missed = i < 0
+        if np.any(missed):
+            raise KeyError(f"No sub-states with index q = {q} for t = {ts[missed][:10]}")
+        return self.__columns[q][1][i]
+
+    def get(self, t: float, q: int) -> Optional[float]:
+        '''
+        Lookup of single sub-state value
+        :return: ω value or None if not found
+        '''
+        i = self.indices(np.array([t]), q)[0]
+        return None if i < 0 else float(self.__columns[q][1][i])
+
+    def interpolate(self, ts: np.ndarray, q: int, mode: str = "linear") -> np.ndarray:
+        '''
+        Batch interpolation of sub-states values for t between stored grid points
+        :param ts: array of queried t, should be in range of stored t (with tolerance)
+        :param q: sub-state index
+        :param mode: "nearest", "linear" or "hermite" (cubic Hermite, require stored derivatives dω/dt)
+        :return: array of interpolated ω values for each of ts
+        :raise KeyError: if any of ts out of stored t range
+        '''
+        assert mode in self.MODES, f"mode should be one of {self.MODES}, got {mode}"
+        ts = np.asarray(ts, dtype=np.float64)
+        column_ts, ωs, dωs, grid = self.__build(q)
+        n = len(column_ts)
+        if n == 0:
+            raise KeyError(f"No sub-states with index q = {q}")
+        out = (ts < column_ts[0] - self.__tolerance) | (ts > column_ts[-1] + self.__tolerance)
+        if np.any(out):
+            raise KeyError(f"Out of sub-states range with index q = {q} for t = {ts[out][:10]}")
+        if n == 1:
+            return np.full(ts.shape, ωs[0])
+        # Interval [t_i, t_i+1] for each of ts
+        if grid is not None:
+            t_0, Δt = grid
+            i = np.clip(np.floor((ts - t_0) / Δt), 0, n - 2).astype(np.int64)
+        else:
+            i = np.clip(np.searchsorted(column_ts, ts, side="right") - 1, 0, n - 2)
+        h = column_ts[i + 1] - column_ts[i]
+        # Zero width interval (duplicate t in column) take left value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = np.where(h > 0, (ts - column_ts[i]) / h, 0.0)
+        if mode == "nearest":
+            return np.where(s < .5, ωs[i], ωs[i + 1])
+        if mode == "linear":
+            return ωs[i] + (s * (ωs[i + 1] - ωs[i]))
+        d_0 = dωs[i]
+        d_1 = dωs[i + 1]
+        if np.any(np.isnan(d_0)) or np.any(np.isnan(d_1)):
+            raise ValueError(f"Hermite interpolation require derivatives dω/dt of sub-states with index q = {q}")
+        s_2 = s * s
+        s_3 = s_2 * s
+        return ((2.0 * s_3 - 3.0 * s_2 + 1.0) * ωs[i]) + ((s_3 - 2.0 * s_2 + s) * h * d_0) \
+            + ((3.0 * s_2 - 2.0 * s_3) * ωs[i + 1]) + ((s_3 - s_2) * h * d_1)
+
+    def error_bound(self, q: int, mode: str = "linear") -> float:
+        '''
+        Estimated max interpolation error for stored table of index q, used to pick the coarsest table
+        which meets tolerance. Uses classic bounds (nearest: h/2·max|dω/dt|, linear: h²/8·max|d²ω/dt²|,
+        hermite: h⁴/384·max|d⁴ω/dt⁴|) with derivatives estimated by finite differences over the table
+        (starting from stored dω/dt when available), so it is an estimation, not a strict bound.
+        :param q: sub-state index
+        :param mode: "nearest", "linear" or "hermite"
+        :return: estimated max absolute error, NaN if table too short to estimate
+        '''
+        assert mode in self.MODES, f"mode should be one of {self.MODES}, got {mode}"
+        factor, k = {"nearest": (1.0 / 2.0, 1), "linear": (1.0 / 8.0, 2), "hermite": (1.0 / 384.0, 4)}[mode]
+        column_ts, ωs, dωs, _ = self.__build(q)
+        # Duplicate t (zero width intervals) are skipped, as in interpolate left value is used
+        first = np.concatenate(([True], np.diff(column_ts) > 0)) if len(column_ts) else np.ones(0, dtype=bool)
+        column_ts, ωs, dωs = column_ts[first], ωs[first], dωs[first]
+        if len(column_ts) < 2:
+            return float("nan")
+        # Finite differences of ω (or of dω/dt) up to order k
+        x, y, order = (column_ts, dωs, 1) if not np.any(np.isnan(dωs)) else (column_ts, ωs, 0)
+        while order < k and len(x) > 1:
+            y = np.diff(y) / np.diff(x)
+            x = (x[1:] + x[:-1]) / 2.0
+            order += 1
+        if order < k or len(y) == 0:
+            return float("nan")
+        return factor * (np.max(np.diff(column_ts)) ** k) * np.max(np.abs(y))
+
+    def q_indices(self) -> List[int]:
+        '''
+        :return: sorted list of stored sub-state indexes
+        '''
+        return sorted(set(self.__columns) | set(self.__pending))
+
+    def __len__(self) -> int:
+        return sum(len(self.__build(q)[0]) for q in self.q_indices())
+
+    def __iter__(self) -> Iterator[Tuple[float, float, int]]:
+        '''
+        :return: iterator of (t, ω, q) ordered by q then t
+        '''
+        for q in self.q_indices():
+            ts, ωs, _, _ = self.__build(q)
+            for t, ω in zip(ts, ωs):
+                yield t, ω, q
+
+    def __repr__(self):
+        return f"SubStateStore(q = {self.q_indices()}, n = {len(self)})"
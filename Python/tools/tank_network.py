@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#                   Simulation with reactive streams                    #
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+"""Tank network tool
+Mixing model of N tanks connected by flows, compiled to sparse (CSR) system, generalisation of two tank model
+Created 18.10.2026 author CAB
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from tools.compact_graph import CompactGraph
+from tools.mixing_model import PARAMETERS
+
+# Definitions
+class CSRMatrix:
+    '''
+    Compressed sparse row matrix on plain numpy arrays, product with vector costs O(number of non zeros).
+    '''
+
+    def __init__(self, shape: Tuple[int, int], rows: np.ndarray, cols: np.ndarray, values: np.ndarray):
+        '''
+        Construct from coordinate entries, duplicated (row, col) entries are summed
+        :param shape: (number of rows, number of columns)
+        :param rows: row indexes of entries
+        :param cols: column indexes of entries
+        :param values: values of entries
+        '''
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        order = np.lexsort((cols, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        if len(rows):
+            first = np.concatenate(([True], (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])))
+            starts = np.flatnonzero(first)
+            values = np.add.reduceat(values, starts)
+            rows, cols = rows[starts], cols[starts]
+        self.shape = shape
+        self.data = values
+        self.indices = cols
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=shape[0])))).astype(np.int64)
+        self.rows = rows  # Row of each entry (expanded indptr), used by dot
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def dot(self, x: np.ndarray) -> np.ndarray:
+        '''
+        :param x: vector of shape (number of columns,)
+        :return: matrix vector product of shape (number of rows,)
+        '''
+        return np.bincount(self.rows, weights=self.data * x[self.indices], minlength=self.shape[0])
+
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        :return: (column indexes, values) of non zero entries of row i
+        '''
+        return self.indices[self.indptr[i]:self.indptr[i + 1]], self.data[self.indptr[i]:self.indptr[i + 1]]
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.zeros(self.shape)
+        np.add.at(dense, (self.rows, self.indices), self.data)
+        return dense
+
+def _tank_transition(ω, t, p):
+    # Earlier transition shared by all tanks in Γ graph, inputs are [tank itself, source tanks..., inlets...] padded
+    # by tank itself, parameters are [step kΔt, coefficients of inputs...] (columns of all tanks if vectorized)
+    if isinstance(ω, list):  # Single tank ("sequential", "threads" and "processes" executors)
+        return t[0] + p[0], ω[0] + p[0] * np.dot(p[1:], ω)
+    return t[0] + p[0], ω[0] + p[0] * (p[1:] * ω).sum(axis=0)
+
+class TankNetwork:
+    '''
+    Well mixed tanks of constant volumes connected by flows, concentration ω_i of tank i follows
+        dω_i/dt = (Σ q_ji ω_j (from tanks j) + Σ q_ki ω_in_k (from inlets k) - Σ q_i ω_i (outflows)) / v_i
+    i.e. dω/dt = Aω + Bω_in, where A (N x N) and B (N x M) are sparse with one entry per flow, so
+    Earlier step costs one sparse matrix vector product, O(number of flows).
+    Two tank model is network of tanks 0 and 1 with flows q_2 (1 -> 0), q_3 (0 -> 1), q_4 (1 -> outlet)
+    and inlet q_1 (ω_3 -> 0), see from_two_tank.
+    '''
+
+    def __init__(
+            self,
+            volumes: List[float],
+            flows: List[Tuple[int, Optional[int], float]],
+            inlets: List[Tuple[int, float]] = ()):
+        '''
+        Compile network to sparse system
+        :param volumes: volume v_i of each tank i (0-based index)
+        :param flows: list of (source tank, destination tank or None for outlet, flow rate q)
+        :param inlets: list of (destination tank, flow rate q), inlet k brings concentration ω_in[k]
+        '''
+        volumes = np.asarray(volumes, dtype=np.float64)
+        n = len(volumes)
+        assert np.all(volumes > 0), "Volumes should be positive"
+        for src, dst, q in flows:
+            assert 0 <= src < n and (dst is None or 0 <= dst < n), f"Tank index out of range [0, {n}): {src} -> {dst}"
+            assert q >= 0, f"Flow rate should be non negative, got {q} for {src} -> {dst}"
+        for dst, q in inlets:
+            assert 0 <= dst < n, f"Tank index out of range [0, {n}): inlet -> {dst}"
+            assert q >= 0, f"Flow rate should be non negative, got {q} for inlet -> {dst}"
+        # Parameters
+        self.volumes = volumes
+        self.flows = list(flows)
+        self.inlets = list(inlets)
+        # Fields
+        src = np.array([f[0] for f in flows], dtype=np.int64)
+        dst = np.array([-1 if f[1] is None else f[1] for f in flows], dtype=np.int64)
+        q = np.array([f[2] for f in flows], dtype=np.float64)
+        internal = dst >= 0
+        self.A = CSRMatrix(
+            (n, n),
+            np.concatenate((dst[internal], src)),
+            np.concatenate((src[internal], src)),
+            np.concatenate((q[internal] / volumes[dst[internal]], -q / volumes[src])))
+        in_dst = np.array([i[0] for i in inlets], dtype=np.int64)
+        in_q = np.array([i[1] for i in inlets], dtype=np.float64)
+        self.B = CSRMatrix((n, len(inlets)), in_dst, np.arange(len(inlets)), in_q / volumes[in_dst])
+        self.__steps = {}  # Δt -> I + ΔtA
+
+    @classmethod
+    def from_two_tank(cls, 𝔈: np.ndarray) -> 'TankNetwork':
+        '''
+        :param 𝔈: 𝔈 row (columns in PARAMETERS order), ω_3 is then concentration of inlet 0
+        :return: network of two tank model
+        '''
+        v_1, v_2, q_1, q_2, q_3, q_4, _ = (float(𝔈[i]) for i in range(len(PARAMETERS)))
+        return cls([v_1, v_2], flows=[(1, 0, q_2), (0, 1, q_3), (1, None, q_4)], inlets=[(0, q_1)])
+
+    @property
+    def n_tanks(self) -> int:
+        return len(self.volumes)
+
+    @property
+    def n_inlets(self) -> int:
+        return len(self.inlets)
+
+    def imbalance(self) -> np.ndarray:
+        '''
+        :return: inflow minus outflow of each tank, volumes are constant only if it is zero
+        '''
+        balance = np.zeros(self.n_tanks)
+        for src, dst, q in self.flows:
+            balance[src] -= q
+            if dst is not None:
+                balance[dst] += q
+        for dst, q in self.inlets:
+            balance[dst] += q
+        return balance
+
+    def rhs(self, ω: np.ndarray, ω_in: np.ndarray) -> np.ndarray:
+        '''
+        :param ω: concentrations of tanks, shape (N,)
+        :param ω_in: concentrations of inlets, shape (M,)
+        :return: dω/dt
+        '''
+        return self.A.dot(ω) + self.B.dot(np.asarray(ω_in, dtype=np.float64))
+
+    def step_matrix(self, Δt: float) -> CSRMatrix:
+        '''
+        :return: cached one step matrix I + ΔtA of Earlier scheme
+        '''
+        if Δt not in self.__steps:
+            n = self.n_tanks
+            self.__steps[Δt] = CSRMatrix(
+                (n, n),
+                np.concatenate((self.A.rows, np.arange(n))),
+                np.concatenate((self.A.indices, np.arange(n))),
+                np.concatenate((Δt * self.A.data, np.ones(n))))
+        return self.__steps[Δt]
+
+    def run(
+            self,
+            ω_0: np.ndarray,
+            ω_in: np.ndarray,
+            Δt: float,
+            n: int,
+            record_every: int = 1) -> np.ndarray:
+        '''
+        Earlier scheme ω_(i + 1) = (I + ΔtA)ω_i + ΔtBω_in, one sparse product per step
+        :param ω_0: initial concentrations of tanks, shape (N,)
+        :param ω_in: concentrations of inlets, constant shape (M,) or per step shape (n, M)
+        :param Δt: step
+        :param n: number of steps
+        :param record_every: record state after each record_every steps
+        :return: recorded states, shape (n // record_every + 1, N), first row is ω_0
+        '''
+        step = self.step_matrix(Δt)
+        ω_in = np.asarray(ω_in, dtype=np.float64)
+        per_step = ω_in.ndim == 2
+        inflow = None if per_step else Δt * self.B.dot(ω_in)
+        ω = np.array(ω_0, dtype=np.float64)
+        states = np.empty((n // record_every + 1, self.n_tanks))
+        states[0] = ω
+        for i in range(1, n + 1):
+            ω = step.dot(ω) + (Δt * self.B.dot(ω_in[i - 1]) if per_step else inflow)
+            if i % record_every == 0:
+                states[i // record_every] = ω
+        return states
+
+    def time_constants(self) -> np.ndarray:
+        '''
+        :return: time constant v_i / (total outflow of tank i) of each tank, inf for tank without outflow
+        '''
+        diagonal = self.A.data[self.A.rows == self.A.indices]
+        outflow = np.bincount(self.A.rows[self.A.rows == self.A.indices], weights=-diagonal, minlength=self.n_tanks)
+        with np.errstate(divide="ignore"):
+            return 1.0 / outflow
+
+    def suggest_rates(self, Δt: float, resolution: float = 10.0, max_rate: int = 64) -> List[int]:
+        '''
+        Rates for multirate Γ graph: tank i is stepped by largest k_iΔt not exceeding its time constant divided
+        by resolution, k_i is power of two (so layers of slow tanks are aligned)
+        :param Δt: step of fastest layer
+        :param resolution: minimal number of steps per time constant
+        :param max_rate: upper bound of rates
+        :return: rate k_i of each tank
+        '''
+        ratio = np.minimum(self.time_constants() / (resolution * Δt), max_rate)
+        return [1 if r < 2 else int(2 ** np.floor(np.log2(r))) for r in ratio.tolist()]
+
+    def compact_graph(self, n: int, Δt: float, executor: str = "sequential", workers: Optional[int] = None,
+                      rates: Optional[Sequence[int]] = None, **kwargs: Any) -> CompactGraph:
+        '''
+        Build Γ graph of n layers of network: sub-state w = i + 1 is tank i (produced by Earlier transition
+        from tank itself, its source tanks and inlets of previous layer) and w = N + k + 1 is inlet k
+        (input sub-state, assigned for each layer like ω_3), t of layer d + 1 is t of tank in layer d plus Δt
+        :param n: number of layers
+        :param Δt: step
+        :param executor: executor of CompactGraph
+        :param workers: number of workers of CompactGraph executor
+        :param rates: rate k_i of each tank (e.g. from suggest_rates), tank i then exists in every k_i layer and
+                      is stepped by k_iΔt, None for all 1
+        :param kwargs: other CompactGraph parameters
+        :return: CompactGraph with width N + M
+        '''
+        rates = [1] * self.n_tanks if rates is None else list(rates)
+        assert len(rates) == self.n_tanks, f"rates should be given for {self.n_tanks} tanks, got {len(rates)}"
+        # All tanks share one transition, inputs are padded to same number (by tank itself with zero coefficient)
+        # and step and coefficients are its parameters, so "vectorized" executor runs each rate by single call
+        rows = []
+        for i in range(self.n_tanks):
+            cols, values = self.A.row(i)
+            others = cols != i
+            in_cols, in_values = self.B.row(i)
+            inputs = [i] + cols[others].tolist() + (self.n_tanks + in_cols).tolist()
+            coefficients = np.concatenate(([values[~others].sum()], values[others], in_values))
+            rows.append((inputs, coefficients))
+        n_inputs = max(len(inputs) for inputs, _ in rows)
+        edges: Dict[int, Tuple[int, ...]] = {}
+        parameters: Dict[int, np.ndarray] = {}
+        for i, (inputs, coefficients) in enumerate(rows):
+            padding = n_inputs - len(inputs)
+            edges[i + 1] = tuple(w + 1 for w in inputs + [i] * padding)
+            parameters[i + 1] = np.concatenate(([rates[i] * Δt], coefficients, np.zeros(padding)))
+        transitions = {i + 1: _tank_transition for i in range(self.n_tanks)}
+        return CompactGraph(
+            n, self.n_tanks + self.n_inlets, edges, transitions, executor=executor, workers=workers,
+            rates={i + 1: k for i, k in enumerate(rates) if k != 1}, parameters=parameters, **kwargs)
+
+    def __repr__(self):
+        return f"TankNetwork(tanks = {self.n_tanks}, flows = {len(self.flows)}, inlets = {self.n_inlets})"